@@ -1,23 +1,48 @@
 #!/usr/bin/env python3
 """
-Script para adicionar uma nova história ao arquivo exemplo_historia.json
+Script para adicionar uma nova história ao arquivo historias.ndjson
 Uso: python adicionar_historia.py
+
+Cada história é acrescentada no final do arquivo (ver story_store.py), então
+as anteriores nunca são perdidas. Informar o id de uma história existente
+grava uma nova versão dela.
 """
 
-import json
 import os
+from story_store import StoryStore, compact_in_background
 
 def adicionar_historia():
-    """Adiciona uma nova história ao arquivo exemplo_historia.json"""
+    """Adiciona uma nova história ao arquivo historias.ndjson"""
     
-    print("📝 Adicionando nova história ao exemplo_historia.json")
+    print("📝 Adicionando nova história ao historias.ndjson")
     print("=" * 50)
     
-    # Coleta dados da história
-    print("\n📋 Digite os dados da nova história:")
-    
     try:
-        id_historia = int(input("ID da história (número): "))
+        store = StoryStore()
+        proximo_id = store.next_id()
+        
+        # Ids já usados no Firebase, pelo cache local (sem acessar a rede)
+        from remote_cache import default_cache
+        cache = default_cache()
+        meta_remoto = cache.meta()
+        proximo_remoto = meta_remoto['max_id'] + 1 if meta_remoto else 0
+        proximo_id = max(proximo_id, proximo_remoto)
+        
+        # Coleta dados da história
+        print("\n📋 Digite os dados da nova história:")
+        
+        resposta_id = input(f"ID da história (Enter = {proximo_id}): ").strip()
+        id_historia = int(resposta_id) if resposta_id else None
+        if id_historia is not None and id_historia in store:
+            if input(f"⚠️  A história {id_historia} já existe. Gravar uma nova versão? (s/N): ").strip().lower() != 's':
+                print("❌ Operação cancelada")
+                return
+        elif id_historia is not None and meta_remoto and str(id_historia) in cache.load():
+            idade = cache.age(meta_remoto) / 60
+            if input(f"⚠️  O id {id_historia} já existe no Firebase (cache de {idade:.0f} min atrás). "
+                     "Substituir no upload? (s/N): ").strip().lower() != 's':
+                print("❌ Operação cancelada")
+                return
         nivel = int(input("Nível (0=fácil, 1=normal, 2=difícil): "))
         imagem = input("Caminho da imagem (ex: images/021.png): ")
         
@@ -48,19 +73,23 @@ def adicionar_historia():
             }
         }
         
-        # Salva no arquivo exemplo_historia.json
-        exemplo_path = os.path.join(os.path.dirname(__file__), 'exemplo_historia.json')
-        
-        with open(exemplo_path, 'w', encoding='utf-8') as f:
-            json.dump(nova_historia, f, indent=2, ensure_ascii=False)
+        # Acrescenta no historias.ndjson (o id vazio recebe o próximo livre,
+        # a não ser que o Firebase já tenha ids maiores)
+        if id_historia is None and proximo_remoto > store.next_id():
+            nova_historia["id"] = proximo_remoto
+        id_historia = store.append(nova_historia)
         
-        print(f"\n✅ História salva em exemplo_historia.json!")
+        print(f"\n✅ História salva em historias.ndjson!")
         print(f"📖 Título: {titulo_pt}")
         print(f"🆔 ID: {id_historia}")
         print(f"📊 Nível: {nivel}")
         
+        if store.needs_compaction():
+            compact_in_background(store.path)
+            print("🧹 Muitas versões antigas no arquivo: compactação iniciada em segundo plano")
+        
         print("\n🚀 Para fazer upload, execute:")
-        print("python3 upload_exemplo.py")
+        print(f"python3 upload_stories_v2.py {os.path.basename(store.path)} --sync")
         
     except ValueError:
         print("❌ Erro: ID e nível devem ser números inteiros")
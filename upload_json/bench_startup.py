@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo de inicialização dos comandos do upload_facil.py
+Uso: python bench_startup.py [--runs 10] [--budget-ms 100] [--output resultados.json]
+
+Cada comando local roda em um interpretador novo, --runs vezes, e vale a
+mediana. O tempo do interpretador vazio (python -c pass) é medido do mesmo
+jeito e descontado: o orçamento vale para o que o comando acrescenta
+(imports e despacho), que é o que o código controla. Uma rodada extra com
+-X importtime confere que nenhum comando local carrega o SDK do Firebase e
+mostra os módulos mais caros.
+
+Termina com código 1 se algum comando passar de --budget-ms ou importar o
+firebase_admin.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RESULTS_FORMAT = 1
+DEFAULT_RUNS = 10
+DEFAULT_BUDGET_MS = 100.0
+HEAVY_MODULES = ('firebase_admin', 'google.cloud', 'grpc')
+UPLOAD_FACIL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'upload_facil.py')
+
+# Comandos que não falam com o banco ({tmp} é uma pasta temporária com uma história)
+LOCAL_COMMANDS = (
+    ('ajuda',),
+    ('ver',),
+    ('ver', '1', '--store', '{tmp}/historias.ndjson'),
+    ('validate', '{tmp}/historia.json', '--workers', '1'),
+    ('query', '--help'),
+    ('bundle', '--help'),
+    ('search', '--help'),
+    ('export', '--help'),
+    ('publish', '--help'),
+    ('remote', '--help'),
+    ('lint', '--help'),
+    ('dupes', '--help'),
+    ('watch', '--help'),
+)
+
+
+def run_once(command, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    return time.perf_counter() - start, result
+
+
+def median_ms(command, runs):
+    """Mediana em ms; falha se o comando terminar com erro"""
+    times = []
+    for _ in range(runs):
+        elapsed, result = run_once(command)
+        if result.returncode:
+            raise RuntimeError(f"{' '.join(command[1:])} terminou com código {result.returncode}: "
+                               f"{result.stderr.decode('utf-8', 'replace').strip()[-300:]}")
+        times.append(elapsed)
+    return statistics.median(times) * 1000
+
+
+def slowest_imports(command, top=5):
+    """Módulos mais caros (tempo acumulado) e se algum módulo pesado foi importado"""
+    _, result = run_once([sys.executable, '-X', 'importtime', *command[1:]])
+    imports = []
+    for line in result.stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        imports.append((int(cumulative), name))
+    heavy = sorted({name for _, name in imports if name.split('.')[0] in HEAVY_MODULES or name in HEAVY_MODULES})
+    top_level = sorted(((us, name) for us, name in imports), reverse=True)[:top]
+    return [{'module': name, 'ms': round(us / 1000, 1)} for us, name in top_level], heavy
+
+
+def write_fixtures(tmp):
+    from story_store import StoryStore
+
+    story = {
+        'id': 1, 'level': 0, 'image': 'images/001.png',
+        'pt-br': {'title': 'Título', 'clue_text': 'Pista', 'answer_text': 'Resposta'},
+        'en': {'title': 'Title', 'clue_text': 'Clue', 'answer_text': 'Answer'},
+    }
+    with open(os.path.join(tmp, 'historia.json'), 'w', encoding='utf-8') as f:
+        json.dump(story, f, ensure_ascii=False)
+    StoryStore(os.path.join(tmp, 'historias.ndjson')).append(story)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do tempo de inicialização dos comandos locais')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help=f'Execuções por comando; vale a mediana (padrão: {DEFAULT_RUNS})')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help=f'Tempo máximo acima do interpretador vazio (padrão: {DEFAULT_BUDGET_MS:.0f})')
+    parser.add_argument('--output', help='Arquivo JSON onde salvar os resultados')
+    args = parser.parse_args(argv)
+
+    baseline_ms = median_ms([sys.executable, '-c', 'pass'], args.runs)
+    print(f"🐍 Interpretador vazio: {baseline_ms:.1f} ms (descontado dos comandos)")
+
+    results = []
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        write_fixtures(tmp)
+        for template in LOCAL_COMMANDS:
+            arguments = [part.replace('{tmp}', tmp) for part in template]
+            command = [sys.executable, UPLOAD_FACIL, *arguments]
+            total_ms = median_ms(command, args.runs)
+            overhead_ms = max(0.0, total_ms - baseline_ms)
+            imports, heavy = slowest_imports(command)
+            ok = overhead_ms <= args.budget_ms and not heavy
+            failed = failed or not ok
+            label = ' '.join(template).replace('{tmp}/', '')
+            status = '✅' if ok else '❌'
+            print(f"{status} {label:<32} {total_ms:7.1f} ms (+{overhead_ms:.1f} ms)"
+                  f"{'  ⚠️  importa ' + ', '.join(heavy) if heavy else ''}")
+            results.append({'command': label, 'total_ms': round(total_ms, 1), 'overhead_ms': round(overhead_ms, 1),
+                            'heavy_imports': heavy, 'slowest_imports': imports})
+
+    if args.output:
+        data = {
+            'format': RESULTS_FORMAT,
+            'created_at': datetime.now().isoformat(),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+            'runs': args.runs,
+            'budget_ms': args.budget_ms,
+            'interpreter_ms': round(baseline_ms, 1),
+            'commands': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultados salvos em {args.output}")
+
+    if failed:
+        print(f"❌ Algum comando passou de {args.budget_ms:.0f} ms acima do interpretador ou importou o SDK do Firebase")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
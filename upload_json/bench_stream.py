@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória da leitura incremental de histórias (story_stream)
+Compara o pico de memória de iter_stories com json.load para arquivos de tamanhos crescentes
+Uso: python bench_stream.py [--count 200000]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from story_stream import iter_stories
+from synthetic_catalog import write_synthetic_catalog
+
+
+def measure(fn):
+    """Executa fn e retorna (resultado, pico de memória em bytes, segundos)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def stream_count(path):
+    return sum(1 for _ in iter_stories(path))
+
+
+def load_count(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return len(data['stories'] if isinstance(data, dict) else data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória do leitor incremental de histórias')
+    parser.add_argument('--small', type=int, default=50, help='Histórias no arquivo pequeno (padrão: 50)')
+    parser.add_argument('--count', type=int, default=200000, help='Histórias no arquivo grande (padrão: 200000)')
+    parser.add_argument('--skip-json-load', action='store_true', help='Não medir json.load no arquivo grande')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        sizes = (('pequeno', args.small), ('médio', max(args.small, args.count // 10)), ('grande', args.count))
+        for label, count in sizes:
+            path = os.path.join(tmp, f'{label}.json')
+            write_synthetic_catalog(path, count)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"\n📁 Arquivo {label}: {count} histórias ({size_mb:.1f} MB)")
+
+            total, peak, elapsed = measure(lambda: stream_count(path))
+            results[label] = peak
+            print(f"   - iter_stories: {total} histórias, pico {peak / 1024:.0f} KB, {elapsed:.2f}s")
+
+            if label != 'grande' or not args.skip_json_load:
+                total, peak, elapsed = measure(lambda: load_count(path))
+                print(f"   - json.load:    {total} histórias, pico {peak / 1024:.0f} KB, {elapsed:.2f}s")
+
+        # Arquivos menores que o buffer de leitura têm pico menor; a partir
+        # dele o pico deve ficar estável
+        ratio = results['grande'] / max(1, results['médio'])
+        print(f"\n📊 Pico do streaming: " + ', '.join(f"{label} {peak / 1024:.0f} KB" for label, peak in results.items()))
+        print(f"   Razão grande/médio: {ratio:.2f}x")
+        if ratio < 1.5:
+            print("✅ Memória constante: o pico não cresce com o tamanho do arquivo")
+        else:
+            print("❌ O pico de memória cresceu com o tamanho do arquivo")
+
+
+if __name__ == "__main__":
+    main()
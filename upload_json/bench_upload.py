@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark por etapa do pipeline de upload sobre um catálogo sintético
+Uso: python bench_upload.py --count 10000 [--languages 8] [--output resultados.json] [--baseline anterior.json]
+
+Etapas medidas separadamente:
+  parse        leitura incremental do arquivo (iter_stories)
+  validate     validate_story_data em cada história
+  build        dados de upload: build_upload_data, regras do banco e caminhos multi-path
+  write        uma escrita por história no backend local (write_story)
+  write_batch  escritas em lote no backend local (chunk_stories + write_batch)
+
+O resultado é um JSON comparável entre execuções. Com --baseline, cada etapa
+cujo tempo por história piorar mais que --threshold é marcada como regressão
+e o script termina com código 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from storage_backend import LocalBackend, set_backend
+from story_schema import validate_story_data, validate_upload_data
+from story_stream import iter_stories
+from synthetic_catalog import add_catalog_arguments, catalog_params, write_synthetic_catalog
+from upload_stories_v2 import (build_upload_data, story_updates, write_story, write_batch, chunk_stories,
+                               DEFAULT_BATCH_SIZE, DEFAULT_BATCH_BYTES)
+
+RESULTS_FORMAT = 1
+STAGES = ('parse', 'validate', 'build', 'write', 'write_batch')
+DEFAULT_THRESHOLD = 0.2
+
+
+def timed(fn, repeat):
+    """Executa fn `repeat` vezes; retorna (resultado da última, menor tempo em segundos)"""
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def stage_result(seconds, count, size_bytes=None):
+    result = {
+        'seconds': round(seconds, 6),
+        'stories_per_sec': round(count / seconds, 1) if seconds else None,
+        'us_per_story': round(seconds * 1e6 / count, 3) if count else None,
+    }
+    if size_bytes is not None:
+        result['mb_per_sec'] = round(size_bytes / 1024 / 1024 / seconds, 2) if seconds else None
+    return result
+
+
+def run_benchmark(path, stages=STAGES, repeat=3, latency_ms=0.0, batch_size=DEFAULT_BATCH_SIZE):
+    """Mede cada etapa sobre o arquivo; retorna (número de histórias, {etapa: métricas})"""
+    size_bytes = os.path.getsize(path)
+    results = {}
+
+    stories, seconds = timed(lambda: list(iter_stories(path)), repeat)
+    count = len(stories)
+    if 'parse' in stages:
+        results['parse'] = stage_result(seconds, count, size_bytes)
+
+    if 'validate' in stages:
+        _, seconds = timed(lambda: [validate_story_data(story) for story in stories], repeat)
+        results['validate'] = stage_result(seconds, count)
+
+    def build_all():
+        items = []
+        for story_data in stories:
+            upload_data = build_upload_data(story_data)
+            errors = validate_upload_data(upload_data)
+            if errors:
+                raise ValueError('; '.join(errors))
+            story_updates(story_data, upload_data)
+            items.append((story_data, upload_data))
+        return items
+
+    items, seconds = timed(build_all, repeat)
+    if 'build' in stages:
+        results['build'] = stage_result(seconds, count)
+
+    # Cada repetição grava em um banco vazio, para medir sempre o mesmo trabalho
+    def write_all():
+        set_backend(LocalBackend(latency_ms=latency_ms))
+        for item in items:
+            write_story(item)
+
+    def write_all_batched():
+        set_backend(LocalBackend(latency_ms=latency_ms))
+        for chunk in chunk_stories(items, batch_size, DEFAULT_BATCH_BYTES):
+            write_batch(chunk)
+
+    if 'write' in stages:
+        _, seconds = timed(write_all, repeat)
+        results['write'] = stage_result(seconds, count)
+    if 'write_batch' in stages:
+        _, seconds = timed(write_all_batched, repeat)
+        results['write_batch'] = stage_result(seconds, count)
+
+    return count, results
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compara o tempo por história de cada etapa; retorna {etapa: comparação}"""
+    comparison = {}
+    for stage, metrics in current['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or not previous.get('us_per_story') or not metrics.get('us_per_story'):
+            continue
+        change = metrics['us_per_story'] / previous['us_per_story'] - 1
+        comparison[stage] = {
+            'baseline_us_per_story': previous['us_per_story'],
+            'us_per_story': metrics['us_per_story'],
+            'change': round(change, 4),
+            'regression': change > threshold,
+        }
+    return comparison
+
+
+def print_results(results, comparison=None):
+    print(f"\n📊 Resultados ({results['params']['count']} histórias, {results['file_bytes'] / 1024 / 1024:.1f} MB):")
+    for stage, metrics in results['stages'].items():
+        line = (f"   - {stage:<12} {metrics['seconds']:>9.3f}s  {metrics['us_per_story']:>10.1f} µs/história  "
+                f"{metrics['stories_per_sec']:>10.0f} histórias/s")
+        if 'mb_per_sec' in metrics:
+            line += f"  {metrics['mb_per_sec']:.1f} MB/s"
+        if comparison and stage in comparison:
+            change = comparison[stage]['change'] * 100
+            line += f"  ({change:+.1f}% {'❌ regressão' if comparison[stage]['regression'] else '✅'})"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark por etapa do pipeline de upload')
+    add_catalog_arguments(parser)
+    parser.add_argument('--file', help='Usar um arquivo de histórias existente em vez do catálogo sintético')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f'Etapas medidas (padrão: {",".join(STAGES)})')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições de cada etapa; vale o menor tempo (padrão: 3)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência simulada por escrita no backend local')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Histórias por lote em write_batch (padrão: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--output', help='Arquivo JSON onde salvar os resultados')
+    parser.add_argument('--baseline', help='Resultados anteriores para comparar')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Piora máxima aceita por etapa, em fração (padrão: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args(argv)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"etapas desconhecidas: {', '.join(unknown)}")
+
+    params = catalog_params(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.file:
+            path = args.file
+            params = {'file': os.path.basename(args.file)}
+        else:
+            path = os.path.join(tmp, 'catalogo.json')
+            print(f"📝 Gerando catálogo sintético com {args.count} histórias...")
+            write_synthetic_catalog(path, **params)
+
+        params.update(repeat=args.repeat, latency_ms=args.latency_ms, batch_size=args.batch_size)
+        file_bytes = os.path.getsize(path)
+        count, stage_results = run_benchmark(path, stages, args.repeat, args.latency_ms, args.batch_size)
+
+    params['count'] = count
+    results = {
+        'format': RESULTS_FORMAT,
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'params': params,
+        'file_bytes': file_bytes,
+        'stages': stage_results,
+    }
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != params:
+            print("⚠️  Parâmetros diferentes da execução de referência; a comparação pode não ser justa")
+        comparison = compare_results(results, baseline, args.threshold)
+        results['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'stages': comparison}
+
+    print_results(results, comparison)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"💾 Resultados salvos em {args.output}")
+
+    regressions = [stage for stage, item in (comparison or {}).items() if item['regression']]
+    if regressions:
+        print(f"❌ Regressão acima de {args.threshold * 100:.0f}% em: {', '.join(regressions)}")
+        return 1
+    if comparison is not None:
+        print("✅ Nenhuma regressão em relação à referência")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Gera o pacote offline do catálogo (gzip, versionado) para o app abrir sem esperar o Firebase
+Uso: python catalog_bundle.py [arquivos.json...] [--per-language] [--publish]
+
+Saída em assets/catalog/:
+  catalog.json.gz           todas as histórias válidas
+  catalog.{lang}.json.gz    uma tradução por arquivo (com --per-language)
+  search.{lang}.json.gz     índice de busca do idioma (com --search)
+  catalog_meta.json         versão, hash do conteúdo e hash de cada arquivo
+
+O build é determinístico: a mesma entrada gera arquivos idênticos byte a byte.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+
+from catalog_pages import page_story
+from catalog_shards import build_shard, DEFAULT_SHARD_LANGUAGES, DEFAULT_FALLBACK_LANGUAGE
+from search_index import build_index
+from storage_backend import add_backend_arguments, backend_from_args
+from story_schema import validate_story
+from story_stream import iter_stories
+from sync_manifest import canonical_json
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'catalog')
+BUNDLE_FORMAT = 1
+META_FILE = 'catalog_meta.json'
+CATALOG_META_PATH = 'catalog_meta'
+
+
+def load_catalog(files):
+    """Lê as histórias válidas dos arquivos, ordenadas por id (a última versão de cada id vence)"""
+    stories = {}
+    invalid = 0
+    for file_path in files:
+        for story_data in iter_stories(file_path):
+            if validate_story(story_data):
+                invalid += 1
+                continue
+            stories[story_data['id']] = page_story(story_data)
+    return [stories[story_id] for story_id in sorted(stories)], invalid
+
+
+def catalog_hash(catalog):
+    """Hash SHA-256 do conteúdo do catálogo (lista ordenada de histórias)"""
+    return hashlib.sha256(canonical_json(catalog).encode('utf-8')).hexdigest()
+
+
+def gzip_bytes(data):
+    """Comprime sem data nem nome de arquivo no cabeçalho, para o resultado ser reproduzível"""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename='', mode='wb', fileobj=buffer, compresslevel=9, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+def next_version(previous_meta, content_hash):
+    """Mantém a versão se o conteúdo não mudou; caso contrário incrementa"""
+    if not previous_meta:
+        return 1
+    if previous_meta.get('hash') == content_hash:
+        return previous_meta['version']
+    return previous_meta.get('version', 0) + 1
+
+
+def build_bundle(catalog, version, content_hash, languages=None, fallback=DEFAULT_FALLBACK_LANGUAGE,
+                 search_languages=None):
+    """Monta os arquivos do pacote; retorna {nome do arquivo: bytes comprimidos}"""
+    header = {'format': BUNDLE_FORMAT, 'version': version, 'hash': content_hash, 'count': len(catalog)}
+    files = {'catalog.json.gz': gzip_bytes(canonical_json(dict(header, stories=catalog)).encode('utf-8'))}
+
+    for lang in languages or ():
+        shards = [shard for shard in (build_shard(story, lang, fallback) for story in catalog) if shard]
+        data = dict(header, lang=lang, stories=shards)
+        files[f'catalog.{lang}.json.gz'] = gzip_bytes(canonical_json(data).encode('utf-8'))
+
+    for lang, terms in build_index(catalog, search_languages or ()).items():
+        data = dict(header, lang=lang, terms=terms)
+        files[f'search.{lang}.json.gz'] = gzip_bytes(canonical_json(data).encode('utf-8'))
+
+    return files
+
+
+def write_bundle(files, output_dir, meta):
+    """Grava os arquivos do pacote e o catalog_meta.json, só reescrevendo o que mudou"""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for name, data in sorted(files.items()):
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    continue
+        with open(path, 'wb') as f:
+            f.write(data)
+        written.append(name)
+
+    meta_bytes = (json.dumps(meta, ensure_ascii=False, indent=2, sort_keys=True) + '\n').encode('utf-8')
+    with open(os.path.join(output_dir, META_FILE), 'wb') as f:
+        f.write(meta_bytes)
+    return written
+
+
+def load_bundle_meta(output_dir):
+    path = os.path.join(output_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def publish_meta(meta, args):
+    """Publica versão, hash e contagem em catalog_meta para o app comparar com o pacote"""
+    from upload_stories_v2 import initialize_firebase
+
+    backend = backend_from_args(args, initialize_firebase)
+    if not backend:
+        return False
+    backend.set(CATALOG_META_PATH, {key: meta[key] for key in ('version', 'hash', 'count')})
+    print(f"📡 catalog_meta publicado: versão {meta['version']}, hash {meta['hash'][:12]}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o pacote offline do catálogo de histórias')
+    parser.add_argument('files', nargs='*', help='Arquivos JSON de histórias (padrão: todos os da pasta)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='Pasta de saída (padrão: assets/catalog)')
+    parser.add_argument('--per-language', action='store_true', help='Gerar também um arquivo por idioma')
+    parser.add_argument('--search', action='store_true', help='Incluir o índice de busca de cada idioma')
+    parser.add_argument('--langs', help=f'Idiomas dos arquivos por idioma e da busca (padrão: {",".join(DEFAULT_SHARD_LANGUAGES)})')
+    parser.add_argument('--fallback-lang', default=DEFAULT_FALLBACK_LANGUAGE, help='Idioma usado quando falta a tradução')
+    parser.add_argument('--version', type=int, help='Força o número da versão do pacote')
+    parser.add_argument('--publish', action='store_true', help='Publicar versão e hash em catalog_meta no Firebase')
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.files:
+        files = args.files
+    else:
+        from upload_stories_v2 import list_json_files
+        files = list_json_files()
+
+    catalog, invalid = load_catalog(files)
+    if invalid:
+        print(f"⚠️  {invalid} histórias inválidas ignoradas (use validate_stories.py para ver os erros)")
+
+    content_hash = catalog_hash(catalog)
+    previous = load_bundle_meta(args.output_dir)
+    version = args.version if args.version is not None else next_version(previous, content_hash)
+
+    selected = [lang.strip() for lang in args.langs.split(',')] if args.langs else DEFAULT_SHARD_LANGUAGES
+    languages = selected if args.per_language else None
+    search_languages = selected if args.search else None
+
+    bundle = build_bundle(catalog, version, content_hash, languages, args.fallback_lang, search_languages)
+    meta = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'hash': content_hash,
+        'count': len(catalog),
+        'files': {name: {'sha256': hashlib.sha256(data).hexdigest(), 'bytes': len(data)}
+                  for name, data in bundle.items()},
+    }
+    written = write_bundle(bundle, args.output_dir, meta)
+
+    total_bytes = sum(len(data) for data in bundle.values())
+    print(f"📦 Pacote versão {version}: {len(catalog)} histórias, {len(bundle)} arquivos, {total_bytes} bytes comprimidos")
+    print(f"   - Hash do conteúdo: {content_hash}")
+    print(f"   - Arquivos regravados: {', '.join(written) if written else 'nenhum (sem alterações)'}")
+
+    if args.publish and not publish_meta(meta, args):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
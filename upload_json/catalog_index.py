@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Índice compacto do catálogo para as telas de lista: stories_index/{id}
+
+Cada entrada tem só id, level, image e o título em cada idioma. As histórias
+completas podem ser buscadas sob demanda em stories/{id}. As entradas das
+histórias enviadas em uma execução são acumuladas e gravadas no final com um
+único update multi-path, junto com stories_index_meta (versão e tamanhos).
+
+Os tamanhos de cada entrada ficam em stories_index_sizes/{id}, para que
+stories_index_meta descreva o índice inteiro e não só a última execução.
+"""
+
+from datetime import datetime
+
+from story_schema import NON_LANGUAGE_FIELDS, DIFFICULTY_BY_LEVEL
+from sync_manifest import canonical_json
+
+INDEX_ROOT = 'stories_index'
+INDEX_BY_LEVEL_ROOT = 'stories_index_by_level'
+INDEX_META_PATH = 'stories_index_meta'
+INDEX_SIZES_PATH = 'stories_index_sizes'
+
+INDEX_CONFIG = {
+    'enabled': True,
+    'by_level': False,
+}
+
+# Entradas acumuladas na execução atual: id -> (entrada, bytes da entrada, bytes da história)
+_pending = {}
+# Houve remoções na execução atual: o meta precisa ser recalculado
+_removed = False
+
+
+def configure_index(enabled=True, by_level=False):
+    """Ajusta a geração do índice para a execução atual"""
+    INDEX_CONFIG['enabled'] = enabled
+    INDEX_CONFIG['by_level'] = by_level
+
+
+def build_index_entry(upload_data):
+    """Monta a entrada do índice de uma história"""
+    entry = {
+        'id': upload_data['id'],
+        'level': upload_data['level'],
+        'image': upload_data['image'],
+        'title': {lang: lang_data['title'] for lang, lang_data in upload_data.items()
+                  if lang not in NON_LANGUAGE_FIELDS and isinstance(lang_data, dict) and 'title' in lang_data},
+    }
+    # Miniatura gerada pelo image_pipeline.py, quando existir
+    if 'image_thumb' in upload_data:
+        entry['image_thumb'] = upload_data['image_thumb']
+    return entry
+
+
+def record_index_entry(upload_data):
+    """Acumula a entrada de uma história enviada com sucesso"""
+    if not INDEX_CONFIG['enabled']:
+        return
+    entry = build_index_entry(upload_data)
+    _pending[str(upload_data['id'])] = (entry, len(canonical_json(entry).encode('utf-8')),
+                                        len(canonical_json(upload_data).encode('utf-8')))
+
+
+def pending_count():
+    return len(_pending)
+
+
+def index_dirty():
+    """Indica se há entradas ou remoções que exigem regravar o índice"""
+    return bool(_pending) or _removed
+
+
+def index_deletes(story_id):
+    """Caminhos multi-path que removem uma história do índice"""
+    global _removed
+    if not INDEX_CONFIG['enabled']:
+        return {}
+    _removed = True
+    updates = {f'{INDEX_ROOT}/{story_id}': None, f'{INDEX_SIZES_PATH}/{story_id}': None}
+    if INDEX_CONFIG['by_level']:
+        for level in DIFFICULTY_BY_LEVEL:
+            updates[f'{INDEX_BY_LEVEL_ROOT}/{level}/{story_id}'] = None
+    return updates
+
+
+def _as_dict(node):
+    # Chaves inteiras densas podem voltar do banco como lista (posição = chave)
+    if isinstance(node, list):
+        return {str(key): value for key, value in enumerate(node) if value is not None}
+    return dict(node or {})
+
+
+def take_index_updates(remote_ids=None, remote_sizes=None):
+    """Retorna (updates, estatísticas) das entradas acumuladas e limpa o acumulador
+
+    remote_ids são as chaves atuais de stories_index (leitura shallow) e
+    remote_sizes o nó stories_index_sizes: com eles o meta cobre o índice
+    inteiro. Entradas gravadas antes de existir stories_index_sizes entram
+    na contagem, mas não nos bytes (ficam em 'unsized').
+    A versão do índice é incrementada no servidor ({'.sv': {'increment': 1}}).
+    """
+    global _removed
+    if not index_dirty():
+        return {}, None
+
+    updates = {}
+    sizes = _as_dict(remote_sizes)
+    for story_id, (entry, entry_bytes, story_bytes) in _pending.items():
+        updates[f'{INDEX_ROOT}/{story_id}'] = entry
+        updates[f'{INDEX_SIZES_PATH}/{story_id}'] = {'index': entry_bytes, 'full': story_bytes}
+        if INDEX_CONFIG['by_level']:
+            # Remove a entrada dos outros níveis caso o nível tenha mudado
+            for level in DIFFICULTY_BY_LEVEL:
+                updates[f'{INDEX_BY_LEVEL_ROOT}/{level}/{story_id}'] = entry if level == entry['level'] else None
+        sizes[story_id] = {'index': entry_bytes, 'full': story_bytes}
+
+    ids = set(_as_dict(remote_ids)) | set(_pending)
+    index_bytes = 0
+    full_bytes = 0
+    unsized = 0
+    for story_id in ids:
+        size = sizes.get(story_id)
+        if not isinstance(size, dict):
+            unsized += 1
+            continue
+        index_bytes += size.get('index', 0)
+        full_bytes += size.get('full', 0)
+
+    stats = {
+        'entries': len(ids),
+        'updated': len(_pending),
+        'unsized': unsized,
+        'index_bytes': index_bytes,
+        'full_bytes': full_bytes,
+        'saved_bytes': full_bytes - index_bytes,
+    }
+    updates[INDEX_META_PATH] = dict(stats, version={'.sv': {'increment': 1}},
+                                    updated_at=datetime.now().isoformat())
+    _pending.clear()
+    _removed = False
+    return updates, stats
+
+
+def print_index_stats(stats):
+    """Mostra quantos bytes o índice economiza em relação a baixar stories"""
+    saved_pct = 100.0 * stats['saved_bytes'] / stats['full_bytes'] if stats['full_bytes'] else 0.0
+    print(f"📇 Índice atualizado: {stats['updated']} entradas gravadas, {stats['entries']} no total, "
+          f"{stats['index_bytes']} bytes contra {stats['full_bytes']} bytes das histórias completas "
+          f"(economia de {stats['saved_bytes']} bytes, {saved_pct:.1f}%)")
+    if stats['unsized']:
+        print(f"   - {stats['unsized']} entradas sem tamanho registrado (gravadas por uma versão antiga; "
+              f"reenvie-as para incluí-las nos bytes)")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Páginas de tamanho fixo do catálogo para carregamento sob demanda no app
+
+stories_pages/{n}           página n (a partir de 0) com até page_size histórias
+stories_pages_manifest      tamanho da página, ordem, total e o hash de cada página
+
+As páginas seguem uma ordem estável (por id, ou por nível e id). Só as
+páginas cujo hash mudou em relação ao manifesto remoto são regravadas.
+"""
+
+import hashlib
+
+from story_schema import rule_fields
+from sync_manifest import canonical_json
+
+PAGES_ROOT = 'stories_pages'
+PAGES_MANIFEST_PATH = 'stories_pages_manifest'
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_ORDERS = {
+    'id': lambda story: (story['id'],),
+    'level': lambda story: (story['level'], story['id']),
+}
+
+
+def page_story(story_data):
+    """História no formato da página (sem datas, para o hash ser estável)"""
+    return dict(story_data, **rule_fields(story_data))
+
+
+def build_pages(stories, page_size=DEFAULT_PAGE_SIZE, order='id'):
+    """Ordena as histórias e divide em páginas; retorna a lista de páginas com hash"""
+    ordered = sorted((page_story(story) for story in stories), key=PAGE_ORDERS[order])
+    pages = []
+    for start in range(0, len(ordered), page_size):
+        items = ordered[start:start + page_size]
+        serialized = canonical_json(items).encode('utf-8')
+        pages.append({
+            'stories': items,
+            'hash': hashlib.sha256(serialized).hexdigest(),
+            'bytes': len(serialized),
+            'first_id': items[0]['id'],
+            'last_id': items[-1]['id'],
+        })
+    return pages
+
+
+def build_pages_manifest(pages, page_size, order):
+    """Manifesto pequeno com a contagem de páginas e o hash de cada uma"""
+    return {
+        'page_size': page_size,
+        'order': order,
+        'page_count': len(pages),
+        'total': sum(len(page['stories']) for page in pages),
+        'pages': [{'hash': page['hash'], 'count': len(page['stories']), 'bytes': page['bytes'],
+                   'first_id': page['first_id'], 'last_id': page['last_id']} for page in pages],
+    }
+
+
+def pages_updates(pages, page_size, order, remote_manifest=None):
+    """Calcula o update multi-path das páginas alteradas
+
+    Retorna (updates, índices das páginas regravadas, quantidade de páginas removidas).
+    """
+    remote_pages = (remote_manifest or {}).get('pages') or []
+    # Listas podem voltar do banco como objeto com chaves "0", "1", ...
+    if isinstance(remote_pages, dict):
+        remote_pages = [remote_pages[key] for key in sorted(remote_pages, key=int) if key.isdigit()]
+    remote_hashes = [page.get('hash') if isinstance(page, dict) else None for page in remote_pages]
+
+    updates = {}
+    changed = []
+    for n, page in enumerate(pages):
+        if n < len(remote_hashes) and remote_hashes[n] == page['hash']:
+            continue
+        updates[f'{PAGES_ROOT}/{n}'] = {
+            'stories': page['stories'],
+            'hash': page['hash'],
+            'first_id': page['first_id'],
+            'last_id': page['last_id'],
+        }
+        changed.append(n)
+
+    # Páginas que sobraram de um catálogo maior
+    removed = max(0, len(remote_hashes) - len(pages))
+    for n in range(len(pages), len(remote_hashes)):
+        updates[f'{PAGES_ROOT}/{n}'] = None
+
+    manifest = build_pages_manifest(pages, page_size, order)
+    if changed or removed or canonical_json(manifest) != canonical_json(remote_manifest or {}):
+        updates[PAGES_MANIFEST_PATH] = manifest
+
+    return updates, changed, removed
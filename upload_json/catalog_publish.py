@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Publicação versionada do catálogo: catalog_versions/{v} + ponteiro catalog/current
+Uso: python catalog_publish.py [pastas ou arquivos...] [--retention-days 7] [--keep 2]
+
+1. Lê e valida o catálogo completo dos arquivos e calcula o hash do conteúdo
+2. Se o hash é o mesmo de catalog/current, não grava nada
+3. Grava a versão nova inteira em catalog_versions/{v}/stories (lotes
+   multi-path) e depois catalog_versions/{v}/meta
+4. Confere com uma leitura shallow que todas as histórias chegaram
+5. Troca catalog/current em uma única escrita: versão, hash e contagens
+
+Quem lê catalog/current sempre encontra uma versão completa; uma publicação
+interrompida deixa só uma versão órfã, que a coleta remove. O app consulta
+o nó pequeno catalog/current e só baixa o catálogo quando o hash muda.
+
+Versões antigas (que não são a atual) são apagadas --retention-days depois
+de deixarem de ser a atual, mantendo sempre as --keep mais recentes.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from catalog_bundle import catalog_hash, load_catalog as load_catalog_files
+from ingest import discover_files, DEFAULT_INCLUDE
+from storage_backend import add_backend_arguments, backend_from_args, get_backend
+from story_schema import validate_upload_data, DIFFICULTY_BY_LEVEL, NON_LANGUAGE_FIELDS
+from upload_engine import run_concurrent, DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BUDGET
+
+VERSIONS_ROOT = 'catalog_versions'
+CURRENT_PATH = 'catalog/current'
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_KEEP = 2
+DEFAULT_WORKERS = 4
+
+
+def load_catalog(roots, include=DEFAULT_INCLUDE, exclude=()):
+    """Histórias válidas das pastas, no mesmo formato e ordem do catalog_bundle
+
+    O hash publicado em catalog/current é então o mesmo do pacote offline.
+    """
+    return load_catalog_files(discover_files(roots, include, exclude))
+
+
+def catalog_counts(catalog):
+    """Contagens publicadas no ponteiro: total, por nível e por idioma
+
+    Níveis ausentes ou fora de DIFFICULTY_BY_LEVEL são contados em 'unknown'.
+    """
+    levels = {str(level): 0 for level in DIFFICULTY_BY_LEVEL}
+    languages = {}
+    for story_data in catalog:
+        level = str(story_data.get('level'))
+        if level not in levels:
+            level = 'unknown'
+        levels[level] = levels.get(level, 0) + 1
+        for key, value in story_data.items():
+            if key not in NON_LANGUAGE_FIELDS and isinstance(value, dict):
+                languages[key] = languages.get(key, 0) + 1
+    return {'count': len(catalog), 'levels': levels, 'languages': dict(sorted(languages.items()))}
+
+
+def list_versions():
+    """Números das versões existentes em catalog_versions (leitura shallow)"""
+    keys = get_backend().get_shallow(VERSIONS_ROOT) or {}
+    return sorted((int(key) for key in keys if key.isdigit()))
+
+
+def write_version(version, upload_items, workers, batch_bytes, max_retries, retry_budget, is_transient):
+    """Grava as histórias da versão em lotes multi-path; retorna as estatísticas do envio"""
+    from upload_stories_v2 import chunk_stories
+
+    root = f'{VERSIONS_ROOT}/{version}/stories'
+
+    def version_updates(story_data, upload_data):
+        return {f'{root}/{upload_data["id"]}': upload_data}
+
+    def write_chunk(chunk):
+        updates = {}
+        for item in chunk:
+            updates.update(version_updates(*item))
+        get_backend().update('/', updates)
+
+    errors = []
+    stats = run_concurrent(chunk_stories(upload_items, batch_bytes=batch_bytes, updates_fn=version_updates),
+                           write_chunk, workers,
+                           on_failure=lambda chunk, error: errors.append(error), is_transient=is_transient,
+                           max_retries=max_retries, retry_budget=retry_budget, item_size=len)
+    if errors:
+        raise RuntimeError(f'{stats.failed} histórias não foram gravadas: {errors[0]}')
+    return stats
+
+
+def superseded_time(version, metas):
+    """Quando a versão deixou de ser a atual (None para versões sem meta)"""
+    meta = metas.get(version) or {}
+    if not meta.get('published_at'):
+        return None
+    if meta.get('superseded_at'):
+        return meta['superseded_at']
+    later = [metas[v]['published_at'] for v in sorted(metas) if v > version and metas[v].get('published_at')]
+    return later[0] if later else meta['published_at']
+
+
+def collect_garbage(current_version, retention_days=DEFAULT_RETENTION_DAYS, keep=DEFAULT_KEEP, now=None):
+    """Apaga as versões antigas fora da retenção; retorna as versões apagadas
+
+    A retenção conta a partir de quando a versão deixou de ser a atual
+    (superseded_at no meta). Metas gravados antes desse campo usam a data de
+    publicação da versão seguinte, que foi quando a troca aconteceu.
+    """
+    now = now or datetime.now()
+    versions = [version for version in list_versions() if version != current_version]
+    # As `keep` versões mais recentes (além da atual) ficam sempre
+    candidates = versions[:max(0, len(versions) - keep)]
+    metas = {version: get_backend().get(f'{VERSIONS_ROOT}/{version}/meta') or {}
+             for version in versions + ([current_version] if current_version else [])}
+    removed = []
+    for version in candidates:
+        superseded_at = superseded_time(version, metas)
+        # Versões sem meta são publicações interrompidas
+        if superseded_at and datetime.fromisoformat(superseded_at) > now - timedelta(days=retention_days):
+            continue
+        get_backend().delete(f'{VERSIONS_ROOT}/{version}')
+        removed.append(version)
+    return removed
+
+
+def publish_catalog(catalog, workers=DEFAULT_WORKERS, batch_bytes=None, force=False,
+                    retention_days=DEFAULT_RETENTION_DAYS, keep=DEFAULT_KEEP,
+                    max_retries=DEFAULT_MAX_RETRIES, retry_budget=DEFAULT_RETRY_BUDGET,
+                    is_transient=lambda e: True):
+    """Publica o catálogo como uma versão nova e aponta catalog/current para ela
+
+    Retorna o conteúdo de catalog/current depois da execução, ou None se falhar.
+    """
+    from upload_stories_v2 import build_upload_data, DEFAULT_BATCH_BYTES
+
+    content_hash = catalog_hash(catalog)
+    current = get_backend().get(CURRENT_PATH)
+    if current and current.get('hash') == content_hash and not force:
+        print(f"✅ Catálogo sem alterações (versão {current['version']}, hash {content_hash[:12]}); nada a publicar")
+        return current
+
+    # Uma publicação interrompida pode ter deixado uma versão maior que a atual
+    existing = list_versions()
+    version = max(existing + [(current or {}).get('version', 0)]) + 1
+    published_at = datetime.now().isoformat()
+    print(f"📦 Publicando a versão {version}: {len(catalog)} histórias, hash {content_hash[:12]}")
+
+    upload_items = []
+    for story_data in catalog:
+        upload_data = build_upload_data(story_data, story_data.get('created_at') or published_at)
+        errors = validate_upload_data(upload_data)
+        if errors:
+            print(f"❌ História {story_data['id']} recusada pelas regras do banco: {'; '.join(errors)}")
+            return None
+        upload_items.append((story_data, upload_data))
+
+    start = time.perf_counter()
+    try:
+        write_version(version, upload_items, workers, batch_bytes or DEFAULT_BATCH_BYTES,
+                      max_retries, retry_budget, is_transient)
+        written = get_backend().get_shallow(f'{VERSIONS_ROOT}/{version}/stories') or {}
+        if len(written) != len(catalog):
+            raise RuntimeError(f'a versão tem {len(written)} histórias, esperado {len(catalog)}')
+
+        pointer = dict(catalog_counts(catalog), version=version, hash=content_hash,
+                       path=f'{VERSIONS_ROOT}/{version}/stories', published_at=published_at)
+        get_backend().set(f'{VERSIONS_ROOT}/{version}/meta', pointer)
+        # A troca de versão é esta única escrita, que também marca quando a
+        # versão anterior deixou de ser a atual (início da retenção)
+        switch = {CURRENT_PATH: pointer}
+        if current and current.get('version') in existing:
+            switch[f"{VERSIONS_ROOT}/{current['version']}/meta/superseded_at"] = published_at
+        get_backend().update('/', switch)
+    except Exception as e:
+        print(f"❌ Erro ao publicar a versão {version}: {str(e)}")
+        print("   catalog/current continua apontando para a versão anterior")
+        return None
+
+    previous = f" (antes: versão {current['version']})" if current else ''
+    print(f"🔀 catalog/current → versão {version}{previous} em {time.perf_counter() - start:.1f}s")
+
+    removed = collect_garbage(version, retention_days, keep)
+    if removed:
+        print(f"🧹 Versões antigas apagadas: {', '.join(str(v) for v in removed)}")
+    return pointer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Publica o catálogo como uma versão completa e troca catalog/current')
+    parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    parser.add_argument('--include', help='Padrões glob dos arquivos incluídos, separados por vírgula (padrão: *.json)')
+    parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos, separados por vírgula')
+    parser.add_argument('--force', action='store_true', help='Publicar mesmo sem alterações no conteúdo')
+    parser.add_argument('--retention-days', type=float, default=DEFAULT_RETENTION_DAYS, help=f'Dias até apagar uma versão antiga (padrão: {DEFAULT_RETENTION_DAYS})')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help=f'Versões antigas mantidas sempre, além da atual (padrão: {DEFAULT_KEEP})')
+    parser.add_argument('--gc-only', action='store_true', help='Só apagar as versões antigas, sem publicar')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Lotes gravados em paralelo (padrão: {DEFAULT_WORKERS})')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES, help=f'Retentativas por lote em falhas transitórias (padrão: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--retry-budget', type=int, default=DEFAULT_RETRY_BUDGET, help=f'Total de retentativas permitido na execução (padrão: {DEFAULT_RETRY_BUDGET})')
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from upload_stories_v2 import initialize_firebase, is_transient_error
+
+    if not backend_from_args(args, initialize_firebase):
+        return 1
+
+    if args.gc_only:
+        current = get_backend().get(CURRENT_PATH) or {}
+        removed = collect_garbage(current.get('version'), args.retention_days, args.keep)
+        print(f"🧹 {len(removed)} versões antigas apagadas{': ' + ', '.join(map(str, removed)) if removed else ''}")
+        return 0
+
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+    catalog, invalid = load_catalog(args.roots, include, exclude)
+    if invalid:
+        print(f"⚠️  {invalid} histórias inválidas ignoradas (use validate_stories.py para ver os erros)")
+    if not catalog:
+        print("❌ Nenhuma história válida encontrada; nada a publicar")
+        return 1
+
+    pointer = publish_catalog(catalog, args.workers, None, args.force, args.retention_days, args.keep,
+                              args.max_retries, args.retry_budget, is_transient_error)
+    return 0 if pointer else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Shards por idioma do catálogo: stories_by_lang/{lang}/{id}
+
+Cada shard tem os campos neutros da história (id, level, image, ...) e uma
+única tradução, para o app baixar só o idioma que o usuário lê. Os shards são
+gravados no mesmo update multi-path que stories/{id}, então nunca divergem
+do nó canônico.
+"""
+
+from story_schema import NON_LANGUAGE_FIELDS
+
+SHARDS_ROOT = 'stories_by_lang'
+
+# Mesma lista de AppConstants.supportedLanguages no app
+DEFAULT_SHARD_LANGUAGES = ('pt-br', 'en', 'es', 'fr', 'de', 'it', 'ja', 'ru')
+DEFAULT_FALLBACK_LANGUAGE = 'en'
+
+SHARD_CONFIG = {
+    'enabled': True,
+    'languages': DEFAULT_SHARD_LANGUAGES,
+    'fallback': DEFAULT_FALLBACK_LANGUAGE,
+    'all_languages': False,
+}
+
+
+def configure_shards(enabled=True, languages=None, fallback=None, all_languages=False):
+    """Ajusta a geração de shards para a execução atual"""
+    SHARD_CONFIG['enabled'] = enabled
+    SHARD_CONFIG['languages'] = tuple(languages) if languages else DEFAULT_SHARD_LANGUAGES
+    SHARD_CONFIG['fallback'] = fallback or DEFAULT_FALLBACK_LANGUAGE
+    SHARD_CONFIG['all_languages'] = all_languages
+
+
+def shard_languages(upload_data):
+    """Idiomas que recebem shard para esta história"""
+    languages = list(SHARD_CONFIG['languages'])
+    if SHARD_CONFIG['all_languages']:
+        languages.extend(key for key in upload_data if key not in NON_LANGUAGE_FIELDS and key not in languages)
+    return languages
+
+
+def build_shard(upload_data, lang, fallback=None):
+    """Monta o shard de um idioma; usa a tradução de fallback se o idioma não existir
+
+    Retorna None se nem o idioma nem o fallback estiverem na história.
+    """
+    shard = {key: value for key, value in upload_data.items() if key in NON_LANGUAGE_FIELDS}
+
+    if isinstance(upload_data.get(lang), dict):
+        shard[lang] = upload_data[lang]
+    elif fallback and isinstance(upload_data.get(fallback), dict):
+        # A tradução fica na chave do idioma pedido, marcando a origem
+        shard[lang] = upload_data[fallback]
+        shard['translation_lang'] = fallback
+    else:
+        return None
+
+    return shard
+
+
+def shard_updates(upload_data):
+    """Caminhos multi-path dos shards de uma história (None apaga um shard obsoleto)"""
+    if not SHARD_CONFIG['enabled']:
+        return {}
+
+    story_id = upload_data['id']
+    return {f'{SHARDS_ROOT}/{lang}/{story_id}': build_shard(upload_data, lang, SHARD_CONFIG['fallback'])
+            for lang in shard_languages(upload_data)}
+
+
+def story_languages(story_data):
+    """Idiomas presentes em uma história (as chaves com tradução)"""
+    return sorted(key for key, value in story_data.items()
+                  if key not in NON_LANGUAGE_FIELDS and isinstance(value, dict))
+
+
+def shard_deletes(story_id, languages=()):
+    """Caminhos multi-path que apagam os shards de uma história removida
+
+    Cobre os idiomas configurados, os padrão e `languages` (os idiomas da
+    história gravada), para não deixar shards de --shard-langs all para trás.
+    """
+    if not SHARD_CONFIG['enabled']:
+        return {}
+    all_languages = dict.fromkeys([*SHARD_CONFIG['languages'], *DEFAULT_SHARD_LANGUAGES, *languages])
+    return {f'{SHARDS_ROOT}/{lang}/{story_id}': None for lang in all_languages}
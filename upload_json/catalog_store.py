@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Catálogo local compilado em colunas, para consultas rápidas sem reler o JSON
+Uso:
+  python catalog_store.py build [pastas ou arquivos...]
+  python catalog_store.py query [--level 2] [--missing fr] [--id-min 100] [--stats answer_text] [--longest answer_text]
+
+O build lê as histórias válidas uma vez e grava em .catalog_store/:
+  columns.bin   arrays contíguos (id, level e o tamanho em caracteres de
+                title, clue_text e answer_text em cada idioma, -1 quando o
+                idioma não existe na história)
+  meta.json     idiomas, posição de cada coluna e os arquivos de origem
+
+A consulta abre columns.bin com mmap e lê as colunas como memoryview, sem
+copiar nem decodificar nada. As linhas ficam ordenadas por id, então os
+intervalos de id são resolvidos por busca binária. Se algum arquivo de origem
+mudou (tamanho ou data), a consulta recompila o catálogo antes de responder.
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import mmap
+import os
+import statistics
+import sys
+import time
+from array import array
+from collections import Counter
+
+from ingest import discover_files, DEFAULT_INCLUDE
+from story_schema import validate_story, NON_LANGUAGE_FIELDS, DIFFICULTY_BY_LEVEL
+from story_stream import iter_stories
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.catalog_store')
+COLUMNS_FILE = 'columns.bin'
+META_FILE = 'meta.json'
+STORE_FORMAT = 1
+TEXT_FIELDS = ('title', 'clue_text', 'answer_text')
+MISSING = -1
+
+# Tipo de cada coluna fixa no módulo array
+ID_TYPE = 'q'
+LEVEL_TYPE = 'b'
+LENGTH_TYPE = 'i'
+
+
+def _source_entry(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def story_languages(story_data):
+    return [key for key, value in story_data.items() if key not in NON_LANGUAGE_FIELDS and isinstance(value, dict)]
+
+
+def build_store(roots, store_dir=DEFAULT_STORE_DIR, include=DEFAULT_INCLUDE, exclude=()):
+    """Compila as histórias válidas dos arquivos em colunas; retorna o meta.json gravado"""
+    start = time.perf_counter()
+    files = discover_files(roots, include, exclude)
+    stories = {}
+    invalid = 0
+    for file_path in files:
+        for story_data in iter_stories(file_path):
+            if validate_story(story_data):
+                invalid += 1
+            else:
+                stories[story_data['id']] = story_data
+
+    ids = sorted(stories)
+    languages = sorted({lang for story_data in stories.values() for lang in story_languages(story_data)})
+    columns = {
+        'id': array(ID_TYPE, ids),
+        'level': array(LEVEL_TYPE, (stories[story_id]['level'] for story_id in ids)),
+    }
+    for field in TEXT_FIELDS:
+        # Uma coluna por campo, com um bloco contíguo por idioma
+        lengths = array(LENGTH_TYPE)
+        for lang in languages:
+            for story_id in ids:
+                lang_data = stories[story_id].get(lang)
+                if isinstance(lang_data, dict):
+                    value = lang_data.get(field)
+                    lengths.append(len(value) if isinstance(value, str) else 0)
+                else:
+                    lengths.append(MISSING)
+        columns[field] = lengths
+
+    os.makedirs(store_dir, exist_ok=True)
+    layout = {}
+    tmp_path = os.path.join(store_dir, COLUMNS_FILE + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        for name, values in columns.items():
+            # Alinha cada coluna em 8 bytes para o cast do memoryview
+            f.write(b'\0' * (-f.tell() % 8))
+            layout[name] = {'offset': f.tell(), 'typecode': values.typecode, 'length': len(values)}
+            values.tofile(f)
+    os.replace(tmp_path, os.path.join(store_dir, COLUMNS_FILE))
+
+    meta = {
+        'format': STORE_FORMAT,
+        'count': len(ids),
+        'invalid': invalid,
+        'languages': languages,
+        'columns': layout,
+        'roots': [os.path.abspath(root) for root in roots],
+        'include': list(include or DEFAULT_INCLUDE),
+        'exclude': list(exclude or ()),
+        'sources': {os.path.abspath(path): _source_entry(path) for path in files},
+        'build_s': round(time.perf_counter() - start, 3),
+    }
+    tmp_path = os.path.join(store_dir, META_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, META_FILE))
+    return meta
+
+
+def load_meta(store_dir=DEFAULT_STORE_DIR):
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return meta if meta.get('format') == STORE_FORMAT else None
+
+
+def is_stale(meta):
+    """Indica se algum arquivo de origem mudou, sumiu ou apareceu desde o build"""
+    try:
+        current = discover_files(meta['roots'], meta['include'], meta['exclude'])
+        if sorted(os.path.abspath(path) for path in current) != sorted(meta['sources']):
+            return True
+        return any(_source_entry(path) != entry for path, entry in meta['sources'].items())
+    except OSError:
+        return True
+
+
+class CatalogStore:
+    """Colunas do catálogo mapeadas em memória (somente leitura)"""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, meta=None):
+        self.meta = meta or load_meta(store_dir)
+        if not self.meta:
+            raise FileNotFoundError(f'Catálogo compilado não encontrado em {store_dir}')
+        self.count = self.meta['count']
+        self.languages = self.meta['languages']
+        self._file = open(os.path.join(store_dir, COLUMNS_FILE), 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(self._file.fileno()).st_size else None
+        self._views = {}
+
+    def column(self, name):
+        """Coluna inteira como memoryview tipado (sem cópia)"""
+        if name not in self._views:
+            spec = self.meta['columns'][name]
+            if not spec['length']:
+                self._views[name] = memoryview(array(spec['typecode']))
+            else:
+                size = spec['length'] * array(spec['typecode']).itemsize
+                self._views[name] = memoryview(self._mmap)[spec['offset']:spec['offset'] + size].cast(spec['typecode'])
+        return self._views[name]
+
+    def lengths(self, field, lang):
+        """Tamanhos de um campo em um idioma, na ordem das linhas"""
+        position = self.languages.index(lang)
+        return self.column(field)[position * self.count:(position + 1) * self.count]
+
+    def id_range(self, id_min=None, id_max=None):
+        """Linhas com id dentro do intervalo (busca binária na coluna de ids)"""
+        ids = self.column('id')
+        lo = 0 if id_min is None else bisect.bisect_left(ids, id_min)
+        hi = self.count if id_max is None else bisect.bisect_right(ids, id_max)
+        return range(lo, max(lo, hi))
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        if self._mmap:
+            self._mmap.close()
+        self._file.close()
+
+
+def open_store(store_dir=DEFAULT_STORE_DIR, roots=None, refresh=True):
+    """Abre o catálogo compilado, recompilando se não existir ou estiver desatualizado"""
+    meta = load_meta(store_dir)
+    if meta is None or (refresh and is_stale(meta)):
+        if meta is None and not roots:
+            roots = ['.']
+        reason = 'criando' if meta is None else 'arquivos alterados, recompilando'
+        print(f"🛠️  Catálogo compilado: {reason}...", file=sys.stderr)
+        if meta is not None:
+            meta = build_store(roots or meta['roots'], store_dir, meta['include'], meta['exclude'])
+        else:
+            meta = build_store(roots, store_dir)
+    return CatalogStore(store_dir, meta)
+
+
+def _parse_field(value, store):
+    """'answer_text' ou 'answer_text:fr' -> (campo, idioma); o idioma padrão é pt-br"""
+    field, _, lang = value.partition(':')
+    lang = lang or 'pt-br'
+    if field not in TEXT_FIELDS:
+        raise ValueError(f"Campo desconhecido: {field} (use {', '.join(TEXT_FIELDS)})")
+    if lang not in store.languages:
+        raise ValueError(f"Idioma sem histórias no catálogo: {lang}")
+    return field, lang
+
+
+def select_rows(store, id_min=None, id_max=None, levels=None, has=(), missing=()):
+    """Linhas que passam em todos os filtros"""
+    rows = store.id_range(id_min, id_max)
+    if levels:
+        level_column = store.column('level')
+        wanted = set(levels)
+        rows = [row for row in rows if level_column[row] in wanted]
+    for lang in has:
+        titles = store.lengths('title', lang) if lang in store.languages else None
+        rows = [row for row in rows if titles is not None and titles[row] != MISSING]
+    for lang in missing:
+        if lang in store.languages:
+            titles = store.lengths('title', lang)
+            rows = [row for row in rows if titles[row] == MISSING]
+    return rows
+
+
+def length_stats(store, rows, field, lang):
+    """Estatísticas do tamanho de um campo (só histórias com o idioma)"""
+    column = store.lengths(field, lang)
+    values = [column[row] for row in rows if column[row] != MISSING]
+    if not values:
+        return {'field': field, 'lang': lang, 'count': 0}
+    ordered = sorted(values)
+    return {
+        'field': field,
+        'lang': lang,
+        'count': len(values),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': round(statistics.fmean(values), 1),
+        'median': statistics.median(ordered),
+        'p90': ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+    }
+
+
+def longest(store, rows, field, lang, limit=5):
+    """Histórias com o campo mais longo: [(id, tamanho)]"""
+    column = store.lengths(field, lang)
+    ids = store.column('id')
+    # nlargest é estável: no empate fica o menor id (as linhas estão em ordem de id)
+    top = heapq.nlargest(limit, rows, key=column.__getitem__)
+    return [{'id': ids[row], 'length': column[row]} for row in top if column[row] != MISSING]
+
+
+def coverage(store, rows):
+    """Quantas das histórias selecionadas têm cada idioma"""
+    result = {}
+    for lang in store.languages:
+        titles = store.lengths('title', lang)
+        result[lang] = sum(1 for row in rows if titles[row] != MISSING)
+    return result
+
+
+def run_query(store, args):
+    """Executa os filtros e agregações pedidos; retorna o resultado como dicionário"""
+    rows = select_rows(store, args.id_min, args.id_max, args.level, args.has or (), args.missing or ())
+    ids = store.column('id')
+    result = {'count': len(rows)}
+    if args.by_level:
+        level_column = store.column('level')
+        counts = Counter(level_column[row] for row in rows)
+        result['by_level'] = {str(level): counts.get(level, 0) for level in sorted(DIFFICULTY_BY_LEVEL)}
+    if args.coverage:
+        result['coverage'] = coverage(store, rows)
+    if args.stats:
+        result['stats'] = [length_stats(store, rows, *_parse_field(value, store)) for value in args.stats]
+    if args.longest:
+        result['longest'] = {value: longest(store, rows, *_parse_field(value, store), limit=args.limit)
+                             for value in args.longest}
+    if args.ids:
+        result['ids'] = [ids[row] for row in rows[:args.limit]]
+    return result
+
+
+def print_result(result):
+    print(f"📊 {result['count']} histórias")
+    if 'by_level' in result:
+        print("   Por nível: " + ', '.join(f"{level} ({DIFFICULTY_BY_LEVEL[int(level)]}): {count}"
+                                        for level, count in result['by_level'].items()))
+    if 'coverage' in result:
+        print("   Idiomas: " + ', '.join(f"{lang} {count}" for lang, count in result['coverage'].items()))
+    for item in result.get('stats', ()):
+        if not item['count']:
+            print(f"   {item['field']}:{item['lang']}: nenhuma história com o idioma")
+            continue
+        print(f"   {item['field']}:{item['lang']}: {item['count']} textos, min {item['min']}, "
+              f"média {item['mean']}, mediana {item['median']}, p90 {item['p90']}, máx {item['max']} caracteres")
+    for value, top in result.get('longest', {}).items():
+        print(f"   Mais longos em {value}: " + ', '.join(f"#{item['id']} ({item['length']})" for item in top))
+    if 'ids' in result:
+        print(f"   Ids: {', '.join(str(story_id) for story_id in result['ids'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Catálogo local compilado em colunas e consultas rápidas')
+    # Depois do subcomando, para funcionar também via upload_facil.py query --store ...
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--store', default=DEFAULT_STORE_DIR, help='Pasta do catálogo compilado (padrão: .catalog_store)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', parents=[common], help='Compila o catálogo a partir dos arquivos de histórias')
+    build_parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    build_parser.add_argument('--include', help='Padrões glob dos arquivos incluídos, separados por vírgula (padrão: *.json)')
+    build_parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos, separados por vírgula')
+
+    query_parser = commands.add_parser('query', parents=[common], help='Filtra e agrega o catálogo compilado')
+    query_parser.add_argument('--level', type=int, action='append', help='Só histórias deste nível (pode repetir)')
+    query_parser.add_argument('--has', action='append', help='Só histórias com este idioma (pode repetir)')
+    query_parser.add_argument('--missing', action='append', help='Só histórias sem este idioma (pode repetir)')
+    query_parser.add_argument('--id-min', type=int, help='Menor id incluído')
+    query_parser.add_argument('--id-max', type=int, help='Maior id incluído')
+    query_parser.add_argument('--by-level', action='store_true', help='Contar as histórias por nível')
+    query_parser.add_argument('--coverage', action='store_true', help='Contar as histórias de cada idioma')
+    query_parser.add_argument('--stats', action='append', help='Estatísticas de tamanho de um campo, ex.: answer_text ou clue_text:fr')
+    query_parser.add_argument('--longest', action='append', help='Histórias com o campo mais longo, ex.: answer_text:en')
+    query_parser.add_argument('--ids', action='store_true', help='Listar os ids selecionados')
+    query_parser.add_argument('--limit', type=int, default=20, help='Máximo de ids listados (padrão: 20)')
+    query_parser.add_argument('--json', action='store_true', help='Imprimir o resultado em JSON')
+    query_parser.add_argument('--no-refresh', action='store_true', help='Não conferir se os arquivos de origem mudaram')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+        exclude = args.exclude.split(',') if args.exclude else ()
+        meta = build_store(args.roots, args.store, include, exclude)
+        size = os.path.getsize(os.path.join(args.store, COLUMNS_FILE))
+        print(f"🛠️  Catálogo compilado: {meta['count']} histórias, {len(meta['languages'])} idiomas, "
+              f"{size} bytes em {meta['build_s']:.2f}s")
+        if meta['invalid']:
+            print(f"⚠️  {meta['invalid']} histórias inválidas ignoradas (use validate_stories.py para ver os erros)")
+        return 0
+
+    store = open_store(args.store, refresh=not args.no_refresh)
+    try:
+        start = time.perf_counter()
+        try:
+            result = run_query(store, args)
+        except ValueError as e:
+            print(f"❌ {str(e)}")
+            return 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(dict(result, elapsed_ms=round(elapsed_ms, 2)), ensure_ascii=False, indent=2))
+    else:
+        print_result(result)
+        print(f"⏱️  Consulta em {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
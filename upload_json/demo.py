@@ -5,7 +5,7 @@ Script de demonstração do upload de histórias
 
 import json
 import os
-from upload_stories_v2 import initialize_firebase, upload_story
+from upload_stories_v2 import initialize_firebase, upload_story, write_index
 
 def create_demo_stories():
     """Cria algumas histórias de demonstração"""
@@ -82,6 +82,8 @@ def demo_upload():
         if upload_story(story):
             success_count += 1
     
+    write_index()
+    
     print(f"\n🎉 Demonstração concluída! {success_count}/{len(stories)} histórias enviadas com sucesso")
     
     if success_count > 0:
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Backup do nó stories do Firebase em NDJSON (uma história por linha), sem um GET gigante
+Uso: python export_stories.py [--output backup.ndjson.gz] [--page-size 200] [--workers 4] [--resume]
+
+1. Lista os ids com uma leitura shallow (só as chaves)
+2. Divide os ids em páginas de chaves consecutivas, na ordem do Realtime Database
+3. Busca as páginas com order_by_key().start_at().end_at() em um pool de threads
+   limitado, com no máximo 2 * workers páginas em memória
+4. Grava as páginas na ordem das chaves; com gzip, cada página é um membro
+   gzip completo (o arquivo continua legível por gzip/zcat)
+
+Depois de cada página gravada, o arquivo {saída}.progress guarda a última
+chave e o tamanho do arquivo. Com --resume, a saída é truncada nesse ponto e a
+exportação continua a partir da chave seguinte.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from storage_backend import add_backend_arguments, backend_from_args, get_backend, key_order
+from upload_engine import (RetryBudget, UploadStats, call_with_retries,
+                           DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BUDGET)
+
+DEFAULT_PATH = 'stories'
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_WORKERS = 4
+PROGRESS_SUFFIX = '.progress'
+
+
+def default_output():
+    return f"stories_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+
+
+def plan_pages(keys, page_size, after_key=None):
+    """Divide as chaves (ordenadas como no banco) em páginas [(primeira, última, quantidade)]"""
+    ordered = sorted(keys, key=key_order)
+    if after_key is not None:
+        after = key_order(after_key)
+        ordered = [key for key in ordered if key_order(key) > after]
+    return [(ordered[i], ordered[min(i + page_size, len(ordered)) - 1], len(ordered[i:i + page_size]))
+            for i in range(0, len(ordered), page_size)]
+
+
+def fetch_page(path, page):
+    """Busca as histórias de uma página; retorna [(chave, história)] na ordem das chaves"""
+    first, last, _ = page
+    stories = get_backend().get_range(path, first, last)
+    return sorted(stories.items(), key=lambda item: key_order(item[0]))
+
+
+def iter_pages(path, pages, workers, stats, budget, is_transient, max_retries):
+    """Busca as páginas em paralelo, entregando na ordem das chaves
+
+    No máximo 2 * workers páginas ficam em voo (ou prontas esperando a
+    gravação), então a memória não cresce com o tamanho do catálogo.
+    """
+    max_in_flight = max(1, workers) * 2
+    pending = deque()
+    pages = iter(pages)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while True:
+            while len(pending) < max_in_flight:
+                page = next(pages, None)
+                if page is None:
+                    break
+                pending.append((page, executor.submit(call_with_retries, lambda item: fetch_page(path, item),
+                                                      page, stats, budget, is_transient, max_retries)))
+            if not pending:
+                return
+            page, future = pending.popleft()
+            yield page, future.result()
+
+
+def encode_page(items, compress):
+    data = ''.join(json.dumps(story, ensure_ascii=False, separators=(',', ':')) + '\n'
+                   for _, story in items).encode('utf-8')
+    # mtime=0 deixa o arquivo igual byte a byte em exportações do mesmo conteúdo
+    return gzip.compress(data, mtime=0) if compress else data
+
+
+def load_progress(output_path):
+    path = output_path + PROGRESS_SUFFIX
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_progress(output_path, progress):
+    path = output_path + PROGRESS_SUFFIX
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, path)
+
+
+def export_stories(output_path, path=DEFAULT_PATH, page_size=DEFAULT_PAGE_SIZE, workers=DEFAULT_WORKERS,
+                   compress=None, resume=False, max_retries=DEFAULT_MAX_RETRIES,
+                   retry_budget=DEFAULT_RETRY_BUDGET, is_transient=lambda e: True):
+    """Exporta o nó `path` para `output_path`; retorna True se terminou"""
+    start = time.perf_counter()
+    if compress is None:
+        compress = output_path.endswith('.gz')
+
+    progress = load_progress(output_path) if resume else None
+    if resume and not progress:
+        print(f"⚠️  Nenhuma exportação interrompida de {output_path}; começando do início")
+    if progress and progress['offset']:
+        # O progresso só vale se a saída ainda tem tudo o que ele registra
+        size = os.path.getsize(output_path) if os.path.isfile(output_path) else None
+        if size is None or size < progress['offset']:
+            found = 'não existe mais' if size is None else f"tem {size} bytes, esperado ao menos {progress['offset']}"
+            print(f"⚠️  {output_path} {found}; começando do início")
+            progress = None
+    if progress and (progress['path'] != path or progress['gzip'] != compress):
+        print(f"❌ A exportação interrompida de {output_path} usou outras opções (nó {progress['path']}, gzip {progress['gzip']})")
+        return False
+    if not progress:
+        progress = {'path': path, 'gzip': compress, 'last_key': None, 'offset': 0, 'count': 0}
+
+    stats = UploadStats()
+    budget = RetryBudget(retry_budget)
+    keys = call_with_retries(get_backend().get_shallow, path, stats, budget, is_transient, max_retries) or {}
+    pages = plan_pages(keys, page_size, progress['last_key'])
+    total = len(keys)
+    del keys
+    remaining = sum(count for _, _, count in pages)
+    if progress['last_key'] is not None:
+        print(f"⏩ Retomando após a chave {progress['last_key']}: {progress['count']} histórias já exportadas, {remaining} restantes")
+    print(f"📋 {total} histórias em {path}/, {len(pages)} páginas de até {page_size}")
+
+    # Descarta o que foi gravado depois do último progresso salvo (página incompleta)
+    with open(output_path, 'r+b' if progress['offset'] else 'wb') as f:
+        f.truncate(progress['offset'])
+        f.seek(progress['offset'])
+        try:
+            for (_, last, _), items in iter_pages(path, pages, workers, stats, budget, is_transient, max_retries):
+                data = encode_page(items, compress)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                progress.update(last_key=last, offset=progress['offset'] + len(data),
+                                count=progress['count'] + len(items))
+                save_progress(output_path, progress)
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Exportação interrompida após {progress['count']} histórias")
+            print(f"💡 Para continuar: python export_stories.py --output {output_path} --resume")
+            return False
+        except Exception as e:
+            print(f"❌ Erro ao exportar após {progress['count']} histórias: {str(e)}")
+            print(f"💡 Para continuar: python export_stories.py --output {output_path} --resume")
+            return False
+
+    if os.path.exists(output_path + PROGRESS_SUFFIX):
+        os.remove(output_path + PROGRESS_SUFFIX)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(output_path)
+    print(f"💾 {progress['count']} histórias exportadas para {output_path} ({size} bytes) em {elapsed:.1f}s")
+    if stats.retries:
+        print(f"   - {stats.retries} leituras repetidas por falhas transitórias")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exporta as histórias do Firebase para NDJSON (backup)')
+    parser.add_argument('--output', help='Arquivo de saída; termina em .gz para comprimir (padrão: stories_backup_{data}.ndjson.gz)')
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f'Nó exportado (padrão: {DEFAULT_PATH})')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help=f'Histórias por leitura (padrão: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Leituras em paralelo (padrão: {DEFAULT_WORKERS})')
+    parser.add_argument('--gzip', action='store_true', default=None, help='Comprimir mesmo sem a extensão .gz')
+    parser.add_argument('--resume', action='store_true', help='Continuar uma exportação interrompida do mesmo arquivo')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES, help=f'Retentativas por leitura em falhas transitórias (padrão: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--retry-budget', type=int, default=DEFAULT_RETRY_BUDGET, help=f'Total de retentativas permitido na execução (padrão: {DEFAULT_RETRY_BUDGET})')
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    from upload_stories_v2 import initialize_firebase, is_transient_error
+
+    if not backend_from_args(args, initialize_firebase):
+        return 1
+    output_path = args.output or default_output()
+    ok = export_stories(output_path, args.path, args.page_size, args.workers, args.gzip, args.resume,
+                        args.max_retries, args.retry_budget, is_transient_error)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
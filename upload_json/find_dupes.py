@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Detecção de histórias quase duplicadas com MinHash e LSH (Python puro)
+Uso: python find_dupes.py [pastas ou arquivos...] [--threshold 0.7] [--langs pt-br,en] [--output dupes.json]
+
+Para cada idioma, o texto da pista e da resposta vira um conjunto de shingles
+(trincas de palavras). Cada conjunto é resumido em uma assinatura MinHash de
+64 posições, calculada com one permutation hashing densificado: um único hash
+por shingle em vez de 64. As assinaturas são divididas em faixas (LSH) e só
+as histórias que caem no mesmo balde de alguma faixa são comparadas, então o
+custo cresce de forma quase linear com o catálogo.
+
+As assinaturas ficam em cache (.dupes_cache.json) pelo hash do conteúdo de
+cada história, e uma nova execução só calcula as histórias novas ou alteradas.
+O cache é compartilhado entre pastas diferentes: uma entrada só é descartada
+depois de CACHE_MAX_AGE_DAYS dias sem ser usada.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import operator
+import os
+import re
+import struct
+import sys
+import time
+from collections import Counter
+
+from ingest import discover_files, DEFAULT_INCLUDE
+from story_schema import validate_story
+from story_stream import iter_stories
+from sync_manifest import story_hash, id_sort_key
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.dupes_cache.json')
+DEFAULT_LANGUAGES = ('pt-br', 'en')
+DEFAULT_THRESHOLD = 0.7
+TEXT_FIELDS = ('clue_text', 'answer_text')
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Baldes maiores que isso são texto repetido (modelo, placeholder) e são ignorados
+MAX_BUCKET = 500
+SIGNATURE_VERSION = 2
+CACHE_MAX_AGE_DAYS = 30
+
+_WORD = re.compile(r'\w+')
+_MASK = (1 << 64) - 1
+_EMPTY = _MASK
+# Multiplicadores da primeira e da segunda palavra de cada trinca (SHINGLE_SIZE = 3)
+_SHINGLE_K1 = 0x9E3779B97F4A7C15
+_SHINGLE_K2 = 0xC2B2AE3D27D4EB4F
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_PACK = struct.Struct(f'{NUM_PERM}H')
+# Ordem fixa de sondagem de cada posição vazia (densificação ótima)
+_PROBES = [[int.from_bytes(hashlib.blake2b(f'{j}:{attempt}'.encode(), digest_size=8).digest(), 'little') % NUM_PERM
+            for attempt in range(4 * NUM_PERM)] for j in range(NUM_PERM)]
+
+# Hash estável de cada palavra (o hash de str muda a cada processo)
+_word_ids = {}
+
+
+def cache_params():
+    """Parâmetros que invalidam o cache quando mudam"""
+    return {
+        'version': SIGNATURE_VERSION,
+        'num_perm': NUM_PERM,
+        'shingle_size': SHINGLE_SIZE,
+        'fields': list(TEXT_FIELDS),
+    }
+
+
+def _word_id(word):
+    word_id = _word_ids.get(word)
+    if word_id is None:
+        word_id = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+        _word_ids[word] = word_id
+    return word_id
+
+
+def shingles(text):
+    """Conjunto de trincas de palavras (como hashes de 64 bits) de um texto normalizado
+
+    Os ids das palavras já são aleatórios, então cada trinca é combinada com
+    multiplicadores ímpares diferentes por posição: o resultado é o mesmo em
+    qualquer processo e versão do Python, ao contrário do hash() de tuplas.
+    """
+    ids = [_word_id(word) for word in _WORD.findall(text.lower())]
+    if not ids:
+        return set()
+    if len(ids) < SHINGLE_SIZE:
+        ids += [0] * (SHINGLE_SIZE - len(ids))
+    return {(a * _SHINGLE_K1 + b * _SHINGLE_K2 + c) & _MASK for a, b, c in zip(ids, ids[1:], ids[2:])}
+
+
+def minhash(shingle_set):
+    """Assinatura MinHash (bytes) por one permutation hashing com densificação"""
+    mins = [_EMPTY] * NUM_PERM
+    for value in shingle_set:
+        position = value & (NUM_PERM - 1)
+        value >>= _BIN_BITS
+        if value < mins[position]:
+            mins[position] = value
+
+    if _EMPTY in mins:
+        # Posições vazias copiam a primeira posição preenchida da sua ordem de sondagem
+        filled = mins[:]
+        for j, value in enumerate(filled):
+            if value == _EMPTY:
+                mins[j] = next((filled[k] for k in _PROBES[j] if filled[k] != _EMPTY), 0)
+    return _PACK.pack(*(value & 0xFFFF for value in mins))
+
+
+def story_signatures(story_data, languages):
+    """Assinaturas de cada idioma presente na história: {idioma: bytes}"""
+    signatures = {}
+    for lang in languages:
+        lang_data = story_data.get(lang)
+        if not isinstance(lang_data, dict):
+            continue
+        text = ' '.join(lang_data.get(field, '') for field in TEXT_FIELDS if isinstance(lang_data.get(field), str))
+        shingle_set = shingles(text)
+        if shingle_set:
+            signatures[lang] = minhash(shingle_set)
+    return signatures
+
+
+def _signature_task(task):
+    """Calcula as assinaturas de um bloco de histórias (roda em um processo do pool)"""
+    chunk, languages = task
+    return [(content_hash, story_signatures(story_data, languages)) for content_hash, story_data in chunk]
+
+
+def empty_cache():
+    return {'signatures': {}, 'used': {}}
+
+
+def today():
+    """Dia atual (dias desde a época), para a idade das entradas do cache"""
+    return int(time.time() // 86400)
+
+
+def load_cache(cache_path=DEFAULT_CACHE_PATH):
+    """Carrega o cache de assinaturas
+
+    Retorna {'signatures': {hash do conteúdo: {idioma: bytes}}, 'used': {hash
+    do conteúdo: dia do último uso}}.
+    """
+    if not os.path.exists(cache_path):
+        return empty_cache()
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('params') != cache_params():
+        return empty_cache()
+    return {
+        'signatures': {content_hash: {lang: base64.b64decode(sig) for lang, sig in signatures.items()}
+                       for content_hash, signatures in data['signatures'].items()},
+        'used': data.get('used', {}),
+    }
+
+
+def save_cache(cache, cache_path=DEFAULT_CACHE_PATH, max_age_days=CACHE_MAX_AGE_DAYS):
+    """Grava o cache, sem as entradas que não são usadas há mais de max_age_days dias"""
+    oldest = today() - max_age_days
+    kept = [content_hash for content_hash in cache['signatures']
+            if cache['used'].get(content_hash, oldest) >= oldest]
+    data = {
+        'params': cache_params(),
+        'signatures': {content_hash: {lang: base64.b64encode(sig).decode('ascii')
+                                      for lang, sig in cache['signatures'][content_hash].items()}
+                       for content_hash in kept},
+        'used': {content_hash: cache['used'].get(content_hash, oldest) for content_hash in kept},
+    }
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+
+def compute_signatures(stories, languages, cache, workers=None, chunk_size=2000):
+    """Assinaturas de todas as histórias, calculando só as que não estão no cache
+
+    Retorna ({id: {idioma: bytes}}, quantas foram calculadas). As entradas
+    de outras histórias ficam no cache (podem ser de outras pastas); as
+    usadas agora têm o dia do último uso atualizado.
+    """
+    signature_cache = cache['signatures']
+    by_hash = {}
+    id_hashes = {}
+    for story_id, story_data in stories.items():
+        content_hash = story_hash(story_data)
+        id_hashes[story_id] = content_hash
+        if content_hash not in signature_cache or any(lang in story_data and lang not in signature_cache[content_hash]
+                                                      for lang in languages):
+            by_hash[content_hash] = story_data
+
+    missing = list(by_hash.items())
+    chunks = [(missing[i:i + chunk_size], languages) for i in range(0, len(missing), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [_signature_task(chunk) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_signature_task, chunks))
+    for result in results:
+        for content_hash, signatures in result:
+            signature_cache[content_hash] = dict(signature_cache.get(content_hash, {}), **signatures)
+
+    day = today()
+    for content_hash in id_hashes.values():
+        cache['used'][content_hash] = day
+
+    return {story_id: signature_cache[content_hash] for story_id, content_hash in id_hashes.items()}, len(missing)
+
+
+def similarity(signature_a, signature_b):
+    """Fração de posições iguais entre duas assinaturas (estimativa do índice de Jaccard)"""
+    return sum(map(operator.eq, _PACK.unpack(signature_a), _PACK.unpack(signature_b))) / NUM_PERM
+
+
+def find_candidates(signatures, lang):
+    """Pares de ids que caem no mesmo balde em alguma faixa do LSH"""
+    ids = [story_id for story_id, by_lang in signatures.items() if lang in by_lang]
+    lang_signatures = [signatures[story_id][lang] for story_id in ids]
+    band_bytes = ROWS * 2
+
+    candidates = set()
+    skipped = 0
+    for band in range(BANDS):
+        start = band * band_bytes
+        keys = [signature[start:start + band_bytes] for signature in lang_signatures]
+        # A maioria dos baldes tem uma história só: conta primeiro, agrupa só os repetidos
+        repeated = {key for key, count in Counter(keys).items() if count > 1}
+        if not repeated:
+            continue
+        buckets = {}
+        for key, story_id in zip(keys, ids):
+            if key in repeated:
+                buckets.setdefault(key, []).append(story_id)
+        for bucket in buckets.values():
+            if len(bucket) > MAX_BUCKET:
+                skipped += 1
+                continue
+            for i, a in enumerate(bucket):
+                for b in bucket[i + 1:]:
+                    candidates.add((a, b) if a < b else (b, a))
+    return candidates, skipped
+
+
+def find_dupes(signatures, languages, threshold=DEFAULT_THRESHOLD):
+    """Pares acima do limiar em algum idioma, com a similaridade estimada por idioma"""
+    pairs = {}
+    compared = 0
+    skipped_buckets = 0
+    for lang in languages:
+        candidates, skipped = find_candidates(signatures, lang)
+        skipped_buckets += skipped
+        compared += len(candidates)
+        for a, b in candidates:
+            score = similarity(signatures[a][lang], signatures[b][lang])
+            if score >= threshold:
+                pair = pairs.setdefault((a, b), {'a': a, 'b': b, 'similarity': {}})
+                pair['similarity'][lang] = round(score, 3)
+
+    result = sorted(pairs.values(), key=lambda pair: (-max(pair['similarity'].values()),
+                                                      id_sort_key(pair['a']), id_sort_key(pair['b'])))
+    return result, {'candidates': compared, 'skipped_buckets': skipped_buckets}
+
+
+def load_stories_by_id(roots, include=DEFAULT_INCLUDE, exclude=()):
+    """Histórias válidas dos arquivos, por id (a última ocorrência de cada id vence)"""
+    stories = {}
+    for file_path in discover_files(roots, include, exclude):
+        try:
+            for story_data in iter_stories(file_path):
+                if not validate_story(story_data):
+                    stories[str(story_data['id'])] = story_data
+        except Exception as e:
+            print(f"⚠️  Erro ao ler {file_path}: {str(e)}")
+    return stories
+
+
+def title_of(story_data):
+    for lang in ('pt-br', 'en'):
+        if isinstance(story_data.get(lang), dict) and story_data[lang].get('title'):
+            return story_data[lang]['title']
+    return 'Sem título'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Encontra histórias quase duplicadas (MinHash + LSH)')
+    parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    parser.add_argument('--include', help='Padrões glob dos arquivos incluídos, separados por vírgula (padrão: *.json)')
+    parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos, separados por vírgula')
+    parser.add_argument('--langs', help=f'Idiomas comparados, separados por vírgula (padrão: {",".join(DEFAULT_LANGUAGES)})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f'Similaridade mínima, de 0 a 1 (padrão: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--workers', type=int, help='Processos calculando assinaturas (padrão: número de CPUs)')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='Arquivo de cache das assinaturas')
+    parser.add_argument('--no-cache', action='store_true', help='Não ler nem gravar o cache')
+    parser.add_argument('--limit', type=int, default=50, help='Máximo de pares mostrados (padrão: 50)')
+    parser.add_argument('--output', help='Gravar todos os pares em um relatório JSON')
+    args = parser.parse_args(argv)
+
+    languages = [lang.strip() for lang in args.langs.split(',') if lang.strip()] if args.langs else list(DEFAULT_LANGUAGES)
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+
+    start = time.perf_counter()
+    stories = load_stories_by_id(args.roots, include, exclude)
+    read_s = time.perf_counter() - start
+    print(f"📚 {len(stories)} histórias lidas em {read_s:.1f}s")
+
+    cache = empty_cache() if args.no_cache else load_cache(args.cache)
+    start = time.perf_counter()
+    signatures, computed = compute_signatures(stories, languages, cache, args.workers)
+    signatures_s = time.perf_counter() - start
+    print(f"🔢 Assinaturas: {computed} calculadas, {len(stories) - computed} do cache ({signatures_s:.1f}s)")
+    if not args.no_cache:
+        save_cache(cache, args.cache)
+
+    start = time.perf_counter()
+    pairs, stats = find_dupes(signatures, languages, args.threshold)
+    print(f"🪣 {stats['candidates']} pares candidatos no LSH, {len(pairs)} acima de {args.threshold} "
+          f"({time.perf_counter() - start:.1f}s)")
+    if stats['skipped_buckets']:
+        print(f"⚠️  {stats['skipped_buckets']} baldes com mais de {MAX_BUCKET} histórias ignorados (texto repetido)")
+
+    for pair in pairs[:args.limit]:
+        scores = ', '.join(f"{lang} {score:.2f}" for lang, score in sorted(pair['similarity'].items()))
+        print(f"   🔁 {pair['a']} '{title_of(stories[pair['a']])}' ~ {pair['b']} '{title_of(stories[pair['b']])}' ({scores})")
+    if len(pairs) > args.limit:
+        print(f"   ... e mais {len(pairs) - args.limit} pares (use --output para ver todos)")
+
+    if args.output:
+        report = {
+            'threshold': args.threshold,
+            'languages': languages,
+            'stories': len(stories),
+            'pairs': [dict(pair, title_a=title_of(stories[pair['a']]), title_b=title_of(stories[pair['b']]))
+                      for pair in pairs],
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório salvo em {args.output}")
+
+    if not pairs:
+        print("✅ Nenhuma história quase duplicada encontrada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pipeline de imagens das histórias: confere os arquivos, gera variantes e miniaturas
+em WebP com nomes pelo hash do conteúdo e reescreve os campos de imagem
+Uso: python image_pipeline.py historias.json --output historias_otimizadas.json
+
+Campos processados: 'image' da história e 'image_clue' de cada idioma.
+Requer Pillow (pip install Pillow).
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+
+from story_schema import NON_LANGUAGE_FIELDS
+from story_stream import iter_stories
+from upload_journal import file_hash
+
+DEFAULT_IMAGES_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+DEFAULT_OUTPUT_SUBDIR = 'images/optimized'
+CACHE_FILE = '.image_cache.json'
+
+# Largura máxima de cada variante (a altura segue a proporção)
+VARIANTS = {'full': 1080, 'medium': 540, 'thumb': 256}
+WEBP_QUALITY = 80
+
+
+def collect_image_refs(story_data):
+    """Lista os campos de imagem de uma história como (idioma ou None, caminho)"""
+    refs = []
+    if isinstance(story_data.get('image'), str):
+        refs.append((None, story_data['image']))
+    for lang, lang_data in story_data.items():
+        if lang not in NON_LANGUAGE_FIELDS and isinstance(lang_data, dict) and isinstance(lang_data.get('image_clue'), str):
+            refs.append((lang, lang_data['image_clue']))
+    return refs
+
+
+def process_image(task):
+    """Gera as variantes de uma imagem (roda em um processo do pool)
+
+    Retorna o resultado com as variantes geradas, ou 'skipped' se o hash da
+    origem não mudou desde a última execução.
+    """
+    source, images_root, output_dir, cached = task
+    path = os.path.join(images_root, source)
+    if not os.path.isfile(path):
+        return {'source': source, 'error': 'arquivo não encontrado'}
+
+    source_hash = file_hash(path)
+    source_bytes = os.path.getsize(path)
+    if cached and cached.get('hash') == source_hash and all(
+            os.path.exists(os.path.join(images_root, variant['path'])) for variant in cached['variants'].values()):
+        return dict(cached, source=source, skipped=True)
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return {'source': source, 'error': 'Pillow não instalado (pip install Pillow)'}
+
+    try:
+        with Image.open(path) as image:
+            image.load()
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            width, height = image.size
+
+            variants = {}
+            for name, max_width in VARIANTS.items():
+                resized = image
+                if width > max_width:
+                    resized = image.resize((max_width, max(1, round(height * max_width / width))), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+                data = buffer.getvalue()
+
+                # Nome pelo hash do conteúdo: o cliente pode guardar em cache para sempre
+                name_hash = hashlib.sha256(data).hexdigest()[:16]
+                relative = f'{output_dir}/{name_hash}.webp'
+                target = os.path.join(images_root, relative)
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'wb') as f:
+                        f.write(data)
+                variants[name] = {'path': relative, 'bytes': len(data), 'size': list(resized.size)}
+    except Exception as e:
+        return {'source': source, 'error': f'falha ao processar imagem: {e}'}
+
+    return {'source': source, 'hash': source_hash, 'bytes': source_bytes,
+            'size': [width, height], 'variants': variants, 'skipped': False}
+
+
+def load_cache(images_root, output_dir):
+    path = os.path.join(images_root, output_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cache(cache, images_root, output_dir):
+    path = os.path.join(images_root, output_dir, CACHE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def process_images(sources, images_root=DEFAULT_IMAGES_ROOT, output_dir=DEFAULT_OUTPUT_SUBDIR, workers=None):
+    """Processa as imagens em um pool de processos; retorna {origem: resultado}"""
+    cache = load_cache(images_root, output_dir)
+    tasks = [(source, images_root, output_dir, cache.get(source)) for source in sorted(sources)]
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [process_image(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process_image, tasks))
+
+    for result in results:
+        if 'error' not in result:
+            cache[result['source']] = {key: result[key] for key in ('hash', 'bytes', 'size', 'variants')}
+    save_cache(cache, images_root, output_dir)
+    return {result['source']: result for result in results}
+
+
+def rewrite_story_images(story_data, results, variant='full'):
+    """Troca os campos de imagem pela variante escolhida e adiciona image_thumb"""
+    story = dict(story_data)
+    result = results.get(story.get('image'))
+    if result and 'variants' in result:
+        story['image'] = result['variants'][variant]['path']
+        story['image_thumb'] = result['variants']['thumb']['path']
+
+    for lang, lang_data in story_data.items():
+        if lang in NON_LANGUAGE_FIELDS or not isinstance(lang_data, dict):
+            continue
+        result = results.get(lang_data.get('image_clue'))
+        if result and 'variants' in result:
+            story[lang] = dict(lang_data, image_clue=result['variants'][variant]['path'])
+    return story
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pipeline de imagens das histórias')
+    parser.add_argument('files', nargs='+', help='Arquivos JSON de histórias')
+    parser.add_argument('--images-root', default=DEFAULT_IMAGES_ROOT, help='Pasta base dos caminhos de imagem (padrão: assets/)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_SUBDIR, help=f'Subpasta das variantes geradas (padrão: {DEFAULT_OUTPUT_SUBDIR})')
+    parser.add_argument('--variant', choices=sorted(VARIANTS), default='full', help='Variante usada nos campos image/image_clue (padrão: full)')
+    parser.add_argument('--output', help='Arquivo JSON com as histórias reescritas')
+    parser.add_argument('--check', action='store_true', help='Só conferir se as imagens existem e mostrar os tamanhos')
+    parser.add_argument('--workers', type=int, help='Número de processos (padrão: número de CPUs)')
+    args = parser.parse_args(argv)
+
+    stories = [story for file_path in args.files for story in iter_stories(file_path)]
+    sources = {path for story in stories if isinstance(story, dict) for _, path in collect_image_refs(story)}
+    print(f"🖼️  {len(sources)} imagens referenciadas em {len(stories)} histórias")
+
+    if args.check:
+        missing = 0
+        for source in sorted(sources):
+            path = os.path.join(args.images_root, source)
+            if os.path.isfile(path):
+                print(f"   ✅ {source} ({os.path.getsize(path)} bytes)")
+            else:
+                missing += 1
+                print(f"   ❌ {source}: arquivo não encontrado")
+        return 1 if missing else 0
+
+    results = process_images(sources, args.images_root, args.output_dir, args.workers)
+
+    errors = [result for result in results.values() if 'error' in result]
+    skipped = sum(1 for result in results.values() if result.get('skipped'))
+    source_bytes = sum(result['bytes'] for result in results.values() if 'error' not in result)
+    variant_bytes = sum(result['variants'][args.variant]['bytes'] for result in results.values() if 'error' not in result)
+    for result in errors:
+        print(f"   ❌ {result['source']}: {result['error']}")
+    print(f"📊 {len(results) - len(errors) - skipped} processadas, {skipped} sem alteração, {len(errors)} com erro")
+    print(f"   - Origem: {source_bytes} bytes, variante '{args.variant}': {variant_bytes} bytes")
+
+    if args.output:
+        rewritten = [rewrite_story_images(story, results, args.variant) for story in stories]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'stories': rewritten}, f, ensure_ascii=False, indent=2)
+        print(f"📝 Histórias com os novos caminhos de imagem salvas em {args.output}")
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
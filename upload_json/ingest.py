@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Ingestão de vários arquivos de histórias: descoberta recursiva, leitura e
+validação em paralelo (processos), detecção de ids repetidos entre arquivos
+e estado local com o hash de cada arquivo já enviado
+
+As escritas não acontecem aqui: o processo principal recebe as histórias
+válidas e envia tudo por uma única conexão (ver upload_all_json_files em
+upload_stories_v2.py).
+"""
+
+import fnmatch
+import json
+import os
+import time
+
+from story_schema import validate_story, validate_upload_data, rule_fields
+from story_stream import iter_stories
+from validate_stories import IGNORED_FILES
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ingest_state.json')
+DEFAULT_INCLUDE = ('*.json',)
+STATE_VERSION = 1
+
+
+def _matches(relative_path, patterns):
+    """Confere o caminho relativo (com /) e o nome do arquivo contra os padrões glob"""
+    name = relative_path.rsplit('/', 1)[-1]
+    return any(fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def is_included(relative_path, include=DEFAULT_INCLUDE, exclude=()):
+    """Indica se um arquivo (caminho relativo à raiz) entra na ingestão"""
+    parts = relative_path.split('/')
+    if any(part.startswith('.') for part in parts) or parts[-1] in IGNORED_FILES:
+        return False
+    if any(_matches('/'.join(parts[:i]), exclude) for i in range(1, len(parts))):
+        return False
+    return _matches(relative_path, include or DEFAULT_INCLUDE) and not _matches(relative_path, exclude or ())
+
+
+def discover_files(roots, include=DEFAULT_INCLUDE, exclude=()):
+    """Lista os arquivos de histórias sob as pastas, recursivamente e em ordem estável
+
+    Arquivos e pastas ocultos e os arquivos de configuração do Firebase são
+    sempre ignorados. Pastas que casam com `exclude` não são percorridas.
+    """
+    include = tuple(include or DEFAULT_INCLUDE)
+    exclude = tuple(exclude or ())
+    files = []
+    for root in roots:
+        if os.path.isfile(root):
+            files.append(os.path.normpath(root))
+            continue
+        for current, dirs, names in os.walk(root):
+            relative_dir = os.path.relpath(current, root).replace(os.sep, '/')
+            prefix = '' if relative_dir == '.' else relative_dir + '/'
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and not _matches(prefix + d, exclude))
+            for name in sorted(names):
+                if is_included(prefix + name, include, exclude):
+                    files.append(os.path.normpath(os.path.join(current, name)))
+    # Um arquivo pode aparecer por mais de uma raiz
+    return list(dict.fromkeys(files))
+
+
+def parse_file(task):
+    """Lê e valida um arquivo (roda em um processo do pool)
+
+    Retorna o caminho, o hash, as histórias válidas e os erros das inválidas.
+    """
+    path, digest = task
+    start = time.perf_counter()
+    result = {'path': path, 'hash': digest, 'stories': [], 'errors': [], 'bytes': 0}
+    try:
+        result['bytes'] = os.path.getsize(path)
+        for index, story in enumerate(iter_stories(path)):
+            errors = validate_story(story)
+            if not errors:
+                errors = validate_upload_data(dict(story, **rule_fields(story)))
+            if errors:
+                story_id = story.get('id') if isinstance(story, dict) else None
+                result['errors'].append({'index': index, 'id': story_id, 'errors': errors})
+            else:
+                result['stories'].append(story)
+    except Exception as e:
+        result['error'] = str(e)
+    result['elapsed_s'] = time.perf_counter() - start
+    return result
+
+
+def parse_files(tasks, workers=None):
+    """Lê e valida os arquivos em um pool de processos, mantendo a ordem dos arquivos"""
+    if workers == 1 or len(tasks) <= 1:
+        return [parse_file(task) for task in tasks]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_file, tasks))
+
+
+def find_duplicate_ids(ids_by_file):
+    """Ids que aparecem mais de uma vez; retorna {id: [arquivos]} (um arquivo repete se o id repetir nele)"""
+    seen = {}
+    for path, ids in ids_by_file.items():
+        for story_id in ids:
+            seen.setdefault(str(story_id), []).append(path)
+    return {story_id: paths for story_id, paths in seen.items() if len(paths) > 1}
+
+
+def state_key(path):
+    return os.path.abspath(path)
+
+
+def load_state(state_path=DEFAULT_STATE_PATH):
+    """Carrega o estado da ingestão (arquivo -> hash e ids enviados)"""
+    if not os.path.exists(state_path):
+        return {'version': STATE_VERSION, 'files': {}}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return {'version': STATE_VERSION, 'files': {}}
+    return state
+
+
+def save_state(state, state_path=DEFAULT_STATE_PATH):
+    """Grava o estado de forma atômica (arquivo temporário + rename)"""
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
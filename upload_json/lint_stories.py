@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Revisão dos textos das histórias com regras plugáveis, em paralelo e com cache
+Uso: python lint_stories.py [pastas ou arquivos...] [--langs pt-br,en,es,fr] [--fix] [--output lint.json]
+
+Cada regra olha um texto (título, pista ou resposta) de um idioma e pode
+ter uma correção automática:
+
+  unicode-nfc    texto fora da forma Unicode NFC (acentos decompostos)
+  whitespace     espaços nas pontas, repetidos, antes de vírgula/ponto ou
+                 caracteres invisíveis
+  mixed-quotes   aspas e apóstrofos retos misturados com tipográficos
+                 (qu'il e qu’il no mesmo texto)
+  empty-text     tradução com texto vazio (sem correção)
+  title-length   título maior que --max-title caracteres (sem correção)
+
+Novas regras são registradas com @rule (e @fixer para a correção) em
+qualquer módulo passado com --plugin.
+
+O resultado de cada história fica em cache (.lint_cache.json) pelo hash do
+conteúdo, junto com as versões das regras e as opções; mudar uma regra
+invalida o cache. Arquivos com o mesmo tamanho e data de modificação nem são
+relidos, então uma nova execução só revisa as histórias alteradas. As
+histórias que faltam são revisadas em um pool de processos.
+
+Com --fix, as correções automáticas são gravadas nos arquivos: arquivos JSON
+são reescritos (de forma atômica) e arquivos .ndjson recebem a nova versão
+da história no final, como no adicionar_historia.py.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+from ingest import discover_files, DEFAULT_INCLUDE
+from story_schema import NON_LANGUAGE_FIELDS
+from story_stream import iter_stories
+from sync_manifest import story_hash
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.lint_cache.json')
+DEFAULT_LANGUAGES = ('pt-br', 'en', 'es', 'fr')
+DEFAULT_MAX_TITLE = 60
+TEXT_FIELDS = ('title', 'clue_text', 'answer_text')
+REPORT_FORMAT = 1
+# Mudanças no motor (não em uma regra específica) invalidam todo o cache
+RULESET_VERSION = 1
+
+# Código -> regra, na ordem em que as correções são aplicadas
+RULES = {}
+
+
+def rule(code, version=1, fields=TEXT_FIELDS):
+    """Registra uma regra: check(texto, idioma, campo, opções) -> [mensagens]
+
+    Aumente `version` sempre que o resultado da regra mudar, para invalidar
+    o cache.
+    """
+    def register(check):
+        RULES[code] = {'code': code, 'version': version, 'fields': tuple(fields), 'check': check, 'fix': None}
+        return check
+    return register
+
+
+def fixer(code):
+    """Registra a correção automática da regra: fix(texto, idioma, campo, opções) -> texto"""
+    def register(fix):
+        RULES[code]['fix'] = fix
+        return fix
+    return register
+
+
+# Regras padrão
+
+_INVISIBLE = re.compile('[\u200b\u200c\u200d\u2060\ufeff]')
+_REPEATED_SPACES = re.compile(r'[ \t\u00a0]{2,}|\t')
+_SPACE_BEFORE_PUNCTUATION = re.compile(r'[ \t]+(,|\.(?!\.))')
+_TRAILING_LINE_SPACES = re.compile(r'[ \t]+\n|\n[ \t]+')
+_STRAIGHT_QUOTES = re.compile('[\'"]')
+_CURLY_QUOTES = re.compile('[‘’“”]')
+_OPENING_CONTEXT = re.compile(r'[\s(\[{«—–-]')
+# Filtro rápido: quase todos os textos não têm nada disso e pulam as regex acima
+_UNUSUAL_WHITESPACE = re.compile('[\t\u00a0\u200b\u200c\u200d\u2060\ufeff]')
+_SUSPECT_PAIRS = ('  ', ' ,', ' .', ' \n', '\n ')
+
+
+@rule('unicode-nfc')
+def check_nfc(text, lang, field, options):
+    if unicodedata.is_normalized('NFC', text):
+        return []
+    return ['texto fora da forma Unicode NFC']
+
+
+@fixer('unicode-nfc')
+def fix_nfc(text, lang, field, options):
+    return unicodedata.normalize('NFC', text)
+
+
+@rule('whitespace')
+def check_whitespace(text, lang, field, options):
+    if (text == text.strip() and not _UNUSUAL_WHITESPACE.search(text)
+            and not any(pair in text for pair in _SUSPECT_PAIRS)):
+        return []
+    problems = []
+    if text != text.strip():
+        problems.append('espaços no início ou no fim')
+    if _REPEATED_SPACES.search(text) or _TRAILING_LINE_SPACES.search(text):
+        problems.append('espaços repetidos ou tabulação')
+    if _SPACE_BEFORE_PUNCTUATION.search(text):
+        problems.append('espaço antes de vírgula ou ponto')
+    invisible = sorted({f'U+{ord(char):04X}' for char in _INVISIBLE.findall(text)})
+    if invisible:
+        problems.append(f"caracteres invisíveis ({', '.join(invisible)})")
+    return problems
+
+
+@fixer('whitespace')
+def fix_whitespace(text, lang, field, options):
+    text = _INVISIBLE.sub('', text)
+    text = _TRAILING_LINE_SPACES.sub('\n', text)
+    text = _REPEATED_SPACES.sub(' ', text)
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)
+    return text.strip()
+
+
+@rule('mixed-quotes')
+def check_quotes(text, lang, field, options):
+    if _STRAIGHT_QUOTES.search(text) and _CURLY_QUOTES.search(text):
+        return ['aspas/apóstrofos retos misturados com tipográficos']
+    return []
+
+
+@fixer('mixed-quotes')
+def fix_quotes(text, lang, field, options):
+    """Troca as aspas e apóstrofos retos pelos tipográficos"""
+    chars = list(text)
+    for i, char in enumerate(chars):
+        if char not in '\'"':
+            continue
+        opening = i == 0 or bool(_OPENING_CONTEXT.match(chars[i - 1]))
+        if char == '"':
+            chars[i] = '“' if opening else '”'
+        else:
+            # Apóstrofo (qu'il, d'água) ou aspas simples de fechamento
+            chars[i] = '‘' if opening and i + 1 < len(chars) and not chars[i + 1].isspace() else '’'
+    return ''.join(chars)
+
+
+@rule('empty-text')
+def check_empty(text, lang, field, options):
+    return [] if text.strip() else ['texto vazio']
+
+
+@rule('title-length', fields=('title',))
+def check_title_length(text, lang, field, options):
+    length = len(unicodedata.normalize('NFC', text).strip())
+    if length > options['max_title']:
+        return [f"título com {length} caracteres (máximo {options['max_title']})"]
+    return []
+
+
+# Motor
+
+def load_plugins(modules):
+    """Importa os módulos que registram regras extras"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+def select_rules(enabled=None, disabled=()):
+    """Códigos das regras ativas, na ordem de registro"""
+    unknown = [code for code in [*(enabled or ()), *disabled] if code not in RULES]
+    if unknown:
+        raise ValueError(f"Regras desconhecidas: {', '.join(unknown)} (disponíveis: {', '.join(RULES)})")
+    return [code for code in RULES if (not enabled or code in enabled) and code not in disabled]
+
+
+def cache_params(codes, languages, options, plugins=()):
+    """Parâmetros que invalidam o cache quando mudam"""
+    return {
+        'ruleset': RULESET_VERSION,
+        'rules': {code: RULES[code]['version'] for code in codes},
+        'languages': list(languages),
+        'options': options,
+        'plugins': list(plugins),
+    }
+
+
+def story_texts(story_data, languages):
+    """(idioma, campo, texto) de cada texto revisado da história"""
+    if not isinstance(story_data, dict):
+        return
+    for lang in languages:
+        lang_data = story_data.get(lang)
+        if lang in NON_LANGUAGE_FIELDS or not isinstance(lang_data, dict):
+            continue
+        for field in TEXT_FIELDS:
+            if isinstance(lang_data.get(field), str):
+                yield lang, field, lang_data[field]
+
+
+def lint_story(story_data, codes, languages, options):
+    """Problemas de uma história: [{'lang', 'field', 'rule', 'message', 'fixable'}]"""
+    issues = []
+    for lang, field, text in story_texts(story_data, languages):
+        for code in codes:
+            current = RULES[code]
+            if field not in current['fields']:
+                continue
+            for message in current['check'](text, lang, field, options):
+                issues.append({'lang': lang, 'field': field, 'rule': code, 'message': message,
+                               'fixable': current['fix'] is not None})
+    return issues
+
+
+def fix_story(story_data, codes, languages, options):
+    """Cópia da história com as correções automáticas aplicadas (ou a mesma, se nada mudou)"""
+    fixed = story_data
+    for lang, field, text in story_texts(story_data, languages):
+        new_text = text
+        for code in codes:
+            current = RULES[code]
+            if current['fix'] and field in current['fields'] and current['check'](new_text, lang, field, options):
+                new_text = current['fix'](new_text, lang, field, options)
+        if new_text != text:
+            if fixed is story_data:
+                fixed = dict(story_data)
+            fixed[lang] = dict(fixed[lang], **{field: new_text})
+    return fixed
+
+
+def _lint_task(task):
+    """Revisa um bloco de histórias (roda em um processo do pool)"""
+    chunk, codes, languages, options, plugins = task
+    load_plugins(plugins)
+    return [(content_hash, lint_story(story_data, codes, languages, options)) for content_hash, story_data in chunk]
+
+
+def lint_many(stories, codes, languages, options, plugins=(), workers=None, chunk_size=2000):
+    """Revisa {hash: história} em blocos, em um pool de processos; retorna {hash: problemas}"""
+    items = list(stories.items())
+    chunks = [(items[i:i + chunk_size], codes, languages, options, plugins) for i in range(0, len(items), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [_lint_task(chunk) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_lint_task, chunks))
+    return {content_hash: issues for result in results for content_hash, issues in result}
+
+
+def load_cache(params, cache_path=DEFAULT_CACHE_PATH):
+    """Carrega o cache; retorna {'files': {...}, 'results': {hash: problemas}}"""
+    empty = {'files': {}, 'results': {}}
+    if not cache_path or not os.path.exists(cache_path):
+        return empty
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError:
+        return empty
+    if data.get('params') != params:
+        return empty
+    return {'files': data['files'], 'results': data['results']}
+
+
+def save_cache(cache, params, cache_path=DEFAULT_CACHE_PATH):
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'params': params, 'files': cache['files'], 'results': cache['results']}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def scan_files(files, cache):
+    """Lista (arquivo, id, hash) de todas as histórias e as histórias que faltam revisar
+
+    Arquivos sem mudança (tamanho e data) com todos os resultados em cache
+    não são relidos. Retorna (entradas, {hash: história}, erros de leitura,
+    entradas de arquivo para o cache).
+    """
+    entries = []
+    missing = {}
+    errors = []
+    files_cache = {}
+    for file_path in files:
+        key = os.path.abspath(file_path)
+        signature = file_signature(file_path)
+        cached = cache['files'].get(key)
+        if (cached and cached['size'] == signature['size'] and cached['mtime_ns'] == signature['mtime_ns']
+                and all(content_hash in cache['results'] for _, content_hash in cached['stories'])):
+            files_cache[key] = cached
+            entries.extend((file_path, story_id, content_hash) for story_id, content_hash in cached['stories'])
+            continue
+
+        stories = []
+        try:
+            for story_data in iter_stories(file_path):
+                content_hash = story_hash(story_data)
+                story_id = story_data.get('id') if isinstance(story_data, dict) else None
+                stories.append([story_id, content_hash])
+                if content_hash not in cache['results']:
+                    missing[content_hash] = story_data
+        except Exception as e:
+            errors.append({'path': file_path, 'error': str(e)})
+            continue
+        files_cache[key] = dict(signature, stories=stories)
+        entries.extend((file_path, story_id, content_hash) for story_id, content_hash in stories)
+    return entries, missing, errors, files_cache
+
+
+def rewrite_json_file(file_path, fix):
+    """Reescreve um arquivo JSON de histórias aplicando fix(história); retorna quantas mudaram"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        stories = data
+    elif isinstance(data, dict) and isinstance(data.get('stories'), list):
+        stories = data['stories']
+    else:
+        stories = None
+
+    changed = 0
+    if stories is None:
+        fixed = fix(data)
+        changed = int(fixed is not data)
+        data = fixed
+    else:
+        for index, story_data in enumerate(stories):
+            fixed = fix(story_data)
+            if fixed is not story_data:
+                stories[index] = fixed
+                changed += 1
+    if changed:
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, file_path)
+    return changed
+
+
+def append_ndjson_fixes(file_path, fix):
+    """Acrescenta a versão corrigida das histórias de um .ndjson; retorna quantas mudaram"""
+    from story_store import StoryStore, compact_in_background
+
+    store = StoryStore(file_path)
+    fixed_stories = []
+    for story_data in store.iter_stories():
+        fixed = fix(story_data)
+        if fixed is not story_data:
+            fixed_stories.append(fixed)
+    for fixed in fixed_stories:
+        store.append(fixed)
+    if fixed_stories and store.needs_compaction():
+        compact_in_background(store.path)
+    return len(fixed_stories)
+
+
+def apply_fixes(entries, results, codes, languages, options):
+    """Grava as correções automáticas nos arquivos; retorna {arquivo: histórias corrigidas}"""
+    fixable = {}
+    for file_path, _, content_hash in entries:
+        if any(issue['fixable'] for issue in results[content_hash]):
+            fixable.setdefault(file_path, set()).add(content_hash)
+
+    fixed_by_file = {}
+    for file_path, hashes in fixable.items():
+        def fix(story_data):
+            if story_hash(story_data) not in hashes:
+                return story_data
+            return fix_story(story_data, codes, languages, options)
+        if file_path.endswith('.ndjson'):
+            changed = append_ndjson_fixes(file_path, fix)
+        else:
+            changed = rewrite_json_file(file_path, fix)
+        if changed:
+            fixed_by_file[file_path] = changed
+    return fixed_by_file
+
+
+def lint_paths(roots, include=DEFAULT_INCLUDE, exclude=(), languages=DEFAULT_LANGUAGES, codes=None,
+               options=None, plugins=(), workers=None, fix=False, cache_path=DEFAULT_CACHE_PATH):
+    """Revisa as histórias dos caminhos; retorna o relatório (e aplica as correções com fix=True)"""
+    start = time.perf_counter()
+    load_plugins(plugins)
+    codes = list(codes or RULES)
+    options = dict({'max_title': DEFAULT_MAX_TITLE}, **(options or {}))
+    params = cache_params(codes, languages, options, plugins)
+    cache = load_cache(params, cache_path)
+
+    files = discover_files(roots, include, exclude)
+    entries, missing, read_errors, files_cache = scan_files(files, cache)
+    cache['results'].update(lint_many(missing, codes, languages, options, plugins, workers))
+    linted = set(missing)
+
+    fixed_by_file = {}
+    if fix:
+        fixed_by_file = apply_fixes(entries, cache['results'], codes, languages, options)
+        if fixed_by_file:
+            # Só os arquivos corrigidos são relidos (o tamanho e a data mudaram)
+            new_entries, missing, errors, fixed_cache = scan_files(list(fixed_by_file), cache)
+            cache['results'].update(lint_many(missing, codes, languages, options, plugins, workers))
+            linted.update(missing)
+            read_errors.extend(errors)
+            files_cache.update(fixed_cache)
+            order = {file_path: index for index, file_path in enumerate(files)}
+            entries = sorted([entry for entry in entries if entry[0] not in fixed_by_file] + new_entries,
+                             key=lambda entry: order[entry[0]])
+
+    # Descarta os resultados que não pertencem a nenhuma história atual
+    current = {content_hash for _, _, content_hash in entries}
+    cache = {'files': files_cache,
+             'results': {content_hash: issues for content_hash, issues in cache['results'].items() if content_hash in current}}
+    if cache_path:
+        save_cache(cache, params, cache_path)
+
+    stories = []
+    by_rule = {}
+    for file_path, story_id, content_hash in entries:
+        issues = cache['results'][content_hash]
+        if issues:
+            stories.append({'path': file_path, 'id': story_id, 'issues': issues})
+        for issue in issues:
+            by_rule[issue['rule']] = by_rule.get(issue['rule'], 0) + 1
+
+    totals = {
+        'files': len(files),
+        'stories': len(entries),
+        'linted': sum(1 for _, _, content_hash in entries if content_hash in linted),
+        'from_cache': sum(1 for _, _, content_hash in entries if content_hash not in linted),
+        'stories_with_issues': len(stories),
+        'issues': sum(by_rule.values()),
+        'fixable': sum(1 for story in stories for issue in story['issues'] if issue['fixable']),
+        'fixed_stories': sum(fixed_by_file.values()),
+        'unreadable_files': len(read_errors),
+    }
+    return {
+        'format': REPORT_FORMAT,
+        'params': params,
+        'totals': totals,
+        'by_rule': dict(sorted(by_rule.items())),
+        'elapsed_s': round(time.perf_counter() - start, 3),
+        'fixed_files': fixed_by_file,
+        'read_errors': read_errors,
+        'stories': stories,
+    }
+
+
+def print_report(report, limit):
+    totals = report['totals']
+    print(f"🔎 {totals['stories']} histórias em {totals['files']} arquivos: {totals['linted']} revisadas, "
+          f"{totals['from_cache']} do cache ({report['elapsed_s']}s)")
+    for error in report['read_errors']:
+        print(f"   ❌ {error['path']}: {error['error']}")
+    for file_path, count in report['fixed_files'].items():
+        print(f"   🔧 {file_path}: {count} histórias corrigidas")
+    if not totals['issues']:
+        print("✅ Nenhum problema encontrado")
+        return
+    print(f"⚠️  {totals['issues']} problemas em {totals['stories_with_issues']} histórias "
+          f"({totals['fixable']} com correção automática)")
+    for code, count in report['by_rule'].items():
+        print(f"   - {code}: {count}")
+    shown = 0
+    for story in report['stories']:
+        for issue in story['issues']:
+            if shown == limit:
+                print(f"   ... (use --output para ver todos)")
+                return
+            mark = '🔧' if issue['fixable'] else '✏️ '
+            print(f"   {mark} {story['id']} [{issue['lang']}.{issue['field']}] {issue['rule']}: {issue['message']}")
+            shown += 1
+    if totals['fixable'] and not report['fixed_files']:
+        print("💡 Use --fix para aplicar as correções automáticas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Revisão dos textos das histórias (regras plugáveis, com cache)')
+    parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    parser.add_argument('--include', help='Padrões glob dos arquivos incluídos, separados por vírgula (padrão: *.json)')
+    parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos, separados por vírgula')
+    parser.add_argument('--langs', help=f'Idiomas revisados, separados por vírgula (padrão: {",".join(DEFAULT_LANGUAGES)})')
+    parser.add_argument('--rules', help='Só estas regras, separadas por vírgula (padrão: todas)')
+    parser.add_argument('--disable', help='Regras desligadas, separadas por vírgula')
+    parser.add_argument('--plugin', action='append', default=[], help='Módulo com regras extras (@rule/@fixer); pode repetir')
+    parser.add_argument('--max-title', type=int, default=DEFAULT_MAX_TITLE, help=f'Tamanho máximo do título (padrão: {DEFAULT_MAX_TITLE})')
+    parser.add_argument('--fix', action='store_true', help='Gravar as correções automáticas nos arquivos')
+    parser.add_argument('--workers', type=int, help='Número de processos (padrão: número de CPUs)')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='Arquivo de cache dos resultados')
+    parser.add_argument('--no-cache', action='store_true', help='Não ler nem gravar o cache')
+    parser.add_argument('--list-rules', action='store_true', help='Mostrar as regras disponíveis e sair')
+    parser.add_argument('--limit', type=int, default=30, help='Máximo de problemas mostrados (padrão: 30)')
+    parser.add_argument('--output', help='Gravar o relatório JSON completo neste arquivo')
+    args = parser.parse_args(argv)
+
+    load_plugins(args.plugin)
+    if args.list_rules:
+        for code, current in RULES.items():
+            fix = 'com correção' if current['fix'] else 'sem correção'
+            print(f"   {code} (v{current['version']}, {fix}, campos: {', '.join(current['fields'])})")
+        return 0
+
+    split = lambda value: [item.strip() for item in value.split(',') if item.strip()] if value else []
+    try:
+        codes = select_rules(split(args.rules), split(args.disable))
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        return 2
+    languages = split(args.langs) or list(DEFAULT_LANGUAGES)
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+
+    report = lint_paths(args.roots, include, exclude, languages, codes, {'max_title': args.max_title},
+                        args.plugin, args.workers, args.fix, None if args.no_cache else args.cache)
+    print_report(report, args.limit)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Relatório salvo em {args.output}")
+
+    totals = report['totals']
+    return 1 if totals['issues'] or totals['unreadable_files'] else 0
+
+
+if __name__ == "__main__":
+    # Plugins importam `lint_stories`; o registro tem que ser o deste módulo
+    sys.modules.setdefault('lint_stories', sys.modules[__name__])
+    sys.exit(main())
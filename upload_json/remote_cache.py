@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Cache local do catálogo remoto (nó stories) para os comandos só de leitura
+Uso:
+  python remote_cache.py status
+  python remote_cache.py list [--level 1] [--lang fr] [--limit 50]
+  python remote_cache.py stats
+  python remote_cache.py diff [pastas ou arquivos...]
+Opções comuns: --max-age 300, --refresh, --backend local --local-db arquivo.json
+
+O nó fica salvo em .remote_cache/ junto com o ETag do Realtime Database e o
+horário da última validação. Enquanto o cache for mais novo que --max-age
+segundos, os comandos respondem sem acessar a rede (nem carregar o SDK do
+Firebase). Depois disso, uma leitura condicional (If-None-Match) confirma o
+cache sem baixar nada, ou baixa o nó inteiro se ele mudou. --refresh força
+essa validação.
+
+As escritas bem-sucedidas dos outros scripts (via backend_from_args) também
+são aplicadas ao cache ao final da execução. Elas não trazem o ETag novo,
+então a próxima validação baixa o nó de novo; até lá, o cache continua
+valendo pelo --max-age. Se o processo cair antes de aplicar as escritas, o
+cache fica marcado como sujo e é validado na próxima leitura.
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from storage_backend import LocalBackend, add_backend_arguments, backend_from_args, get_backend, key_order
+from story_store import lock_file, unlock_file
+from upload_engine import RetryBudget, UploadStats, call_with_retries, DEFAULT_MAX_RETRIES
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.remote_cache')
+DEFAULT_PATH = 'stories'
+DEFAULT_MAX_AGE = 300
+CACHE_FORMAT = 1
+# Campos gravados pelo upload que não vêm dos arquivos de histórias
+UPLOAD_ONLY_FIELDS = ('created_at', 'updated_at')
+
+
+def path_parts(path):
+    return [part for part in str(path).strip('/').split('/') if part]
+
+
+def normalize_node(value):
+    """Filhos do nó como dicionário (chaves inteiras densas podem voltar como lista)"""
+    if isinstance(value, list):
+        return {str(key): item for key, item in enumerate(value) if item is not None}
+    return dict(value or {})
+
+
+def max_numeric_key(node):
+    return max((int(key) for key in node if key.lstrip('-').isdigit()), default=0)
+
+
+class RemoteCache:
+    """Cópia local de um nó do banco `source`, com o ETag da última leitura
+
+    {hash}.json       a árvore com só o nó em cache (mesmo formato do --local-db)
+    {hash}.meta.json  fonte, caminho, ETag, horários, contagem, maior id e
+                      a marca de escritas ainda não aplicadas
+    """
+
+    def __init__(self, source, path=DEFAULT_PATH, cache_dir=DEFAULT_CACHE_DIR):
+        self.source = source
+        self.path = '/'.join(path_parts(path))
+        self.parts = path_parts(path)
+        self.cache_dir = cache_dir
+        name = hashlib.sha256(f'{source}\n{self.path}'.encode('utf-8')).hexdigest()[:16]
+        self.data_path = os.path.join(cache_dir, name + '.json')
+        self.meta_path = os.path.join(cache_dir, name + '.meta.json')
+        self.lock_path = os.path.join(cache_dir, name + '.lock')
+        self._was_dirty = None
+
+    @contextmanager
+    def locked(self):
+        """Lock exclusivo entre processos para gravar o cache"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_handle:
+            lock_file(lock_handle)
+            try:
+                yield
+            finally:
+                unlock_file(lock_handle)
+
+    def covers(self, path):
+        """Indica se uma escrita em `path` altera o nó em cache"""
+        parts = path_parts(path)
+        size = min(len(parts), len(self.parts))
+        return parts[:size] == self.parts[:size]
+
+    # Leitura
+
+    def meta(self):
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.data_path):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except ValueError:
+            return None
+        if meta.get('format') != CACHE_FORMAT or meta.get('source') != self.source or meta.get('path') != self.path:
+            return None
+        return meta
+
+    def age(self, meta=None):
+        meta = meta or self.meta()
+        return time.time() - meta['validated_at'] if meta else None
+
+    def is_fresh(self, max_age):
+        meta = self.meta()
+        return bool(meta) and not meta.get('dirty') and self.age(meta) <= max_age
+
+    def load(self):
+        """Filhos do nó em cache (sem acessar a rede)"""
+        with open(self.data_path, 'r', encoding='utf-8') as f:
+            node = json.load(f)
+        for part in self.parts:
+            node = node.get(part) if isinstance(node, dict) else None
+        return normalize_node(node)
+
+    # Gravação
+
+    def _write_json(self, path, data):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _save(self, node, meta):
+        """Grava os dados e depois o meta (um meta velho só força outra validação)"""
+        tree = node or None
+        for part in reversed(self.parts):
+            tree = {part: tree} if tree is not None else None
+        self._write_json(self.data_path, tree)
+        meta.update(count=len(node), max_id=max_numeric_key(node))
+        self._write_json(self.meta_path, meta)
+
+    def revalidate(self, is_transient=lambda e: True, max_retries=DEFAULT_MAX_RETRIES):
+        """Confirma o cache com uma leitura condicional; retorna (baixou, filhos do nó)"""
+        meta = self.meta()
+        budget = RetryBudget(max_retries)
+        if meta and meta.get('etag'):
+            changed, value, etag = call_with_retries(lambda etag: get_backend().get_if_changed(self.path, etag),
+                                                     meta['etag'], UploadStats(), budget, is_transient, max_retries)
+        else:
+            changed = True
+            value, etag = call_with_retries(get_backend().get_with_etag, self.path, UploadStats(), budget,
+                                            is_transient, max_retries)
+
+        now = time.time()
+        with self.locked():
+            if not changed:
+                # Se outro processo baixou o nó de novo nesse meio tempo, o meta dele vale
+                current = self.meta() or meta
+                if current.get('etag') == meta['etag']:
+                    current.update(validated_at=now, dirty=False)
+                    self._write_json(self.meta_path, current)
+                return False, self.load()
+            node = normalize_node(value)
+            self._save(node, {'format': CACHE_FORMAT, 'source': self.source, 'path': self.path, 'etag': etag,
+                              'fetched_at': now, 'validated_at': now, 'dirty': False})
+        return True, node
+
+    def mark_dirty(self):
+        """Marca que há escritas deste processo ainda não aplicadas"""
+        with self.locked():
+            meta = self.meta()
+            if not meta:
+                return
+            self._was_dirty = bool(meta.get('dirty'))
+            meta['dirty'] = True
+            self._write_json(self.meta_path, meta)
+
+    def apply_writes(self, writes):
+        """Aplica escritas [(caminho, valor)] já confirmadas pelo banco ao cache em disco"""
+        with self.locked():
+            meta = self.meta()
+            if not meta:
+                return
+            # O cache em disco pode ter sido baixado de novo por outro processo
+            tree = LocalBackend(self.data_path, autosave=False)
+            for path, value in writes:
+                tree.set(path, value)
+            meta['dirty'] = bool(self._was_dirty)
+            self._save(normalize_node(tree.get(self.path)), meta)
+
+
+class CachedBackend:
+    """Repassa as operações ao backend e guarda as escritas bem-sucedidas para os caches"""
+
+    def __init__(self, backend, caches):
+        self._backend = backend
+        self._caches = caches
+        self._writes = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def _record(self, writes):
+        writes = [(path, value) for path, value in writes if any(cache.covers(path) for cache in self._caches)]
+        if not writes:
+            return
+        with self._lock:
+            if not self._writes:
+                for cache in self._caches:
+                    cache.mark_dirty()
+            self._writes.extend(writes)
+
+    def set(self, path, value):
+        self._backend.set(path, value)
+        self._record([(path, value)])
+
+    def update(self, path, values):
+        self._backend.update(path, values)
+        base = '/'.join(path_parts(path))
+        self._record([(f'{base}/{child}' if base else child, value) for child, value in values.items()])
+
+    def delete(self, path):
+        self._backend.delete(path)
+        self._record([(path, None)])
+
+    def flush(self):
+        """Aplica as escritas guardadas aos caches"""
+        with self._lock:
+            writes, self._writes = self._writes, []
+        if not writes:
+            return
+        for cache in self._caches:
+            try:
+                cache.apply_writes([(path, value) for path, value in writes if cache.covers(path)])
+            except Exception as e:
+                print(f"⚠️  Cache local de {cache.path}/ não foi atualizado ({str(e)}); será validado na próxima leitura")
+
+
+def caches_for(source, cache_dir=DEFAULT_CACHE_DIR):
+    """Caches existentes do banco `source`"""
+    if not source or not os.path.isdir(cache_dir):
+        return []
+    caches = []
+    for name in sorted(os.listdir(cache_dir)):
+        if not name.endswith('.meta.json'):
+            continue
+        try:
+            with open(os.path.join(cache_dir, name), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except ValueError:
+            continue
+        if meta.get('source') == source:
+            cache = RemoteCache(source, meta['path'], cache_dir)
+            if cache.meta():
+                caches.append(cache)
+    return caches
+
+
+def attach_cache(backend, cache_dir=DEFAULT_CACHE_DIR):
+    """Envolve o backend para atualizar os caches existentes dele a cada escrita"""
+    caches = caches_for(getattr(backend, 'source', None), cache_dir)
+    return CachedBackend(backend, caches) if caches else backend
+
+
+def source_from_args(args):
+    """Identificação do banco escolhido na linha de comando, sem conectar"""
+    if args.backend == 'local':
+        return os.path.abspath(args.local_db) if args.local_db else None
+    from upload_stories_v2 import DATABASE_URL
+    return DATABASE_URL.rstrip('/')
+
+
+def default_cache():
+    """Cache do nó stories do Firebase de produção"""
+    from upload_stories_v2 import DATABASE_URL
+    return RemoteCache(DATABASE_URL.rstrip('/'))
+
+
+def format_age(seconds):
+    if seconds < 120:
+        return f'{seconds:.0f}s'
+    if seconds < 7200:
+        return f'{seconds / 60:.0f} min'
+    return f'{seconds / 3600:.1f} h'
+
+
+def read_catalog(args):
+    """Filhos do nó pedido, do cache quando ele estiver dentro do --max-age; None se falhar"""
+    from upload_stories_v2 import initialize_firebase, is_transient_error
+
+    source = source_from_args(args)
+    if source is None:
+        # Backend local só em memória: não há o que guardar
+        if not backend_from_args(args, initialize_firebase):
+            return None
+        return normalize_node(get_backend().get(args.path))
+
+    cache = RemoteCache(source, args.path, args.cache_dir)
+    if not args.refresh and cache.is_fresh(args.max_age):
+        print(f"💾 Usando o cache local de {cache.path}/ (validado há {format_age(cache.age())}, limite {format_age(args.max_age)})")
+        return cache.load()
+
+    stale = cache.meta()
+    try:
+        if not backend_from_args(args, initialize_firebase):
+            raise ConnectionError('backend indisponível')
+        start = time.perf_counter()
+        downloaded, node = cache.revalidate(is_transient_error)
+    except Exception as e:
+        if not stale:
+            print(f"❌ Erro ao ler {cache.path}/: {str(e)}")
+            return None
+        print(f"⚠️  Não foi possível validar o cache ({str(e)}); usando a cópia de {format_age(cache.age(stale))} atrás")
+        return cache.load()
+
+    elapsed = time.perf_counter() - start
+    if downloaded:
+        print(f"⬇️  {cache.path}/ baixado: {len(node)} itens em {elapsed:.1f}s (cache atualizado)")
+    else:
+        print(f"✅ Cache de {cache.path}/ confirmado pelo ETag em {elapsed * 1000:.0f} ms, sem baixar dados")
+    return node
+
+
+def story_title(story):
+    for lang in ('pt-br', 'en'):
+        if isinstance(story.get(lang), dict):
+            return story[lang].get('title', '')
+    return ''
+
+
+def comparable(upload_data):
+    return {key: value for key, value in upload_data.items() if key not in UPLOAD_ONLY_FIELDS}
+
+
+def diff_catalog(local_catalog, remote):
+    """Compara as histórias locais com o catálogo remoto
+
+    Retorna {'new', 'changed', 'remote_only'} (listas de ids) e 'unchanged'.
+    'changed' são ids já usados no banco com outro conteúdo.
+    """
+    from sync_manifest import canonical_json
+    from upload_stories_v2 import build_upload_data
+
+    result = {'new': [], 'changed': [], 'remote_only': [], 'unchanged': 0}
+    local_ids = set()
+    for story_data in local_catalog:
+        story_id = str(story_data['id'])
+        local_ids.add(story_id)
+        remote_story = remote.get(story_id)
+        if remote_story is None:
+            result['new'].append(story_id)
+        elif canonical_json(comparable(build_upload_data(story_data))) != canonical_json(comparable(remote_story)):
+            result['changed'].append(story_id)
+        else:
+            result['unchanged'] += 1
+    result['remote_only'] = sorted((key for key in remote if key not in local_ids), key=key_order)
+    return result
+
+
+def print_ids(label, ids, limit):
+    if not ids:
+        return
+    shown = ', '.join(ids[:limit])
+    more = f' ... (+{len(ids) - limit})' if len(ids) > limit else ''
+    print(f"   {label}: {shown}{more}")
+
+
+def command_status(args):
+    cache = RemoteCache(source_from_args(args), args.path, args.cache_dir)
+    if args.refresh and read_catalog(args) is None:
+        return 1
+    meta = cache.meta()
+    if not meta:
+        print(f"📭 Nenhum cache de {cache.path}/ para {cache.source or 'o backend em memória'}")
+        print("💡 Qualquer comando de leitura (list, stats, diff) cria o cache")
+        return 0
+    print(f"💾 Cache de {cache.path}/ em {cache.source}")
+    print(f"   - Itens: {meta['count']} (maior id: {meta['max_id']})")
+    print(f"   - Validado há {format_age(cache.age(meta))}; baixado há {format_age(time.time() - meta['fetched_at'])}")
+    print(f"   - ETag: {meta.get('etag') or '-'}")
+    print(f"   - Arquivo: {cache.data_path} ({os.path.getsize(cache.data_path)} bytes)")
+    if meta.get('dirty'):
+        print("   ⚠️  Há escritas não aplicadas ao cache; a próxima leitura valida no banco")
+    elif cache.age(meta) > args.max_age:
+        print(f"   ⏰ Mais velho que {format_age(args.max_age)}; a próxima leitura valida no banco")
+    return 0
+
+
+def command_list(args):
+    remote = read_catalog(args)
+    if remote is None:
+        return 1
+    rows = [(key, story) for key, story in sorted(remote.items(), key=lambda item: key_order(item[0]))
+            if isinstance(story, dict)
+            and (args.level is None or story.get('level') == args.level)
+            and (not args.lang or isinstance(story.get(args.lang), dict))]
+    for key, story in rows[:args.limit]:
+        print(f"   {key:>6}  nível {story.get('level', '?')}  {story_title(story)}")
+    if len(rows) > args.limit:
+        print(f"   ... e mais {len(rows) - args.limit} (use --limit)")
+    print(f"📋 {len(rows)} de {len(remote)} histórias")
+    return 0
+
+
+def command_stats(args):
+    from catalog_publish import catalog_counts
+
+    remote = read_catalog(args)
+    if remote is None:
+        return 1
+    counts = catalog_counts([story for story in remote.values() if isinstance(story, dict)])
+    print(f"📊 {counts['count']} histórias em {args.path}/")
+    print(f"   - Por nível: {', '.join(f'{level}: {count}' for level, count in counts['levels'].items())}")
+    print(f"   - Por idioma: {', '.join(f'{lang}: {count}' for lang, count in counts['languages'].items())}")
+    return 0
+
+
+def command_diff(args):
+    from catalog_publish import load_catalog
+    from ingest import DEFAULT_INCLUDE
+
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+    local_catalog, invalid = load_catalog(args.roots, include, exclude)
+    if invalid:
+        print(f"⚠️  {invalid} histórias inválidas ignoradas (use validate_stories.py para ver os erros)")
+    remote = read_catalog(args)
+    if remote is None:
+        return 1
+
+    result = diff_catalog(local_catalog, remote)
+    print(f"🔍 {len(local_catalog)} histórias locais x {len(remote)} em {args.path}/")
+    print(f"   - Novas: {len(result['new'])}")
+    print(f"   - Ids já usados no banco com outro conteúdo: {len(result['changed'])}")
+    print(f"   - Só no banco: {len(result['remote_only'])}")
+    print(f"   - Iguais: {result['unchanged']}")
+    print_ids('Novas', result['new'], args.limit)
+    print_ids('Com outro conteúdo', result['changed'], args.limit)
+    print_ids('Só no banco', result['remote_only'], args.limit)
+    return 0
+
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--path', default=DEFAULT_PATH, help=f'Nó em cache (padrão: {DEFAULT_PATH})')
+    common.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE, help=f'Segundos em que o cache vale sem validar no banco (padrão: {DEFAULT_MAX_AGE})')
+    common.add_argument('--refresh', action='store_true', help='Validar o cache no banco agora (leitura condicional por ETag)')
+    common.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Pasta do cache (padrão: .remote_cache ao lado do script)')
+    add_backend_arguments(common)
+
+    parser = argparse.ArgumentParser(description='Cache local do catálogo remoto para consultas sem baixar tudo de novo')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('status', parents=[common], help='Mostra idade, ETag e tamanho do cache')
+    list_parser = subparsers.add_parser('list', parents=[common], help='Lista as histórias do banco')
+    list_parser.add_argument('--level', type=int, help='Só as histórias deste nível')
+    list_parser.add_argument('--lang', help='Só as histórias com este idioma')
+    list_parser.add_argument('--limit', type=int, default=50, help='Linhas mostradas (padrão: 50)')
+    subparsers.add_parser('stats', parents=[common], help='Contagens por nível e por idioma')
+    diff_parser = subparsers.add_parser('diff', parents=[common], help='Compara os arquivos locais com o banco')
+    diff_parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    diff_parser.add_argument('--include', help='Padrões glob dos arquivos incluídos, separados por vírgula (padrão: *.json)')
+    diff_parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos, separados por vírgula')
+    diff_parser.add_argument('--limit', type=int, default=20, help='Ids mostrados por grupo (padrão: 20)')
+    args = parser.parse_args(argv)
+
+    commands = {'status': command_status, 'list': command_list, 'stats': command_stats, 'diff': command_diff}
+    return commands[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
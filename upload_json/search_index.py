@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Índice invertido de busca por idioma: search_index/{lang}/{termo}
+Uso: python search_index.py [pastas ou arquivos...] [--langs pt-br,en] [--rebuild]
+
+Os termos vêm do título e da pista de cada idioma, em minúsculas, na forma
+NFC e sem as stopwords do idioma. Em japonês, chinês e coreano, que não
+separam palavras por espaço, os termos são pares de caracteres e os sinais
+são mantidos (o dakuten de "が" e as sílabas do hangul fazem parte da letra);
+nos demais idiomas os acentos são removidos ("coração" e "coracao" são o
+mesmo termo).
+
+Cada termo guarda as histórias em que aparece em uma string compacta
+"id:peso,id:peso" ordenada por id. O peso soma 3 por ocorrência no título e
+1 por ocorrência na pista. O app busca cada termo da consulta e soma os pesos.
+
+O índice é incremental: o estado local (.search_index_state.json) guarda o
+hash do texto e os termos de cada história, e só os termos das histórias
+novas, alteradas ou removidas são regravados. O pacote offline pode levar o
+índice completo (catalog_bundle.py --search).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime
+
+from catalog_shards import DEFAULT_SHARD_LANGUAGES
+from storage_backend import add_backend_arguments, backend_from_args, get_backend
+from sync_manifest import id_sort_key
+
+SEARCH_ROOT = 'search_index'
+SEARCH_META_PATH = 'search_index_meta'
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.search_index_state.json')
+STATE_VERSION = 1
+INDEX_FORMAT = 2
+
+# Peso de cada ocorrência por campo
+FIELD_WEIGHTS = (('title', 3), ('clue_text', 1))
+MIN_TOKEN_LENGTH = 2
+BIGRAM_LANGUAGES = frozenset({'ja', 'zh-cn', 'zh-tw', 'ko'})
+
+# Stopwords já sem acentos (comparadas com o texto normalizado)
+STOPWORDS = {
+    'pt-br': frozenset('''
+        a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em entre era eram essa esse
+        esta estava este eu foi foram ha isso isto ja lhe mais mas me mesmo meu minha muito na nao nas nem no nos
+        o os ou para pela pelo por qual quando que quem se sem ser seu seus sua suas tambem te tem tinha um uma
+        umas uns voce
+    '''.split()),
+    'en': frozenset('''
+        a about after all an and any are as at be been but by can could did do does for from had has have he her
+        him his how i if in into is it its just me my no not of on one or our out she so than that the their them
+        then there they this to up was we were what when where which who will with would you your
+    '''.split()),
+    'es': frozenset('''
+        a al como con de del el ella ellas ellos en era es esa ese esta este estaba fue ha hay la las le les lo los
+        mas me mi muy no nos o para pero por que quien se sin su sus tambien te tenia un una unos unas y ya
+    '''.split()),
+    'fr': frozenset('''
+        a au aux avec ce ces cet cette dans de des du elle elles en est et etait eu il ils je la le les leur lui
+        ma mais me meme mes ne nous on ou par pas pour qu que qui sa se ses son sur ta te tu un une vous y
+    '''.split()),
+    'de': frozenset('''
+        aber als am an auch auf aus bei bis das dass dem den der des die doch du ein eine einem einen einer er es
+        fur hat hatte ich ihm ihn ihr im in ist ja kein mit nach nicht noch nur oder sein sich sie so und uns vom
+        von vor war was wie wir wurde zu zum zur
+    '''.split()),
+    'it': frozenset('''
+        a al alla alle anche che chi con da dal dalla dei del della di e era gli ha ho i il in la le lei lo loro
+        lui ma mi ne nel nella non o per piu quando se si sono su sua suo tra un una uno
+    '''.split()),
+    'ru': frozenset('''
+        а без бы был была были было в вот все вы где да для до его ее если есть еще же за и из или им их к как
+        когда кто ли мне мы на над не нет но о об он она они от по под при с со так то только ты у уже что это я
+    '''.split()),
+}
+
+_WORD = re.compile(r'\w+')
+
+
+def fold(text, lang=None):
+    """Minúsculas em NFC, sem acentos fora de BIGRAM_LANGUAGES: 'Coração' -> 'coracao'
+
+    Em japonês e coreano a decomposição separaria o hangul em jamo e o
+    dakuten da sílaba, então o texto só é normalizado.
+    """
+    text = unicodedata.normalize('NFC', text.casefold())
+    if lang in BIGRAM_LANGUAGES:
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return unicodedata.normalize('NFC', ''.join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def tokenize(text, lang):
+    """Termos de um texto no idioma (sem stopwords)"""
+    words = _WORD.findall(fold(text, lang))
+    if lang in BIGRAM_LANGUAGES:
+        tokens = []
+        for word in words:
+            tokens.extend(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        return tokens
+    stopwords = STOPWORDS.get(lang, frozenset())
+    return [word for word in words if len(word) >= MIN_TOKEN_LENGTH and word not in stopwords]
+
+
+def story_terms(story_data, lang):
+    """Termos de um idioma da história com seus pesos: {termo: peso}"""
+    lang_data = story_data.get(lang)
+    if not isinstance(lang_data, dict):
+        return {}
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        text = lang_data.get(field)
+        if isinstance(text, str):
+            for token in tokenize(text, lang):
+                terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+def text_hash(story_data, lang):
+    """Hash só dos campos indexados, para ignorar alterações que não mudam o índice"""
+    lang_data = story_data.get(lang)
+    if not isinstance(lang_data, dict):
+        return None
+    # O formato entra no hash: mudar a tokenização refaz os termos de todas as histórias
+    text = '\0'.join([str(INDEX_FORMAT)] + [str(lang_data.get(field, '')) for field, _ in FIELD_WEIGHTS])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def posting_value(postings):
+    """Formato compacto de um termo: 'id:peso,id:peso' ordenado por id"""
+    return ','.join(f'{story_id}:{postings[story_id]}' for story_id in sorted(postings, key=id_sort_key))
+
+
+def load_state(state_path=DEFAULT_STATE_PATH):
+    """Estado do índice: {idioma: {id: {'hash': ..., 'terms': {termo: peso}}}}"""
+    if not os.path.exists(state_path):
+        return {'version': STATE_VERSION, 'languages': {}}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        return {'version': STATE_VERSION, 'languages': {}}
+    return state
+
+
+def save_state(state, state_path=DEFAULT_STATE_PATH):
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, state_path)
+
+
+def invert(entries):
+    """{id: {'terms': {termo: peso}}} -> {termo: {id: peso}}"""
+    index = {}
+    for story_id, entry in entries.items():
+        for token, weight in entry['terms'].items():
+            index.setdefault(token, {})[story_id] = weight
+    return index
+
+
+def build_index(stories, languages):
+    """Índice completo em memória: {idioma: {termo: 'id:peso,...'}} (usado no pacote offline)"""
+    result = {}
+    for lang in languages:
+        entries = {str(story['id']): {'terms': story_terms(story, lang)} for story in stories}
+        result[lang] = {token: posting_value(postings) for token, postings in sorted(invert(entries).items())}
+    return result
+
+
+def index_updates(stories, languages, state):
+    """Calcula os caminhos multi-path dos termos afetados pelas histórias alteradas
+
+    `stories` deve ser o catálogo completo: ids que sumiram têm seus termos
+    removidos. Atualiza `state` e retorna (updates, estatísticas por idioma).
+    """
+    updates = {}
+    stats = {}
+    for lang in languages:
+        entries = state['languages'].setdefault(lang, {})
+        index = invert(entries)
+        touched = set()
+        changed_stories = 0
+        seen = set()
+
+        for story_data in stories:
+            story_id = str(story_data['id'])
+            digest = text_hash(story_data, lang)
+            if digest is None:
+                continue
+            seen.add(story_id)
+            previous = entries.get(story_id)
+            if previous and previous['hash'] == digest:
+                continue
+            changed_stories += 1
+            terms = story_terms(story_data, lang)
+            old_terms = previous['terms'] if previous else {}
+            for token in old_terms:
+                if old_terms[token] != terms.get(token):
+                    index[token].pop(story_id, None)
+                    touched.add(token)
+            for token, weight in terms.items():
+                if old_terms.get(token) != weight:
+                    index.setdefault(token, {})[story_id] = weight
+                    touched.add(token)
+            entries[story_id] = {'hash': digest, 'terms': terms}
+
+        removed = [story_id for story_id in entries if story_id not in seen]
+        for story_id in removed:
+            for token in entries.pop(story_id)['terms']:
+                index[token].pop(story_id, None)
+                touched.add(token)
+
+        for token in touched:
+            postings = index.get(token)
+            updates[f'{SEARCH_ROOT}/{lang}/{token}'] = posting_value(postings) if postings else None
+
+        postings_count = sum(len(postings) for postings in index.values())
+        index_bytes = sum(len(token.encode('utf-8')) + len(posting_value(postings))
+                          for token, postings in index.items() if postings)
+        stats[lang] = {
+            'stories': len(entries),
+            'changed_stories': changed_stories,
+            'removed_stories': len(removed),
+            'terms': sum(1 for postings in index.values() if postings),
+            'postings': postings_count,
+            'bytes': index_bytes,
+            'changed_terms': len(touched),
+        }
+    return updates, stats
+
+
+def publish_index(stories, languages, state_path=DEFAULT_STATE_PATH):
+    """Regrava os termos afetados e o search_index_meta; retorna as estatísticas"""
+    start = time.perf_counter()
+    state = load_state(state_path)
+    updates, stats = index_updates(stories, languages, state)
+    build_s = time.perf_counter() - start
+
+    if updates:
+        updates[SEARCH_META_PATH] = {
+            'format': INDEX_FORMAT,
+            'languages': {lang: {key: item[key] for key in ('terms', 'postings', 'bytes', 'stories')}
+                          for lang, item in stats.items() if item['stories']},
+            'version': {'.sv': {'increment': 1}},
+            'updated_at': datetime.now().isoformat(),
+        }
+        get_backend().update('/', updates)
+    # Só grava o estado depois que o banco confirmou a escrita
+    save_state(state, state_path)
+    print_index_stats(stats, build_s, len(updates))
+    return stats
+
+
+def reset_index(languages, state_path=DEFAULT_STATE_PATH):
+    """Apaga search_index/{idioma} no banco e o estado local desses idiomas (para --rebuild)"""
+    get_backend().update('/', {f'{SEARCH_ROOT}/{lang}': None for lang in languages})
+    # Só esquece o estado depois que o banco confirmou a remoção
+    state = load_state(state_path)
+    for lang in languages:
+        state['languages'].pop(lang, None)
+    save_state(state, state_path)
+
+
+def print_index_stats(stats, build_s, written):
+    print(f"🔎 Índice de busca montado em {build_s * 1000:.0f} ms, {written} caminhos gravados:")
+    for lang, item in stats.items():
+        if not item['stories'] and not item['changed_terms']:
+            continue
+        print(f"   - {lang}: {item['terms']} termos, {item['postings']} ocorrências, {item['bytes']} bytes "
+              f"({item['changed_stories']} histórias alteradas, {item['removed_stories']} removidas, "
+              f"{item['changed_terms']} termos regravados)")
+
+
+def main(argv=None):
+    from ingest import discover_files, DEFAULT_INCLUDE
+    from story_schema import validate_story
+    from story_stream import iter_stories
+    from upload_stories_v2 import initialize_firebase
+
+    parser = argparse.ArgumentParser(description='Monta o índice de busca por idioma')
+    parser.add_argument('roots', nargs='*', default=['.'], help='Arquivos ou pastas de histórias (padrão: pasta atual)')
+    parser.add_argument('--langs', help=f'Idiomas indexados, separados por vírgula (padrão: {",".join(DEFAULT_SHARD_LANGUAGES)})')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='Estado local do índice')
+    parser.add_argument('--rebuild', action='store_true', help='Apagar o índice dos idiomas no banco e regravar todos os termos')
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    languages = [lang.strip() for lang in args.langs.split(',') if lang.strip()] if args.langs else list(DEFAULT_SHARD_LANGUAGES)
+    stories = {}
+    for file_path in discover_files(args.roots, DEFAULT_INCLUDE):
+        for story_data in iter_stories(file_path):
+            if not validate_story(story_data):
+                stories[str(story_data['id'])] = story_data
+    print(f"📚 {len(stories)} histórias lidas")
+
+    if not backend_from_args(args, initialize_firebase):
+        return 1
+    if args.rebuild:
+        reset_index(languages, args.state)
+        print(f"🧹 Índice de busca apagado para {', '.join(languages)}; regravando todos os termos")
+    publish_index(list(stories.values()), languages, args.state)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Backends de armazenamento usados pelos scripts de upload
+
+FirebaseBackend   Realtime Database via firebase_admin (produção)
+LocalBackend      árvore em memória (opcionalmente salva em um arquivo JSON)
+                  com latência e taxa de falhas simuladas, para testes e
+                  benchmarks sem rede
+
+Todos os backends têm set, update (multi-path), get, get_shallow, get_range
+(filhos em um intervalo de chaves), delete e as leituras condicionais
+get_with_etag e get_if_changed. `source` identifica o banco (URL do
+Firebase ou arquivo do backend local) para o cache em remote_cache.py.
+"""
+
+import atexit
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+BACKEND_CHOICES = ('firebase', 'local')
+
+_backend = None
+
+
+class LocalBackendError(ConnectionError):
+    """Falha simulada pelo LocalBackend (tratada como transitória)"""
+
+
+class FirebaseBackend:
+    """Realtime Database usando o app padrão do firebase_admin"""
+
+    name = 'firebase'
+
+    def __init__(self):
+        from firebase_admin import db
+        self._db = db
+
+    def set(self, path, value):
+        self._db.reference(path).set(value)
+
+    def update(self, path, values):
+        self._db.reference(path).update(values)
+
+    def get(self, path):
+        return self._db.reference(path).get()
+
+    def get_shallow(self, path):
+        return self._db.reference(path).get(shallow=True)
+
+    def get_range(self, path, start_key, end_key):
+        result = self._db.reference(path).order_by_key().start_at(str(start_key)).end_at(str(end_key)).get()
+        # Chaves inteiras densas podem voltar como lista (posição = chave)
+        if isinstance(result, list):
+            return {str(key): value for key, value in enumerate(result) if value is not None}
+        return dict(result or {})
+
+    def get_with_etag(self, path):
+        """Retorna (valor, etag)"""
+        return self._db.reference(path).get(etag=True)
+
+    def get_if_changed(self, path, etag):
+        """Retorna (mudou, valor, etag); valor e etag são None se o etag ainda vale"""
+        return self._db.reference(path).get_if_changed(etag)
+
+    def delete(self, path):
+        self._db.reference(path).delete()
+
+    @property
+    def source(self):
+        import firebase_admin
+        return (firebase_admin.get_app().options.get('databaseURL') or '').rstrip('/') or None
+
+
+def key_order(key):
+    """Ordem das chaves do Realtime Database: inteiros de 32 bits primeiro (numérica), depois texto"""
+    key = str(key)
+    if key.lstrip('-').isdigit() and (key == '0' or not key.lstrip('-').startswith('0')) and -2 ** 31 <= int(key) < 2 ** 31:
+        return (0, int(key), '')
+    return (1, 0, key)
+
+
+def _split(path):
+    return [part for part in path.strip('/').split('/') if part]
+
+
+def _resolve_server_values(value, current=None):
+    """Aplica os valores de servidor suportados ({'.sv': 'timestamp'} e increment)"""
+    if isinstance(value, dict):
+        server_value = value.get('.sv')
+        if server_value == 'timestamp':
+            return int(time.time() * 1000)
+        if isinstance(server_value, dict) and 'increment' in server_value:
+            base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+            return base + server_value['increment']
+        return {key: _resolve_server_values(item, current.get(key) if isinstance(current, dict) else None)
+                for key, item in value.items()}
+    return value
+
+
+def _prune(value):
+    """Remove nulos e objetos vazios, como o Realtime Database faz"""
+    if isinstance(value, dict):
+        pruned = {key: _prune(item) for key, item in value.items()}
+        return {key: item for key, item in pruned.items() if item is not None} or None
+    if isinstance(value, list):
+        return _prune({str(i): item for i, item in enumerate(value)})
+    return value
+
+
+class LocalBackend:
+    """Stand-in local do Realtime Database
+
+    latency_ms e jitter_ms atrasam cada operação; failure_rate (0 a 1) é a
+    probabilidade de uma operação falhar com LocalBackendError. Com `path`,
+    a árvore é carregada desse arquivo JSON e salva nele ao final (ou só
+    quando save() for chamado, com autosave=False).
+    """
+
+    name = 'local'
+
+    def __init__(self, path=None, latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0, seed=None, autosave=True):
+        self.path = path
+        self.source = os.path.abspath(path) if path else None
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.operations = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tree = None
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._tree = json.load(f)
+        if path and autosave:
+            atexit.register(self.save)
+
+    def _simulate(self):
+        """Aplica a latência e a falha simuladas"""
+        with self._lock:
+            self.operations += 1
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+            delay = self.latency_ms + (self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise LocalBackendError('Falha simulada pelo backend local')
+
+    def _get_node(self, parts):
+        node = self._tree
+        for part in parts:
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        return node
+
+    def _set_node(self, parts, value):
+        """Grava value (já serializado) em parts, criando ou podando os nós do caminho"""
+        if not parts:
+            self._tree = _prune(_resolve_server_values(value, self._tree))
+            return
+
+        if not isinstance(self._tree, dict):
+            self._tree = {}
+        chain = [self._tree]
+        for part in parts[:-1]:
+            child = chain[-1].get(part)
+            if not isinstance(child, dict):
+                child = {}
+                chain[-1][part] = child
+            chain.append(child)
+
+        key = parts[-1]
+        resolved = _prune(_resolve_server_values(value, chain[-1].get(key)))
+        if resolved is None:
+            chain[-1].pop(key, None)
+        else:
+            chain[-1][key] = resolved
+
+        # Remove os pais que ficaram vazios
+        for depth in range(len(chain) - 1, 0, -1):
+            if not chain[depth]:
+                chain[depth - 1].pop(parts[depth - 1], None)
+        if not self._tree:
+            self._tree = None
+
+    @staticmethod
+    def _serialize(value):
+        # Mesmo custo de serialização de uma escrita real (e sem compartilhar objetos)
+        return json.loads(json.dumps(value, ensure_ascii=False))
+
+    def set(self, path, value):
+        value = self._serialize(value)
+        self._simulate()
+        with self._lock:
+            self._set_node(_split(path), value)
+
+    def update(self, path, values):
+        values = self._serialize(values)
+        self._simulate()
+        base = _split(path)
+        with self._lock:
+            for child_path, value in values.items():
+                self._set_node(base + _split(child_path), value)
+
+    def get(self, path):
+        self._simulate()
+        with self._lock:
+            return copy.deepcopy(self._get_node(_split(path)))
+
+    def get_shallow(self, path):
+        self._simulate()
+        with self._lock:
+            node = self._get_node(_split(path))
+        if isinstance(node, dict):
+            return {key: True for key in node}
+        return node
+
+    def get_range(self, path, start_key, end_key):
+        self._simulate()
+        start, end = key_order(start_key), key_order(end_key)
+        with self._lock:
+            node = self._get_node(_split(path))
+            if not isinstance(node, dict):
+                return {}
+            keys = sorted((key for key in node if start <= key_order(key) <= end), key=key_order)
+            return {key: copy.deepcopy(node[key]) for key in keys}
+
+    @staticmethod
+    def _etag(value):
+        # Como no Realtime Database, o etag só depende do conteúdo do nó
+        data = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+    def get_with_etag(self, path):
+        value = self.get(path)
+        return value, self._etag(value)
+
+    def get_if_changed(self, path, etag):
+        value, current = self.get_with_etag(path)
+        if current == etag:
+            return False, None, None
+        return True, value, current
+
+    def delete(self, path):
+        self.set(path, None)
+
+    def save(self):
+        """Salva a árvore no arquivo JSON (se houver), de forma atômica"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._tree, ensure_ascii=False)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def set_backend(backend):
+    """Define o backend usado pelas funções de upload"""
+    global _backend
+    _backend = backend
+    return backend
+
+
+def get_backend():
+    """Backend atual; por padrão o Firebase (exige initialize_firebase antes)"""
+    global _backend
+    if _backend is None:
+        _backend = FirebaseBackend()
+    return _backend
+
+
+def add_backend_arguments(parser):
+    """Adiciona as opções de backend a um ArgumentParser"""
+    parser.add_argument('--backend', choices=BACKEND_CHOICES, default='firebase', help='Onde gravar os dados (padrão: firebase)')
+    parser.add_argument('--local-db', help='Arquivo JSON do backend local (padrão: só em memória)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latência simulada por operação no backend local')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variação da latência simulada no backend local')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Probabilidade de falha simulada (0 a 1) no backend local')
+
+
+def backend_from_args(args, initialize_firebase=None):
+    """Cria e ativa o backend escolhido na linha de comando; retorna None se falhar
+
+    Se houver um cache local do banco (remote_cache.py), as escritas bem-sucedidas
+    também são aplicadas a ele.
+    """
+    from remote_cache import attach_cache
+
+    if args.backend == 'local':
+        backend = LocalBackend(args.local_db, args.latency_ms, args.jitter_ms, args.failure_rate)
+        print(f"🧪 Usando backend local{f' ({args.local_db})' if args.local_db else ' em memória'}")
+        return set_backend(attach_cache(backend))
+
+    if initialize_firebase and not initialize_firebase():
+        return None
+    return set_backend(attach_cache(FirebaseBackend()))
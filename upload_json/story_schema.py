@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Definição única do esquema das histórias e validador compilado
+
+O esquema combina as regras dos arquivos de histórias com as restrições do
+firebase_database_rules.json, para que uma história válida aqui também seja
+aceita pelo Realtime Database.
+"""
+
+import json
+import math
+import os
+import re
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'firebase_database_rules.json')
+
+# Dificuldade usada pelo app para cada nível (AppConstants.difficulty*)
+DIFFICULTY_BY_LEVEL = {0: 'easy', 1: 'normal', 2: 'hard'}
+DEFAULT_CATEGORY = 'mystery'
+
+STORY_SCHEMA = {
+    # Campos da história que não são idiomas
+    'fields': {
+        'id': {'type': 'number', 'required': True, 'integer': True, 'min': 0},
+        'level': {'type': 'number', 'required': True, 'choices': tuple(DIFFICULTY_BY_LEVEL)},
+        'image': {'type': 'string', 'required': True, 'non_empty': True},
+        'image_thumb': {'type': 'string', 'non_empty': True},
+        'difficulty': {'type': 'string', 'choices': tuple(DIFFICULTY_BY_LEVEL.values())},
+        'category': {'type': 'string', 'non_empty': True},
+        'created_at': {'type': 'string'},
+        'updated_at': {'type': 'string'},
+    },
+    'required_languages': ('pt-br', 'en'),
+    # Campos de cada bloco de idioma
+    'language_fields': {
+        'title': {'type': 'string', 'required': True, 'non_empty': True},
+        'clue_text': {'type': 'string', 'required': True, 'non_empty': True},
+        'answer_text': {'type': 'string', 'required': True, 'non_empty': True},
+        'image_clue': {'type': 'string'},
+    },
+}
+
+NON_LANGUAGE_FIELDS = frozenset(STORY_SCHEMA['fields'])
+
+_TYPE_CHECKS = {
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'string': lambda value: isinstance(value, str),
+    'boolean': lambda value: isinstance(value, bool),
+}
+_TYPE_NAMES = {'number': 'um número', 'string': 'um texto', 'boolean': 'um booleano'}
+
+
+def load_rule_constraints(rules_path=RULES_PATH):
+    """Extrai do .validate de stories/$storyId os campos obrigatórios e seus tipos"""
+    if not os.path.exists(rules_path):
+        return {'required': (), 'types': {}}
+
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+
+    story_rules = rules.get('rules', {}).get('stories', {})
+    expression = next((value.get('.validate', '') for key, value in story_rules.items()
+                       if key.startswith('$') and isinstance(value, dict)), '')
+
+    required = ()
+    match = re.search(r"newData\.hasChildren\(\[([^\]]*)\]\)", expression)
+    if match:
+        required = tuple(re.findall(r"'([^']+)'", match.group(1)))
+
+    types = {}
+    for field, kind in re.findall(r"newData\.child\('([^']+)'\)\.is(Number|String|Boolean)\(\)", expression):
+        types[field] = kind.lower()
+
+    return {'required': required, 'types': types}
+
+
+def _compile_field(name, spec, where):
+    """Compila a especificação de um campo em uma função que anexa erros"""
+    type_name = spec.get('type')
+    type_check = _TYPE_CHECKS[type_name] if type_name else None
+    choices = frozenset(spec['choices']) if 'choices' in spec else None
+    integer = spec.get('integer', False)
+    minimum = spec.get('min')
+    non_empty = spec.get('non_empty', False)
+    label = f"'{name}'{where}"
+
+    def check(value, errors):
+        if type_check and not type_check(value):
+            errors.append(f"Campo {label} deve ser {_TYPE_NAMES[type_name]}")
+            return
+        if type_name == 'number' and not math.isfinite(value):
+            # NaN e infinito passam no isinstance, mas int() falha neles
+            errors.append(f"Campo {label} deve ser um número finito")
+            return
+        if integer and value != int(value):
+            errors.append(f"Campo {label} deve ser um número inteiro")
+        if minimum is not None and value < minimum:
+            errors.append(f"Campo {label} deve ser maior ou igual a {minimum}")
+        if choices is not None and value not in choices:
+            errors.append(f"Campo {label} deve ser um de: {', '.join(map(str, sorted(choices, key=str)))}")
+        if non_empty and not value.strip():
+            errors.append(f"Campo {label} não pode ser vazio")
+
+    return check
+
+
+def compile_validator(schema=STORY_SCHEMA, rules=None):
+    """Compila o esquema em uma função validate(story) -> lista de erros
+
+    Com `rules` (ver load_rule_constraints), os campos obrigatórios do banco
+    também são exigidos. Use para validar os dados já prontos para upload.
+    """
+    fields = dict(schema['fields'])
+    if rules:
+        for name in rules['required']:
+            fields[name] = dict(fields.get(name, {}), required=True)
+        for name, type_name in rules['types'].items():
+            fields[name] = dict(fields.get(name, {}), type=type_name)
+
+    field_checks = {name: _compile_field(name, spec, '') for name, spec in fields.items()}
+    required_fields = tuple(name for name, spec in fields.items() if spec.get('required'))
+    required_languages = tuple(schema['required_languages'])
+    language_specs = schema['language_fields']
+    required_language_fields = tuple(name for name, spec in language_specs.items() if spec.get('required'))
+    non_language = frozenset(fields)
+
+    # Checagens dos blocos de idioma compiladas sob demanda, uma vez por idioma
+    language_checks = {}
+
+    def checks_for(lang):
+        checks = language_checks.get(lang)
+        if checks is None:
+            checks = {name: _compile_field(name, spec, f" no idioma '{lang}'")
+                      for name, spec in language_specs.items()}
+            language_checks[lang] = checks
+        return checks
+
+    def validate(story):
+        if not isinstance(story, dict):
+            return ["A história deve ser um objeto"]
+
+        errors = []
+        for name in required_fields:
+            if name not in story:
+                errors.append(f"Campo obrigatório '{name}' não encontrado")
+        for lang in required_languages:
+            if lang not in story:
+                errors.append(f"Idioma obrigatório '{lang}' não encontrado")
+
+        for key, value in story.items():
+            check = field_checks.get(key)
+            if check is not None:
+                check(value, errors)
+                continue
+            if key in non_language:
+                continue
+
+            if not isinstance(value, dict):
+                errors.append(f"Dados do idioma '{key}' devem ser um objeto")
+                continue
+            checks = checks_for(key)
+            for name in required_language_fields:
+                if name not in value:
+                    errors.append(f"Campo '{name}' obrigatório no idioma '{key}'")
+            for name, field_value in value.items():
+                field_check = checks.get(name)
+                if field_check is not None:
+                    field_check(field_value, errors)
+
+        return errors
+
+    return validate
+
+
+# Validadores compilados uma única vez por processo
+validate_story = compile_validator()
+validate_upload_data = compile_validator(rules=load_rule_constraints())
+
+
+def validate_story_data(story_data):
+    """Valida se os dados da história estão corretos; levanta ValueError com todos os erros"""
+    errors = validate_story(story_data)
+    if errors:
+        raise ValueError('; '.join(errors))
+    return True
+
+
+def rule_fields(story_data):
+    """Campos exigidos pelas regras do banco, derivados da história quando ausentes"""
+    return {
+        'difficulty': story_data.get('difficulty') or DIFFICULTY_BY_LEVEL.get(story_data['level'], 'normal'),
+        'category': story_data.get('category') or DEFAULT_CATEGORY,
+    }
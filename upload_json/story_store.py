@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Arquivo de histórias só de acréscimo (NDJSON) com índice lateral por id
+Uso:
+  python story_store.py ver <id>
+  python story_store.py stats
+  python story_store.py compact [--background]
+
+historias.ndjson       uma história por linha; adicionar ou editar uma
+                       história só acrescenta uma linha no final
+historias.ndjson.idx   cabeçalho + registros fixos (id, posição, tamanho);
+                       o último registro de um id é o que vale
+
+Adicionar é um append atômico: a linha é gravada com O_APPEND e fsync, e só
+depois o registro entra no índice. O cabeçalho do índice guarda o inode e o
+tamanho do arquivo de dados já indexado e o maior id, então o próximo id
+livre sai do cabeçalho. Se o processo cair entre as duas gravações, a
+próxima abertura indexa as linhas completas que sobraram no final; uma linha
+cortada só é descartada pela próxima gravação (ler nunca encolhe o arquivo).
+Se o índice não corresponder ao arquivo (outro inode, arquivo menor ou
+índice ausente), ele é reconstruído lendo o NDJSON.
+
+A compactação reescreve só a última versão de cada história. A cópia roda
+sem bloquear quem adiciona; o lock é usado só para copiar o que chegou
+durante a cópia e trocar os arquivos.
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: lock pelo msvcrt (ver lock_file)
+    fcntl = None
+    import msvcrt
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historias.ndjson')
+INDEX_SUFFIX = '.idx'
+LOCK_SUFFIX = '.lock'
+
+INDEX_MAGIC = b'DTSI'
+INDEX_VERSION = 1
+# magic, versão, reservado, inode do arquivo de dados, bytes indexados, maior id
+HEADER = struct.Struct('<4sHHQQq')
+# id, posição, tamanho (com o \n)
+ENTRY = struct.Struct('<qQI')
+NO_ID = -1
+
+# Compactação automática quando o lixo passa destes limites
+AUTO_COMPACT_RATIO = 0.5
+AUTO_COMPACT_BYTES = 1024 * 1024
+# A compactação troca o arquivo de dados enquanto ele está aberto, o que o
+# Windows não permite; lá o arquivo só cresce (adicionar e ler funcionam)
+COMPACT_SUPPORTED = fcntl is not None
+
+
+def lock_file(f, blocking=True):
+    """Lock exclusivo entre processos no arquivo aberto; sem bloquear, retorna False se já estiver travado"""
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    # msvcrt trava bytes a partir da posição atual: usa sempre o primeiro byte
+    while True:
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def encode_story(story_data):
+    return (json.dumps(story_data, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class StoryStore:
+    """Acesso ao arquivo NDJSON pelo índice lateral"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.lock_path = path + LOCK_SUFFIX
+        self._entries = None
+        with self.locked():
+            self._recover()
+
+    @contextmanager
+    def locked(self):
+        """Lock exclusivo entre processos (adicionar, recuperar, trocar arquivos)"""
+        with open(self.lock_path, 'a') as lock_handle:
+            lock_file(lock_handle)
+            try:
+                yield
+            finally:
+                unlock_file(lock_handle)
+
+    # Índice
+
+    def _read_header(self):
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) < HEADER.size:
+            return None
+        with open(self.index_path, 'rb') as f:
+            magic, version, _, inode, data_end, max_id = HEADER.unpack(f.read(HEADER.size))
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            return None
+        return {'inode': inode, 'data_end': data_end, 'max_id': max_id}
+
+    def _write_header(self, f, inode, data_end, max_id):
+        f.seek(0)
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, inode, data_end, max_id))
+
+    def _data_stat(self):
+        if not os.path.exists(self.path):
+            open(self.path, 'ab').close()
+        return os.stat(self.path)
+
+    def _recover(self, truncate=False):
+        """Garante que o índice cobre o arquivo de dados (chamado com o lock)
+
+        Com truncate (só antes de gravar), uma linha cortada no final é
+        descartada; a leitura nunca encolhe o arquivo de dados.
+        """
+        stat = self._data_stat()
+        header = self._read_header()
+        if header is None or header['inode'] != stat.st_ino or header['data_end'] > stat.st_size:
+            self._rebuild(stat, truncate)
+            return
+
+        index_size = os.path.getsize(self.index_path)
+        torn = (index_size - HEADER.size) % ENTRY.size
+        if torn:
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(index_size - torn)
+        if header['data_end'] < stat.st_size:
+            # Linhas gravadas depois da última atualização do índice
+            with open(self.index_path, 'r+b') as f:
+                self._index_tail(f, header['data_end'], header['max_id'], stat, truncate)
+
+    def _rebuild(self, stat, truncate=False):
+        if stat.st_size:
+            print(f"🔧 Reconstruindo o índice de {os.path.basename(self.path)}...", file=sys.stderr)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w+b') as f:
+            self._write_header(f, stat.st_ino, 0, NO_ID)
+            self._index_tail(f, 0, NO_ID, stat, truncate)
+        os.replace(tmp_path, self.index_path)
+        self._entries = None
+
+    def _index_tail(self, index_file, start, max_id, stat, truncate=False):
+        """Indexa as linhas a partir de `start`
+
+        Uma última linha válida sem quebra de linha (arquivo editado à mão) ganha a quebra e
+        entra no índice. Uma última linha ilegível é uma gravação cortada: com
+        truncate ela é descartada; sem, fica no arquivo e fora do índice.
+        """
+        entries = []
+        offset = start
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                complete = line.endswith(b'\n')
+                try:
+                    story_id = int(json.loads(line)['id'])
+                except (ValueError, KeyError, TypeError):
+                    if not complete:
+                        break
+                    # Linha ilegível: fica no arquivo, mas fora do índice
+                    offset += len(line)
+                    continue
+                if not complete:
+                    with open(self.path, 'ab') as data_file:
+                        data_file.write(b'\n')
+                        data_file.flush()
+                        os.fsync(data_file.fileno())
+                    line += b'\n'
+                entries.append(ENTRY.pack(story_id, offset, len(line)))
+                max_id = max(max_id, story_id)
+                offset += len(line)
+                if not complete:
+                    # Era a última linha; o \n acrescentado não é outra linha
+                    break
+        if truncate and offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+        index_file.seek(0, os.SEEK_END)
+        index_file.write(b''.join(entries))
+        self._write_header(index_file, stat.st_ino, offset, max_id)
+        index_file.flush()
+        os.fsync(index_file.fileno())
+        self._entries = None
+
+    def entries(self):
+        """{id: (posição, tamanho)} da última versão de cada história"""
+        if self._entries is None:
+            with open(self.index_path, 'rb') as f:
+                f.seek(HEADER.size)
+                data = f.read()
+            data = data[:len(data) - len(data) % ENTRY.size]
+            self._entries = {story_id: (offset, length) for story_id, offset, length in ENTRY.iter_unpack(data)}
+        return self._entries
+
+    def next_id(self):
+        """Próximo id livre (maior id do índice + 1), lido só do cabeçalho"""
+        header = self._read_header()
+        return max(header['max_id'] + 1, 1) if header else 1
+
+    # Leitura e escrita
+
+    def get(self, story_id):
+        """História pelo id, lida direto da posição indicada pelo índice"""
+        entry = self.entries().get(int(story_id))
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def __contains__(self, story_id):
+        return int(story_id) in self.entries()
+
+    def __len__(self):
+        return len(self.entries())
+
+    def iter_stories(self):
+        """Última versão de cada história, em ordem de id"""
+        entries = self.entries()
+        with open(self.path, 'rb') as f:
+            for story_id in sorted(entries):
+                offset, length = entries[story_id]
+                f.seek(offset)
+                yield json.loads(f.read(length))
+
+    def append(self, story_data):
+        """Acrescenta uma história; sem id (ou id None) recebe o próximo id livre. Retorna o id"""
+        with self.locked():
+            self._recover(truncate=True)
+            header = self._read_header()
+            story_data = dict(story_data)
+            if story_data.get('id') is None:
+                story_data['id'] = max(header['max_id'] + 1, 1)
+            story_id = int(story_data['id'])
+            line = encode_story(story_data)
+
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            offset = header['data_end']
+            with open(self.index_path, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                f.write(ENTRY.pack(story_id, offset, len(line)))
+                self._write_header(f, header['inode'], offset + len(line), max(header['max_id'], story_id))
+                f.flush()
+                os.fsync(f.fileno())
+            # Outro processo pode ter acrescentado linhas desde a última leitura
+            self._entries = None
+        return story_id
+
+    def stats(self):
+        entries = self.entries()
+        live_bytes = sum(length for _, length in entries.values())
+        data_bytes = os.path.getsize(self.path)
+        records = (os.path.getsize(self.index_path) - HEADER.size) // ENTRY.size
+        return {
+            'stories': len(entries),
+            'records': records,
+            'superseded': records - len(entries),
+            'data_bytes': data_bytes,
+            'garbage_bytes': data_bytes - live_bytes,
+        }
+
+    def needs_compaction(self):
+        if not COMPACT_SUPPORTED:
+            return False
+        stats = self.stats()
+        return (stats['garbage_bytes'] >= AUTO_COMPACT_BYTES
+                and stats['garbage_bytes'] >= stats['data_bytes'] * AUTO_COMPACT_RATIO)
+
+    # Compactação
+
+    def compact(self):
+        """Reescreve só a última versão de cada história; retorna os bytes liberados (None se já há outra compactação)"""
+        tmp_data = self.path + '.compact'
+        with open(tmp_data, 'ab') as target:
+            if not lock_file(target, blocking=False):
+                return None
+            target.truncate(0)
+            return self._compact_into(target, tmp_data)
+
+    def _compact_into(self, target, tmp_data):
+        with self.locked():
+            self._recover()
+            self._entries = None
+            snapshot = dict(self.entries())
+            snapshot_end = self._read_header()['data_end']
+        before = os.path.getsize(self.path)
+
+        moved = {}
+        with open(self.path, 'rb') as source:
+            # Cópia sem lock: as linhas até snapshot_end nunca mudam
+            for story_id in sorted(snapshot):
+                offset, length = snapshot[story_id]
+                source.seek(offset)
+                moved[(offset, length)] = target.tell()
+                target.write(source.read(length))
+
+            with self.locked():
+                self._recover()
+                self._entries = None
+                current = self.entries()
+                new_entries = []
+                for story_id in sorted(current):
+                    offset, length = current[story_id]
+                    if offset >= snapshot_end:
+                        # Adicionada durante a cópia
+                        source.seek(offset)
+                        moved[(offset, length)] = target.tell()
+                        target.write(source.read(length))
+                    new_entries.append(ENTRY.pack(story_id, moved[(offset, length)], length))
+                target.flush()
+                os.fsync(target.fileno())
+                data_end = target.tell()
+
+                inode = os.fstat(target.fileno()).st_ino
+                tmp_index = self.index_path + '.compact'
+                with open(tmp_index, 'wb') as f:
+                    self._write_header(f, inode, data_end, max(current, default=NO_ID))
+                    f.write(b''.join(new_entries))
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Se cair entre as duas trocas, o inode não bate e o índice é reconstruído
+                os.replace(tmp_data, self.path)
+                os.replace(tmp_index, self.index_path)
+                self._entries = None
+        return before - data_end
+
+
+def compact_in_background(path=DEFAULT_STORE_PATH):
+    """Dispara a compactação em um processo separado, sem esperar"""
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), 'compact', '--store', path],
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def print_story(story_data):
+    """Mostra uma história (os idiomas principais)"""
+    print(f"🆔 ID: {story_data['id']}")
+    print(f"📊 Nível: {story_data.get('level')}")
+    print(f"🖼️  Imagem: {story_data.get('image')}")
+    for lang, flag in (('pt-br', '🇧🇷 Português'), ('en', '🇺🇸 Inglês')):
+        lang_data = story_data.get(lang)
+        if isinstance(lang_data, dict):
+            print()
+            print(f"{flag}:")
+            print(f"  Título: {lang_data.get('title')}")
+            print(f"  Pista: {lang_data.get('clue_text')}")
+            print(f"  Resposta: {lang_data.get('answer_text')}")
+    others = [key for key, value in story_data.items() if isinstance(value, dict) and key not in ('pt-br', 'en')]
+    if others:
+        print()
+        print(f"🌐 Outros idiomas: {', '.join(others)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Arquivo de histórias NDJSON com índice por id')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--store', default=DEFAULT_STORE_PATH, help='Arquivo NDJSON (padrão: historias.ndjson)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ver_parser = commands.add_parser('ver', parents=[common], help='Mostra uma história pelo id')
+    ver_parser.add_argument('id', type=int)
+    ver_parser.add_argument('--json', action='store_true', help='Imprimir o JSON da história')
+    commands.add_parser('stats', parents=[common], help='Histórias, versões antigas e bytes ocupados')
+    compact_parser = commands.add_parser('compact', parents=[common], help='Reescreve o arquivo só com a última versão de cada história')
+    compact_parser.add_argument('--background', action='store_true', help='Compactar em um processo separado e sair')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact' and not COMPACT_SUPPORTED:
+        print("❌ A compactação não está disponível no Windows")
+        return 1
+
+    if args.command == 'compact' and args.background:
+        compact_in_background(args.store)
+        print("🧹 Compactação iniciada em segundo plano")
+        return 0
+
+    store = StoryStore(args.store)
+    if args.command == 'ver':
+        story_data = store.get(args.id)
+        if story_data is None:
+            print(f"❌ História {args.id} não encontrada em {os.path.basename(args.store)}")
+            return 1
+        if args.json:
+            print(json.dumps(story_data, ensure_ascii=False, indent=2))
+        else:
+            print_story(story_data)
+    elif args.command == 'stats':
+        stats = store.stats()
+        print(f"📚 {stats['stories']} histórias, {stats['records']} registros ({stats['superseded']} versões antigas)")
+        print(f"   - {stats['data_bytes']} bytes, dos quais {stats['garbage_bytes']} em versões antigas")
+        print(f"   - Próximo id livre: {store.next_id()}")
+    else:
+        start = time.perf_counter()
+        freed = store.compact()
+        if freed is None:
+            print("⏳ Já existe uma compactação em andamento")
+            return 0
+        print(f"🧹 Compactado em {time.perf_counter() - start:.2f}s: {freed} bytes liberados, {len(store)} histórias")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Leitura incremental de arquivos de histórias: gera uma história por vez
+sem carregar o arquivo inteiro na memória
+
+Formatos aceitos:
+  - array de histórias:            [ {...}, {...} ]
+  - objeto com a chave "stories":  { "stories": [ {...}, {...} ] }
+  - história única:                { "id": 1, ... }
+  - NDJSON (.ndjson):              uma história por linha; se houver o
+                                   índice do story_store.py, só a última
+                                   versão de cada id
+"""
+
+import json
+import os
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader:
+    """Buffer de leitura sobre o arquivo com decodificação de valores JSON"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Lê mais um pedaço do arquivo, descartando o que já foi consumido"""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        if self.pos > len(self.buf) // 2:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += data
+        return True
+
+    def peek(self):
+        """Retorna o próximo caractere que não é espaço (sem consumir) ou '' no fim"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Consome o próximo caractere, que deve estar em `chars`"""
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else 'fim do arquivo'
+            raise ValueError(f"JSON inválido: esperado {' ou '.join(repr(c) for c in chars)}, encontrado {found}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodifica o próximo valor JSON completo, lendo mais do arquivo se preciso"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Um número no fim do buffer pode continuar no próximo pedaço
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_array(reader):
+    """Gera os elementos de um array cujo '[' já foi consumido"""
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(',]') == ']':
+            return
+
+
+def iter_stories_from_stream(f, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Gera as histórias de um arquivo já aberto, uma por vez"""
+    reader = _Reader(f, chunk_size)
+    first = reader.peek()
+
+    if first == '[':
+        reader.pos += 1
+        yield from _iter_array(reader)
+
+    elif first == '{':
+        reader.pos += 1
+        story = {}
+        streamed = False
+        if reader.peek() != '}':
+            while True:
+                key = reader.value()
+                reader.expect(':')
+                if key == 'stories' and reader.peek() == '[':
+                    reader.pos += 1
+                    yield from _iter_array(reader)
+                    streamed = True
+                else:
+                    story[key] = reader.value()
+                if reader.expect(',}') == '}':
+                    break
+        else:
+            reader.pos += 1
+
+        # Sem a chave "stories", o objeto é uma história única
+        if not streamed:
+            yield story
+
+    else:
+        raise ValueError("Formato de arquivo inválido. Deve ser um objeto ou array de histórias")
+
+    if reader.peek():
+        raise ValueError("JSON inválido: conteúdo extra após o fim do documento")
+
+
+def iter_ndjson(file_path):
+    """Gera as histórias de um arquivo NDJSON (linhas em branco são ignoradas)"""
+    from story_store import StoryStore, INDEX_SUFFIX
+
+    if os.path.exists(file_path + INDEX_SUFFIX):
+        yield from StoryStore(file_path).iter_stories()
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_stories(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Gera as histórias de um arquivo JSON, uma por vez"""
+    if file_path.endswith('.ndjson'):
+        yield from iter_ndjson(file_path)
+        return
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from iter_stories_from_stream(f, chunk_size)
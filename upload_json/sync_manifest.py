@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Manifesto local de sincronização: guarda o hash do conteúdo de cada história
+no último upload bem-sucedido para enviar apenas o que mudou
+"""
+
+import hashlib
+import json
+import os
+
+from catalog_shards import story_languages
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sync_manifest.json')
+MANIFEST_VERSION = 1
+
+
+def canonical_json(data):
+    """Serializa em JSON canônico (chaves ordenadas, sem espaços)"""
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def story_hash(story_data):
+    """Hash SHA-256 do JSON canônico de uma história"""
+    return hashlib.sha256(canonical_json(story_data).encode('utf-8')).hexdigest()
+
+
+def load_manifest(manifest_path=DEFAULT_MANIFEST_PATH):
+    """Carrega o manifesto; retorna um manifesto vazio se o arquivo não existir"""
+    if not os.path.exists(manifest_path):
+        return {'version': MANIFEST_VERSION, 'stories': {}}
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Versão de manifesto não suportada: {manifest.get('version')}")
+    return manifest
+
+
+def save_manifest(manifest, manifest_path=DEFAULT_MANIFEST_PATH):
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)"""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def source_key(path):
+    """Origem de uma história no manifesto: caminho absoluto do arquivo"""
+    return os.path.abspath(path)
+
+
+def in_scope(source, files, folders):
+    """Indica se uma origem está entre os arquivos lidos agora
+
+    Também vale para arquivos que sumiram de uma pasta lida por inteiro.
+    """
+    return source in files or os.path.dirname(source) in folders
+
+
+def compute_plan(stories, manifest, delete_missing=False, sources=None, folders=()):
+    """Compara as histórias locais com o manifesto
+
+    Retorna um dicionário com as listas 'adds', 'updates' e 'deletes' e o
+    total de histórias sem alteração. Cada entrada traz id, hash e bytes.
+
+    sources ({id: source_key do arquivo}) registra de onde cada história veio.
+    Com ele, delete_missing só apaga ids cuja origem está nos arquivos lidos
+    agora (ou em `folders`, as pastas lidas por inteiro): sincronizar um
+    arquivo não apaga as histórias enviadas de outros. Ids sem origem no
+    manifesto (gravados por uma versão antiga) não são apagados; o total
+    fica em 'unscoped'.
+    """
+    known = manifest['stories']
+    plan = {'adds': [], 'updates': [], 'deletes': [], 'unchanged': 0, 'unscoped': 0}
+    seen = set()
+
+    for story_data in stories:
+        story_id = str(story_data['id'])
+        serialized = canonical_json(story_data).encode('utf-8')
+        digest = hashlib.sha256(serialized).hexdigest()
+        entry = {'id': story_id, 'hash': digest, 'bytes': len(serialized), 'story': story_data}
+        if sources is not None:
+            entry['source'] = sources.get(story_id)
+        seen.add(story_id)
+
+        if story_id not in known:
+            plan['adds'].append(entry)
+        elif known[story_id]['hash'] != digest:
+            plan['updates'].append(entry)
+        else:
+            plan['unchanged'] += 1
+            if entry.get('source'):
+                # Sem alteração, mas a origem pode ter mudado (ou faltar)
+                known[story_id]['source'] = entry['source']
+
+    if delete_missing:
+        files = set(sources.values()) if sources is not None else None
+        for story_id in sorted(set(known) - seen, key=id_sort_key):
+            source = known[story_id].get('source')
+            if files is not None:
+                if not source:
+                    plan['unscoped'] += 1
+                    continue
+                if not in_scope(source, files, folders):
+                    continue
+            plan['deletes'].append({'id': story_id, 'hash': known[story_id]['hash'],
+                                    'bytes': known[story_id].get('bytes', 0)})
+
+    return plan
+
+
+def id_sort_key(story_id):
+    """Chave de ordenação de ids: numéricos em ordem numérica, depois os de texto"""
+    return (0, int(story_id)) if story_id.isdigit() else (1, story_id)
+
+
+def record_upload(manifest, entry, created_at):
+    """Registra no manifesto uma história enviada com sucesso
+
+    Os idiomas ficam registrados para apagar todos os shards da história
+    se ela for removida.
+    """
+    manifest['stories'][entry['id']] = {
+        'hash': entry['hash'],
+        'bytes': entry['bytes'],
+        'created_at': created_at,
+        'languages': story_languages(entry['story']),
+    }
+    if entry.get('source'):
+        manifest['stories'][entry['id']]['source'] = entry['source']
+
+
+def record_delete(manifest, story_id):
+    """Remove do manifesto uma história apagada no Firebase"""
+    manifest['stories'].pop(story_id, None)
+
+
+def print_plan(plan):
+    """Mostra o plano de sincronização com a contagem de bytes"""
+    print("\n🧾 Plano de sincronização:")
+    for label, key, symbol in (('Novas', 'adds', '+'), ('Alteradas', 'updates', '~'), ('Removidas', 'deletes', '-')):
+        entries = plan[key]
+        total_bytes = sum(entry['bytes'] for entry in entries)
+        print(f"   {label}: {len(entries)} ({total_bytes} bytes)")
+        for entry in entries:
+            print(f"     {symbol} {entry['id']} ({entry['bytes']} bytes)")
+    print(f"   Sem alteração: {plan['unchanged']}")
+    if plan.get('unscoped'):
+        print(f"   ⚠️  {plan['unscoped']} ids sem arquivo de origem no manifesto não foram considerados para remoção "
+              f"(sincronize uma vez os arquivos de onde vieram para registrar a origem)")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Gerador de catálogos sintéticos no formato do exemplo_historia.json
+Uso: python synthetic_catalog.py saida.json --count 10000 [--languages 8] [--clue-words 30]
+
+As histórias são determinísticas para a mesma semente, então dois benchmarks
+com os mesmos parâmetros leem exatamente os mesmos dados.
+"""
+
+import argparse
+import json
+import os
+import random
+
+# Idiomas na ordem do exemplo_historia.json
+LANGUAGES = ('pt-br', 'en', 'es', 'fr', 'de', 'it', 'ja', 'ru', 'zh-cn', 'zh-tw', 'ko', 'hi', 'ar', 'tr',
+             'pl', 'nl', 'he', 'sv', 'no', 'da', 'fi', 'cs', 'el', 'th', 'vi', 'ms', 'uk', 'ro')
+
+DEFAULT_LANGUAGES = 2
+DEFAULT_TITLE_WORDS = 3
+DEFAULT_CLUE_WORDS = 20
+DEFAULT_ANSWER_WORDS = 20
+DEFAULT_SEED = 42
+
+_SYLLABLES = ('ma', 'te', 'ri', 'so', 'lu', 'na', 've', 'do', 'ca', 'mi', 'ro', 'ta', 'ne', 'pe', 'li', 'gu')
+
+
+def _words(rng, count):
+    """Texto com `count` palavras pseudo-aleatórias"""
+    return ' '.join(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(count))
+
+
+def synthetic_story(story_id, languages=DEFAULT_LANGUAGES, title_words=DEFAULT_TITLE_WORDS,
+                    clue_words=DEFAULT_CLUE_WORDS, answer_words=DEFAULT_ANSWER_WORDS, seed=DEFAULT_SEED):
+    """Monta uma história válida com `languages` traduções (mínimo: pt-br e en)"""
+    rng = random.Random(seed * 1000003 + story_id)
+    story = {
+        'id': story_id,
+        'level': story_id % 3,
+        'image': f'images/{story_id:03d}.png',
+    }
+    for lang in language_codes(languages):
+        story[lang] = {
+            'title': _words(rng, title_words).capitalize(),
+            'clue_text': _words(rng, clue_words).capitalize() + '.',
+            'answer_text': _words(rng, answer_words).capitalize() + '.',
+        }
+    return story
+
+
+def language_codes(count):
+    """Os `count` primeiros idiomas do catálogo (além da lista, códigos 'xx-N')"""
+    count = max(2, count)
+    return list(LANGUAGES[:count]) + [f'xx-{i}' for i in range(len(LANGUAGES), count)]
+
+
+def write_synthetic_catalog(path, count, languages=DEFAULT_LANGUAGES, title_words=DEFAULT_TITLE_WORDS,
+                            clue_words=DEFAULT_CLUE_WORDS, answer_words=DEFAULT_ANSWER_WORDS,
+                            seed=DEFAULT_SEED, wrapper=True, start_id=1):
+    """Grava `count` histórias sintéticas sem montar o catálogo na memória; retorna o tamanho em bytes"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"stories": [' if wrapper else '[')
+        for i in range(start_id, start_id + count):
+            if i > start_id:
+                f.write(',\n')
+            story = synthetic_story(i, languages, title_words, clue_words, answer_words, seed)
+            f.write(json.dumps(story, ensure_ascii=False))
+        f.write(']}' if wrapper else ']')
+    return os.path.getsize(path)
+
+
+def add_catalog_arguments(parser):
+    """Adiciona as opções do catálogo sintético a um ArgumentParser"""
+    parser.add_argument('--count', type=int, default=1000, help='Número de histórias (padrão: 1000)')
+    parser.add_argument('--languages', type=int, default=DEFAULT_LANGUAGES, help=f'Idiomas por história (padrão: {DEFAULT_LANGUAGES})')
+    parser.add_argument('--title-words', type=int, default=DEFAULT_TITLE_WORDS, help=f'Palavras no título (padrão: {DEFAULT_TITLE_WORDS})')
+    parser.add_argument('--clue-words', type=int, default=DEFAULT_CLUE_WORDS, help=f'Palavras na pista (padrão: {DEFAULT_CLUE_WORDS})')
+    parser.add_argument('--answer-words', type=int, default=DEFAULT_ANSWER_WORDS, help=f'Palavras na resposta (padrão: {DEFAULT_ANSWER_WORDS})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Semente do gerador (padrão: {DEFAULT_SEED})')
+
+
+def catalog_params(args):
+    """Parâmetros do catálogo sintético a partir das opções da linha de comando"""
+    return {
+        'count': args.count,
+        'languages': args.languages,
+        'title_words': args.title_words,
+        'clue_words': args.clue_words,
+        'answer_words': args.answer_words,
+        'seed': args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera um catálogo sintético de histórias')
+    parser.add_argument('output', help='Arquivo JSON de saída')
+    add_catalog_arguments(parser)
+    parser.add_argument('--no-wrapper', action='store_true', help='Gravar uma lista em vez de {"stories": [...]}')
+    args = parser.parse_args()
+
+    size = write_synthetic_catalog(args.output, wrapper=not args.no_wrapper, **catalog_params(args))
+    print(f"📝 {args.count} histórias sintéticas ({max(2, args.languages)} idiomas) salvas em {args.output} "
+          f"({size / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
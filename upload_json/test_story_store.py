@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Testes do historias.ndjson (story_store.py)
+Uso: python -m unittest test_story_store
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from story_store import StoryStore, INDEX_SUFFIX
+
+
+def story(story_id, title='História'):
+    return {'id': story_id, 'level': 1, 'image': 'images/001.png',
+            'pt-br': {'title': title, 'clue_text': 'Pista', 'answer_text': 'Resposta'}}
+
+
+class StoryStoreTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'historias.ndjson')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_lines(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_final_line_without_newline_is_kept_and_indexed(self):
+        lines = [json.dumps(story(1)), json.dumps(story(2))]
+        self.write_lines('\n'.join(lines).encode('utf-8'))
+
+        store = StoryStore(self.path)
+        self.assertEqual(store.get(2)['id'], 2)
+        self.assertEqual(len(store), 2)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), ('\n'.join(lines) + '\n').encode('utf-8'))
+
+        # Acrescentar depois não emenda na linha que estava sem \n
+        store.append(story(None, 'Nova'))
+        reopened = StoryStore(self.path)
+        self.assertEqual([s['id'] for s in reopened.iter_stories()], [1, 2, 3])
+
+    def test_final_line_without_newline_with_existing_index(self):
+        StoryStore(self.path).append(story(1))
+        with open(self.path, 'ab') as f:
+            f.write(json.dumps(story(2)).encode('utf-8'))
+
+        self.assertEqual(StoryStore(self.path).get(2)['id'], 2)
+
+    def test_torn_tail_is_kept_on_read_and_dropped_on_write(self):
+        StoryStore(self.path).append(story(1))
+        torn = json.dumps(story(2)).encode('utf-8')[:20]
+        with open(self.path, 'ab') as f:
+            f.write(torn)
+        size = os.path.getsize(self.path)
+
+        store = StoryStore(self.path)
+        store.stats()
+        self.assertIsNone(store.get(2))
+        self.assertEqual(os.path.getsize(self.path), size)
+
+        store.append(story(2))
+        reopened = StoryStore(self.path)
+        self.assertEqual([s['id'] for s in reopened.iter_stories()], [1, 2])
+
+    def test_rebuild_without_index(self):
+        self.write_lines((json.dumps(story(5)) + '\n' + json.dumps(story(7))).encode('utf-8'))
+        store = StoryStore(self.path)
+        self.assertTrue(os.path.exists(self.path + INDEX_SUFFIX))
+        self.assertEqual(store.next_id(), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ Script de teste para verificar se o upload está funcionando
 
 import json
 import os
-from upload_stories_v2 import initialize_firebase, upload_story
+from upload_stories_v2 import initialize_firebase, upload_story, write_index
 
 def test_upload():
     """Testa o upload de uma história de exemplo"""
@@ -37,6 +37,7 @@ def test_upload():
     # Testa upload
     print("📤 Fazendo upload da história de teste...")
     success = upload_story(test_story)
+    write_index()
     
     if success:
         print("✅ Teste de upload concluído com sucesso!")
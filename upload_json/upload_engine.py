@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Motor de upload concorrente com pool de threads limitado, retentativas e backoff
+Usado pelo upload_stories_v2.py no modo --workers
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Configuração padrão das retentativas
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_BUDGET = 100
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+
+class RetryBudget:
+    """Orçamento total de retentativas compartilhado entre as threads de um upload"""
+
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Consome uma retentativa do orçamento; retorna False se ele acabou"""
+        with self._lock:
+            if self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+
+class UploadStats:
+    """Estatísticas de uma execução: sucessos, falhas, retentativas e latências"""
+
+    def __init__(self):
+        self.success = 0
+        self.failed = 0
+        self.retries = 0
+        self.latencies = []
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def record_attempt(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def percentile(self, pct):
+        """Percentil (nearest-rank) das latências de escrita, em segundos"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, int(round(pct / 100.0 * len(ordered))))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def summary(self):
+        """Retorna o resumo da execução como dicionário"""
+        elapsed = self.elapsed
+        return {
+            'success': self.success,
+            'failed': self.failed,
+            'retries': self.retries,
+            'elapsed_s': round(elapsed, 3),
+            'throughput': round(self.success / elapsed, 2) if elapsed > 0 else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 1),
+            'p95_ms': round(self.percentile(95) * 1000, 1),
+        }
+
+    def print_summary(self, unit='histórias'):
+        summary = self.summary()
+        print(f"\n📊 Resumo: {summary['success']} enviadas, {summary['failed']} com falha, {summary['retries']} retentativas")
+        print(f"   - Tempo total: {summary['elapsed_s']}s")
+        print(f"   - Vazão: {summary['throughput']} {unit}/s")
+        print(f"   - Latência por escrita: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms")
+
+
+def backoff_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Backoff exponencial com jitter completo para a retentativa número `attempt`"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(write_fn, item, stats, budget, is_transient,
+                      max_retries=DEFAULT_MAX_RETRIES,
+                      base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Executa write_fn(item), repetindo falhas transitórias enquanto houver orçamento"""
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            result = write_fn(item)
+            stats.record_attempt(time.perf_counter() - start)
+            return result
+        except Exception as e:
+            stats.record_attempt(time.perf_counter() - start)
+            if attempt >= max_retries or not is_transient(e) or not budget.take():
+                raise
+            stats.record_retry()
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+            attempt += 1
+
+
+def run_concurrent(items, write_fn, workers, on_success=None, on_failure=None,
+                   is_transient=lambda e: True, max_retries=DEFAULT_MAX_RETRIES,
+                   retry_budget=DEFAULT_RETRY_BUDGET, base_delay=DEFAULT_BASE_DELAY,
+                   max_delay=DEFAULT_MAX_DELAY, item_size=lambda item: 1, stats=None):
+    """Executa write_fn para cada item em um pool de `workers` threads
+
+    No máximo 2 * workers itens ficam em voo ao mesmo tempo, então `items`
+    pode ser um gerador grande. Os callbacks on_success(item, resultado) e
+    on_failure(item, erro) rodam na thread principal. item_size diz quantas
+    histórias cada item representa (um lote conta como várias).
+    """
+    stats = stats or UploadStats()
+    budget = RetryBudget(retry_budget)
+    max_in_flight = max(1, workers) * 2
+    pending = {}
+
+    def drain(done):
+        for future in done:
+            item = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                stats.failed += item_size(item)
+                if on_failure:
+                    on_failure(item, e)
+            else:
+                stats.success += item_size(item)
+                if on_success:
+                    on_success(item, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        try:
+            for item in items:
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    drain(done)
+                future = executor.submit(call_with_retries, write_fn, item, stats, budget,
+                                         is_transient, max_retries, base_delay, max_delay)
+                pending[future] = item
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                drain(done)
+        finally:
+            if pending:
+                # A leitura dos itens falhou (ou Ctrl-C): cancela o que não
+                # começou e passa pelos callbacks o que já foi gravado antes
+                # de propagar o erro
+                for future in list(pending):
+                    if future.cancel():
+                        pending.pop(future)
+                done, _ = wait(pending)
+                drain(done)
+
+    stats.finish()
+    return stats
@@ -6,15 +6,19 @@ Uso: python upload_exemplo.py
 
 import json
 import os
-import firebase_admin
-from firebase_admin import credentials, db
+from story_stream import iter_stories
+from storage_backend import get_backend
 
 def initialize_firebase():
     """Inicializa o Firebase Admin SDK"""
+    import firebase_admin
+    from firebase_admin import credentials
+    
     try:
         # Verifica se já foi inicializado
         firebase_admin.get_app()
         print("✅ Firebase já inicializado")
+        return True
     except ValueError:
         # Carrega configuração do arquivo
         config_path = os.path.join(os.path.dirname(__file__), 'firebase_config.json')
@@ -43,8 +47,7 @@ def upload_story(story_data):
     """Faz upload de uma história para o Firebase"""
     try:
         # Salva no Firebase (sem timestamps)
-        ref = db.reference(f'stories/{story_data["id"]}')
-        ref.set(story_data)
+        get_backend().set(f'stories/{story_data["id"]}', story_data)
         
         print(f"✅ História {story_data['id']} ('{story_data['pt-br']['title']}') enviada com sucesso!")
         print(f"   - Nível: {story_data['level']}")
@@ -74,34 +77,23 @@ def main():
         return
     
     try:
-        with open(exemplo_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Lê as histórias uma a uma (array, {"stories": [...]} ou história única)
+        print("📚 Lendo histórias do exemplo_historia.json")
         
-        # Verifica se é um array de histórias
-        if 'stories' in data and isinstance(data['stories'], list):
-            stories = data['stories']
-            print(f"📚 Encontradas {len(stories)} histórias para upload")
-            
-            sucessos = 0
-            for i, story_data in enumerate(stories, 1):
-                print(f"\n📖 [{i}/{len(stories)}] Carregando: {story_data['pt-br']['title']}")
-                
-                if upload_story(story_data):
-                    sucessos += 1
-                else:
-                    print(f"❌ Falha no upload da história {i}")
+        total = 0
+        sucessos = 0
+        for i, story_data in enumerate(iter_stories(exemplo_path), 1):
+            total = i
+            print(f"\n📖 [{i}] Carregando: {story_data['pt-br']['title']}")
             
-            print(f"\n🎉 Upload concluído! {sucessos}/{len(stories)} histórias enviadas com sucesso")
-            
-        else:
-            # Formato antigo (história única)
-            print(f"📖 Carregando história: {data['pt-br']['title']}")
-            
-            if upload_story(data):
-                print("🎉 Upload concluído com sucesso!")
-                print("🔍 Verifique no Firebase Console se a história foi salva")
+            if upload_story(story_data):
+                sucessos += 1
             else:
-                print("❌ Falha no upload")
+                print(f"❌ Falha no upload da história {i}")
+        
+        print(f"\n🎉 Upload concluído! {sucessos}/{total} histórias enviadas com sucesso")
+        if sucessos:
+            print("🔍 Verifique no Firebase Console se as histórias foram salvas")
             
     except Exception as e:
         print(f"❌ Erro ao processar arquivo: {str(e)}")
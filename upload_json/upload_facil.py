@@ -2,11 +2,16 @@
 """
 Script de conveniência para gerenciar histórias
 Uso: python upload_facil.py [comando]
+
+Todos os comandos rodam no mesmo processo (sem abrir outro interpretador)
+e funcionam a partir de qualquer pasta.
 """
 
-import sys
-import subprocess
+import importlib
 import os
+import sys
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historias.ndjson')
 
 def mostrar_ajuda():
     """Mostra a ajuda do script"""
@@ -14,15 +19,39 @@ def mostrar_ajuda():
     print("=" * 40)
     print()
     print("Comandos disponíveis:")
-    print("  adicionar  - Adiciona uma nova história ao exemplo_historia.json")
-    print("  upload     - Faz upload do exemplo_historia.json para o Firebase")
-    print("  ver        - Mostra o conteúdo atual do exemplo_historia.json")
+    print("  adicionar  - Adiciona uma nova história ao historias.ndjson")
+    print("  upload     - Envia as histórias novas ou alteradas do historias.ndjson para o Firebase")
+    print("  exemplo    - Faz upload do exemplo_historia.json para o Firebase")
+    print("  ver        - Mostra o exemplo_historia.json, ou uma história do historias.ndjson pelo id")
+    print("  compact    - Remove as versões antigas do historias.ndjson (em segundo plano)")
+    print("  validate   - Valida arquivos/pastas de histórias e gera um relatório JSON")
+    print("  bundle     - Gera o pacote offline do catálogo em assets/catalog")
+    print("  watch      - Fica observando as pastas e envia as histórias alteradas")
+    print("  dupes      - Procura histórias quase duplicadas (MinHash/LSH)")
+    print("  search     - Atualiza o índice de busca por idioma no Firebase")
+    print("  query      - Consulta o catálogo compilado (níveis, idiomas, tamanhos dos textos)")
+    print("  export     - Faz backup das histórias do Firebase em NDJSON (gzip)")
+    print("  publish    - Publica o catálogo como uma versão nova e troca catalog/current")
+    print("  remote     - Lista, conta ou compara as histórias do Firebase usando o cache local")
+    print("  lint       - Revisa os textos (aspas, espaços, Unicode, vazios, títulos longos)")
     print("  ajuda      - Mostra esta ajuda")
     print()
     print("Exemplos:")
     print("  python upload_facil.py adicionar")
     print("  python upload_facil.py upload")
+    print("  python upload_facil.py upload --delete-missing")
     print("  python upload_facil.py ver")
+    print("  python upload_facil.py ver 42")
+    print("  python upload_facil.py validate historias/ --output relatorio.json")
+    print("  python upload_facil.py bundle --per-language")
+    print("  python upload_facil.py watch historias/ --debounce 0.5")
+    print("  python upload_facil.py dupes historias/ --threshold 0.7")
+    print("  python upload_facil.py search historias/ --langs pt-br,en")
+    print("  python upload_facil.py query --missing fr --by-level --stats answer_text")
+    print("  python upload_facil.py export --output backup.ndjson.gz --resume")
+    print("  python upload_facil.py publish historias/ --retention-days 7")
+    print("  python upload_facil.py remote diff historias/ --max-age 600")
+    print("  python upload_facil.py lint historias/ --fix --output lint.json")
 
 def ver_historia():
     """Mostra o conteúdo atual do exemplo_historia.json"""
@@ -56,34 +85,68 @@ def ver_historia():
     except Exception as e:
         print(f"❌ Erro ao ler arquivo: {str(e)}")
 
-def executar_comando(comando):
-    """Executa um comando específico"""
-    if comando == "adicionar":
-        print("📝 Iniciando adição de nova história...")
-        subprocess.run([sys.executable, "adicionar_historia.py"])
-    
-    elif comando == "upload":
-        print("🚀 Iniciando upload...")
-        subprocess.run([sys.executable, "upload_exemplo.py"])
-    
-    elif comando == "ver":
+# Comando -> (módulo, função, argumentos fixos). Os módulos só são importados
+# quando o comando roda, então comandos locais não carregam o SDK do Firebase.
+# Funções com argumentos fixos None não recebem argv.
+COMANDOS = {
+    "adicionar": ("adicionar_historia", "adicionar_historia", None),
+    "upload": ("upload_stories_v2", "main", ("--sync", STORE_PATH)),
+    "exemplo": ("upload_exemplo", "main", None),
+    "ver": ("story_store", "main", ("ver",)),
+    "compact": ("story_store", "main", ("compact", "--background")),
+    "validate": ("validate_stories", "main", ()),
+    "bundle": ("catalog_bundle", "main", ()),
+    "watch": ("watch_stories", "main", ()),
+    "dupes": ("find_dupes", "main", ()),
+    "search": ("search_index", "main", ()),
+    "query": ("catalog_store", "main", ("query",)),
+    "export": ("export_stories", "main", ()),
+    "publish": ("catalog_publish", "main", ()),
+    "remote": ("remote_cache", "main", ()),
+    "lint": ("lint_stories", "main", ()),
+}
+
+MENSAGENS = {
+    "adicionar": "📝 Iniciando adição de nova história...",
+    "upload": "🚀 Iniciando upload do historias.ndjson...",
+    "exemplo": "🚀 Iniciando upload...",
+}
+
+def executar_comando(comando, argumentos=()):
+    """Executa um comando específico no mesmo processo; retorna o código de saída"""
+    if comando == "ver" and not argumentos:
         ver_historia()
+        return 0
     
-    elif comando == "ajuda":
+    if comando == "ajuda":
         mostrar_ajuda()
+        return 0
     
-    else:
+    if comando not in COMANDOS:
         print(f"❌ Comando desconhecido: {comando}")
         print("Use 'python upload_facil.py ajuda' para ver os comandos disponíveis")
+        return 1
+    
+    if comando == "upload" and not os.path.exists(STORE_PATH):
+        print("❌ Arquivo historias.ndjson não encontrado!")
+        print("   Adicione uma história com: python upload_facil.py adicionar")
+        return 1
+    
+    if comando in MENSAGENS:
+        print(MENSAGENS[comando])
+    modulo, funcao, fixos = COMANDOS[comando]
+    executar = getattr(importlib.import_module(modulo), funcao)
+    resultado = executar() if fixos is None else executar([*fixos, *argumentos])
+    return resultado if isinstance(resultado, int) else 0
 
 def main():
     """Função principal"""
     if len(sys.argv) < 2:
         mostrar_ajuda()
-        return
+        return 0
     
     comando = sys.argv[1].lower()
-    executar_comando(comando)
+    return executar_comando(comando, sys.argv[2:])
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
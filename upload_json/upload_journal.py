@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Diário de checkpoints dos uploads: permite retomar um envio interrompido
+
+Cada arquivo de entrada tem um diário próprio, identificado pelo hash SHA-256
+do conteúdo do arquivo. O diário é só de acréscimo: uma linha de cabeçalho e
+depois uma linha por história confirmada pelo banco. As linhas ficam em um
+buffer e são gravadas com um único fsync a cada `fsync_every` confirmações
+(ou `fsync_interval` segundos), então o diário não vira o gargalo do upload.
+
+Se o processo morrer no meio de um lote, no máximo as confirmações ainda não
+sincronizadas se perdem (essas histórias são reenviadas, e a escrita é
+idempotente). Uma linha cortada no fim do arquivo é descartada na leitura.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from upload_metrics import phase
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.upload_journal')
+JOURNAL_VERSION = 1
+DEFAULT_FSYNC_EVERY = 256
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+_active = None
+
+
+def file_hash(path):
+    """SHA-256 do conteúdo de um arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def journal_path(input_hash, journal_dir=DEFAULT_JOURNAL_DIR):
+    return os.path.join(journal_dir, f'{input_hash[:32]}.ndjson')
+
+
+def read_journal(path):
+    """Lê os ids confirmados de um diário; retorna (cabeçalho, ids, bytes válidos)
+
+    Linhas inválidas (escrita interrompida por uma queda) são ignoradas, e os
+    bytes válidos terminam na última quebra de linha.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    valid_bytes = data.rfind(b'\n') + 1
+    header = None
+    acked = set()
+    for line in data[:valid_bytes].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict):
+            continue
+        if header is None and 'journal' in record:
+            header = record
+        elif 'id' in record:
+            acked.add(str(record['id']))
+    return header, acked, valid_bytes
+
+
+class UploadJournal:
+    """Diário de um arquivo de entrada aberto para acréscimo"""
+
+    def __init__(self, path, input_path, input_hash, acked=None,
+                 fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        self.path = path
+        self.input_hash = input_hash
+        self.acked = acked if acked is not None else set()
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.new_acks = 0
+        self._buffer = []
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+        exists = os.path.exists(path)
+        self._file = open(path, 'ab')
+        if not exists or self._file.tell() == 0:
+            header = {'journal': JOURNAL_VERSION, 'file': os.path.basename(input_path), 'hash': input_hash}
+            self._buffer.append(json.dumps(header, ensure_ascii=False) + '\n')
+            self._sync()
+
+    def record(self, story_id):
+        """Registra uma história confirmada; sincroniza com o disco quando o lote enche"""
+        story_id = str(story_id)
+        with self._lock:
+            if story_id in self.acked:
+                return
+            self.acked.add(story_id)
+            self.new_acks += 1
+            self._buffer.append(json.dumps({'id': story_id}) + '\n')
+            if len(self._buffer) >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        if not self._buffer:
+            return
+        with phase('journal', size=sum(len(line) for line in self._buffer)):
+            self._file.write(''.join(self._buffer).encode('utf-8'))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._buffer = []
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+
+    def discard(self):
+        """Fecha e apaga o diário (upload concluído sem pendências)"""
+        self.close()
+        os.remove(self.path)
+
+
+def open_journal(input_path, resume=False, journal_dir=DEFAULT_JOURNAL_DIR,
+                 fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+    """Abre o diário do arquivo de entrada e o torna o diário ativo
+
+    Com resume, carrega as histórias já confirmadas; sem resume, um diário
+    anterior do mesmo arquivo é recomeçado do zero.
+    """
+    global _active
+    os.makedirs(journal_dir, exist_ok=True)
+    input_hash = file_hash(input_path)
+    path = journal_path(input_hash, journal_dir)
+
+    acked = set()
+    if os.path.exists(path):
+        if resume:
+            header, acked, valid_bytes = read_journal(path)
+            if not header or header.get('hash') != input_hash:
+                acked = set()
+                valid_bytes = 0
+            # Descarta a linha cortada no fim antes de voltar a acrescentar
+            with open(path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        else:
+            os.remove(path)
+
+    _active = UploadJournal(path, input_path, input_hash, acked, fsync_every, fsync_interval)
+    return _active
+
+
+def record_ack(story_id):
+    """Registra a confirmação de uma história no diário ativo, se houver"""
+    if _active is not None:
+        _active.record(story_id)
+
+
+def close_journal(completed=False):
+    """Fecha o diário ativo; com completed, o apaga (não há nada para retomar)"""
+    global _active
+    journal = _active
+    _active = None
+    if journal is None:
+        return
+    if completed:
+        journal.discard()
+    else:
+        journal.close()
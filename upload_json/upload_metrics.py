@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Instrumentação das execuções de upload: tempo, contagem e bytes por fase e por história
+
+Desligada por padrão: phase() devolve um contexto vazio compartilhado e
+timed_iter() devolve o próprio iterável, então o custo é só uma chamada de
+função. Com enable_metrics(), cada fase acumula tempo de relógio, número de
+execuções e bytes, e cada história acumula o tempo gasto em cada fase.
+
+Saídas: JSON (--metrics), arquivo texto do Prometheus para o textfile
+collector do node_exporter (--prometheus) e resumo do cProfile (--profile).
+"""
+
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+PROMETHEUS_PREFIX = 'darktales_upload'
+DEFAULT_PROFILE_PATH = 'upload_profile.txt'
+PROFILE_TOP = 30
+
+_recorder = None
+
+
+class _NullPhase:
+    """Contexto usado quando a instrumentação está desligada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class MetricsRecorder:
+    """Acumula as métricas de uma execução (seguro entre threads)"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.stories = {}
+        self.counters = {}
+
+    def add(self, name, seconds, count=1, size=0, story_id=None):
+        with self._lock:
+            phase = self.phases.get(name)
+            if phase is None:
+                phase = self.phases[name] = {'seconds': 0.0, 'count': 0, 'bytes': 0, 'max_seconds': 0.0}
+            phase['seconds'] += seconds
+            phase['count'] += count
+            phase['bytes'] += size
+            if seconds > phase['max_seconds']:
+                phase['max_seconds'] = seconds
+            if story_id is not None:
+                story = self.stories.setdefault(str(story_id), {})
+                story[name] = story.get(name, 0.0) + seconds
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def snapshot(self):
+        """Métricas da execução em um dicionário serializável"""
+        with self._lock:
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+                'wall_seconds': round(self.elapsed(), 6),
+                'phases': {name: dict(phase, seconds=round(phase['seconds'], 6),
+                                      max_seconds=round(phase['max_seconds'], 6))
+                           for name, phase in sorted(self.phases.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'stories': {story_id: {name: round(seconds, 6) for name, seconds in phases.items()}
+                            for story_id, phases in self.stories.items()},
+            }
+
+
+class _Phase:
+    """Mede uma fase e registra no MetricsRecorder ao sair do bloco"""
+
+    __slots__ = ('recorder', 'name', 'size', 'story_id', 'start')
+
+    def __init__(self, recorder, name, size, story_id):
+        self.recorder = recorder
+        self.name = name
+        self.size = size
+        self.story_id = story_id
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, time.perf_counter() - self.start, size=self.size, story_id=self.story_id)
+        return False
+
+
+def enable_metrics():
+    """Liga a instrumentação para a execução atual"""
+    global _recorder
+    _recorder = MetricsRecorder()
+    return _recorder
+
+
+def metrics_enabled():
+    return _recorder is not None
+
+
+def phase(name, size=0, story_id=None):
+    """Contexto que mede uma fase: with phase('write', size=n, story_id=id): ..."""
+    if _recorder is None:
+        return _NULL_PHASE
+    return _Phase(_recorder, name, size, story_id)
+
+
+def increment(name, amount=1):
+    if _recorder is not None:
+        _recorder.increment(name, amount)
+
+
+def add_bytes(name, size):
+    """Soma bytes a uma fase sem contar uma execução (ex.: tamanho do arquivo lido)"""
+    if _recorder is not None:
+        _recorder.add(name, 0.0, count=0, size=size)
+
+
+def timed_iter(name, iterable):
+    """Mede o tempo gasto produzindo cada item de um iterável (ex.: decodificação do JSON)"""
+    if _recorder is None:
+        return iterable
+    return _timed_iter(_recorder, name, iterable)
+
+
+def _timed_iter(recorder, name, iterable):
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            recorder.add(name, time.perf_counter() - start, count=0)
+            return
+        story_id = item.get('id') if isinstance(item, dict) else None
+        recorder.add(name, time.perf_counter() - start, story_id=story_id)
+        yield item
+
+
+def write_metrics_json(path):
+    """Grava as métricas da execução em JSON"""
+    data = _recorder.snapshot()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return data
+
+
+def prometheus_text(data):
+    """Formata as métricas no formato texto do Prometheus"""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        full_name = f'{PROMETHEUS_PREFIX}_{name}'
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} {kind}')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{value_}"' for key, value_ in labels.items())
+            lines.append(f'{full_name}{{{label_text}}} {value}' if label_text else f'{full_name} {value}')
+
+    phases = data['phases']
+    metric('phase_seconds', 'gauge', 'Tempo de relógio gasto em cada fase na última execução',
+           [({'phase': name}, phase['seconds']) for name, phase in phases.items()])
+    metric('phase_count', 'gauge', 'Execuções de cada fase na última execução',
+           [({'phase': name}, phase['count']) for name, phase in phases.items()])
+    metric('phase_bytes', 'gauge', 'Bytes processados em cada fase na última execução',
+           [({'phase': name}, phase['bytes']) for name, phase in phases.items()])
+    metric('events', 'gauge', 'Contadores da última execução',
+           [({'event': name}, value) for name, value in data['counters'].items()])
+    metric('duration_seconds', 'gauge', 'Duração total da última execução', [({}, data['wall_seconds'])])
+    metric('last_run_timestamp_seconds', 'gauge', 'Horário de término da última execução',
+           [({}, round(time.time(), 3))])
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, data=None):
+    """Grava o arquivo .prom de forma atômica (o collector nunca lê um arquivo pela metade)"""
+    data = data or _recorder.snapshot()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text(data))
+    os.replace(tmp_path, path)
+
+
+def print_metrics_summary(data=None):
+    data = data or _recorder.snapshot()
+    print(f"\n⏱️  Fases da execução ({data['wall_seconds']:.2f}s no total):")
+    for name, item in sorted(data['phases'].items(), key=lambda pair: -pair[1]['seconds']):
+        share = 100.0 * item['seconds'] / data['wall_seconds'] if data['wall_seconds'] else 0.0
+        size = f", {item['bytes']} bytes" if item['bytes'] else ''
+        print(f"   - {name}: {item['seconds']:.3f}s ({share:.1f}%), {item['count']}x{size}")
+
+
+def run_profiled(fn, output_path=DEFAULT_PROFILE_PATH, top=PROFILE_TOP):
+    """Executa fn sob o cProfile e grava as funções mais caras (tempo acumulado e próprio)"""
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn)
+    finally:
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.strip_dirs()
+        stream.write(f'Pontos quentes por tempo acumulado (top {top})\n')
+        stats.sort_stats('cumulative').print_stats(top)
+        stream.write(f'\nPontos quentes por tempo próprio (top {top})\n')
+        stats.sort_stats('tottime').print_stats(top)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        print(f"🔬 Perfil da execução salvo em {output_path}")
@@ -9,8 +9,10 @@ import sys
 import os
 from datetime import datetime
 import firebase_admin
-from firebase_admin import credentials, db
+from firebase_admin import credentials
 import argparse
+from story_schema import validate_story_data, rule_fields, NON_LANGUAGE_FIELDS
+from storage_backend import get_backend
 
 # Configuração do Firebase
 FIREBASE_CONFIG = {
@@ -40,36 +42,6 @@ def initialize_firebase():
         })
         print("✅ Firebase inicializado com sucesso")
 
-def validate_story_data(story_data):
-    """Valida se os dados da história estão corretos"""
-    required_fields = ['id', 'level', 'image']
-    required_languages = ['pt-br', 'en']
-    
-    # Verifica campos obrigatórios
-    for field in required_fields:
-        if field not in story_data:
-            raise ValueError(f"Campo obrigatório '{field}' não encontrado")
-    
-    # Verifica se pelo menos pt-br e en estão presentes
-    for lang in required_languages:
-        if lang not in story_data:
-            raise ValueError(f"Idioma obrigatório '{lang}' não encontrado")
-    
-    # Verifica estrutura dos idiomas
-    for lang, lang_data in story_data.items():
-        if lang in ['id', 'level', 'image']:
-            continue
-            
-        if not isinstance(lang_data, dict):
-            raise ValueError(f"Dados do idioma '{lang}' devem ser um objeto")
-        
-        required_lang_fields = ['title', 'clue_text', 'answer_text']
-        for field in required_lang_fields:
-            if field not in lang_data:
-                raise ValueError(f"Campo '{field}' obrigatório no idioma '{lang}'")
-    
-    return True
-
 def upload_story(story_data):
     """Faz upload de uma história para o Firebase"""
     try:
@@ -87,20 +59,20 @@ def upload_story(story_data):
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
         }
+        upload_data.update(rule_fields(story_data))
         
         # Adiciona as traduções
         for lang, lang_data in story_data.items():
-            if lang not in ['id', 'level', 'image']:
+            if lang not in NON_LANGUAGE_FIELDS:
                 upload_data[lang] = lang_data
         
         # Faz upload para o Firebase
-        ref = db.reference(f'stories/{story_id}')
-        ref.set(upload_data)
+        get_backend().set(f'stories/{story_id}', upload_data)
         
         print(f"✅ História {story_id} ('{story_data.get('pt-br', {}).get('title', 'Sem título')}') enviada com sucesso!")
         print(f"   - Nível: {story_level}")
         print(f"   - Imagem: {story_data['image']}")
-        print(f"   - Idiomas: {', '.join([k for k in story_data.keys() if k not in ['id', 'level', 'image']])}")
+        print(f"   - Idiomas: {', '.join([k for k in story_data.keys() if k not in NON_LANGUAGE_FIELDS])}")
         
         return True
         
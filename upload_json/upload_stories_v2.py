@@ -8,16 +8,48 @@ import json
 import sys
 import os
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, db
 import argparse
+from upload_engine import (run_concurrent, DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BUDGET)
+from story_stream import iter_stories
+from storage_backend import get_backend, add_backend_arguments, backend_from_args
+from story_schema import validate_story, validate_story_data, validate_upload_data, rule_fields, NON_LANGUAGE_FIELDS
+from catalog_shards import (configure_shards, shard_updates, shard_deletes, story_languages,
+                            DEFAULT_SHARD_LANGUAGES, DEFAULT_FALLBACK_LANGUAGE)
+from catalog_index import (configure_index, record_index_entry, index_deletes, index_dirty,
+                           take_index_updates, print_index_stats, INDEX_ROOT, INDEX_SIZES_PATH)
+from catalog_pages import (build_pages, pages_updates, PAGES_MANIFEST_PATH, PAGE_ORDERS,
+                           DEFAULT_PAGE_SIZE)
+from sync_manifest import (DEFAULT_MANIFEST_PATH, load_manifest, save_manifest, compute_plan,
+                           record_upload, record_delete, print_plan, source_key)
+from ingest import (discover_files, parse_files, find_duplicate_ids, load_state, save_state, state_key,
+                    DEFAULT_INCLUDE, DEFAULT_STATE_PATH)
+from upload_journal import file_hash, open_journal, record_ack, close_journal, DEFAULT_JOURNAL_DIR
+from search_index import publish_index, DEFAULT_STATE_PATH as SEARCH_STATE_PATH
+from upload_metrics import (phase, increment, add_bytes, timed_iter, metrics_enabled, enable_metrics,
+                            write_metrics_json, write_prometheus, print_metrics_summary, run_profiled,
+                            DEFAULT_PROFILE_PATH)
+
+DATABASE_URL = 'https://dark-tales-e67d1-default-rtdb.firebaseio.com/'
+
+# Limites padrão de cada lote no modo --batch
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_BYTES = 4 * 1024 * 1024
+
+# Erros que valem uma nova tentativa no modo --workers
+# O SDK do Firebase só é importado quando um comando fala com o banco
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+TRANSIENT_FIREBASE_ERRORS = ('UnavailableError', 'DeadlineExceededError', 'InternalError', 'ResourceExhaustedError')
 
 def initialize_firebase():
     """Inicializa o Firebase Admin SDK"""
+    import firebase_admin
+    from firebase_admin import credentials
+    
     try:
         # Verifica se já foi inicializado
         firebase_admin.get_app()
         print("✅ Firebase já inicializado")
+        return True
     except ValueError:
         # Carrega configuração do arquivo
         config_path = os.path.join(os.path.dirname(__file__), 'firebase_config.json')
@@ -28,14 +60,15 @@ def initialize_firebase():
             return False
         
         try:
-            with open(config_path, 'r') as f:
-                firebase_config = json.load(f)
-            
-            # Inicializa o Firebase
-            cred = credentials.Certificate(firebase_config)
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': 'https://dark-tales-e67d1-default-rtdb.firebaseio.com/'
-            })
+            with phase('credentials'):
+                with open(config_path, 'r') as f:
+                    firebase_config = json.load(f)
+                
+                # Inicializa o Firebase
+                cred = credentials.Certificate(firebase_config)
+                firebase_admin.initialize_app(cred, {
+                    'databaseURL': DATABASE_URL
+                })
             print("✅ Firebase inicializado com sucesso")
             return True
             
@@ -43,101 +76,477 @@ def initialize_firebase():
             print(f"❌ Erro ao inicializar Firebase: {str(e)}")
             return False
 
-def validate_story_data(story_data):
-    """Valida se os dados da história estão corretos"""
-    required_fields = ['id', 'level', 'image']
-    required_languages = ['pt-br', 'en']
+def build_upload_data(story_data, created_at=None):
+    """Monta os dados da história no formato salvo no Firebase
+    
+    created_at permite preservar a data de criação de uma história já enviada.
+    """
+    now = datetime.now().isoformat()
+    upload_data = {
+        'id': story_data['id'],
+        'level': story_data['level'],
+        'image': story_data['image'],
+        'created_at': created_at or now,
+        'updated_at': now
+    }
     
-    # Verifica campos obrigatórios
-    for field in required_fields:
-        if field not in story_data:
-            raise ValueError(f"Campo obrigatório '{field}' não encontrado")
+    # Miniatura gerada pelo image_pipeline.py, quando existir
+    if 'image_thumb' in story_data:
+        upload_data['image_thumb'] = story_data['image_thumb']
     
-    # Verifica se pelo menos pt-br e en estão presentes
-    for lang in required_languages:
-        if lang not in story_data:
-            raise ValueError(f"Idioma obrigatório '{lang}' não encontrado")
+    # Campos exigidos pelas regras do banco (difficulty, category)
+    upload_data.update(rule_fields(story_data))
     
-    # Verifica estrutura dos idiomas
+    # Adiciona as traduções
     for lang, lang_data in story_data.items():
-        if lang in ['id', 'level', 'image']:
-            continue
-            
-        if not isinstance(lang_data, dict):
-            raise ValueError(f"Dados do idioma '{lang}' devem ser um objeto")
-        
-        required_lang_fields = ['title', 'clue_text', 'answer_text']
-        for field in required_lang_fields:
-            if field not in lang_data:
-                raise ValueError(f"Campo '{field}' obrigatório no idioma '{lang}'")
+        if lang not in NON_LANGUAGE_FIELDS:
+            upload_data[lang] = lang_data
     
-    return True
+    return upload_data
+
+def prepare_story(story_data, created_at=None):
+    """Valida a história e os dados de upload contra o esquema e as regras do banco"""
+    story_id = story_data.get('id') if isinstance(story_data, dict) else None
+    with phase('validate', story_id=story_id):
+        validate_story_data(story_data)
+    with phase('build', story_id=story_id):
+        upload_data = build_upload_data(story_data, created_at)
+    with phase('validate', story_id=story_id):
+        errors = validate_upload_data(upload_data)
+    if errors:
+        raise ValueError('; '.join(errors))
+    return upload_data
+
+def print_upload_success(story_data):
+    """Mostra o resumo de uma história enviada com sucesso"""
+    print(f"✅ História {story_data['id']} ('{story_data.get('pt-br', {}).get('title', 'Sem título')}') enviada com sucesso!")
+    print(f"   - Nível: {story_data['level']}")
+    print(f"   - Imagem: {story_data['image']}")
+    print(f"   - Idiomas: {', '.join([k for k in story_data.keys() if k not in NON_LANGUAGE_FIELDS])}")
+
+def report_success(story_data, upload_data):
+    """Registra uma história enviada (diário e entrada do índice) e mostra o resumo"""
+    increment('stories_uploaded')
+    record_ack(story_data['id'])
+    record_index_entry(upload_data)
+    print_upload_success(story_data)
+
+def print_upload_error(story_data, error):
+    """Mostra o erro de upload de uma história"""
+    increment('stories_failed')
+    print(f"❌ Erro ao fazer upload da história {story_data.get('id', 'desconhecida')}: {str(error)}")
+
+def is_transient_error(error):
+    """Indica se um erro de escrita é transitório e pode ser repetido"""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # Se o SDK não foi carregado, o erro não pode ser dele
+    firebase_exceptions = sys.modules.get('firebase_admin.exceptions')
+    return firebase_exceptions is not None and isinstance(
+        error, tuple(getattr(firebase_exceptions, name) for name in TRANSIENT_FIREBASE_ERRORS))
+
+def story_updates(story_data, upload_data):
+    """Caminhos multi-path de uma história: stories/{id} e os shards por idioma"""
+    updates = {f'stories/{story_data["id"]}': upload_data}
+    updates.update(shard_updates(upload_data))
+    return updates
+
+def payload_size(updates):
+    """Bytes serializados de uma escrita (só calculado com a instrumentação ligada)"""
+    if not metrics_enabled():
+        return 0
+    return len(json.dumps(updates, ensure_ascii=False).encode('utf-8'))
+
+def write_story(item):
+    """Grava o par (história, dados de upload) em stories/{id} e nos shards, em uma única escrita"""
+    updates = story_updates(*item)
+    with phase('write', size=payload_size(updates), story_id=item[0]['id']):
+        get_backend().update('/', updates)
 
 def upload_story(story_data):
     """Faz upload de uma história para o Firebase"""
     try:
-        # Valida os dados
-        validate_story_data(story_data)
-        
-        story_id = story_data['id']
-        story_level = story_data['level']
+        # Valida e prepara os dados para upload
+        upload_data = prepare_story(story_data)
         
-        # Prepara os dados para upload
-        upload_data = {
-            'id': story_id,
-            'level': story_level,
-            'image': story_data['image'],
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-        
-        # Adiciona as traduções
-        for lang, lang_data in story_data.items():
-            if lang not in ['id', 'level', 'image']:
-                upload_data[lang] = lang_data
+        write_story((story_data, upload_data))
         
-        # Faz upload para o Firebase
-        ref = db.reference(f'stories/{story_id}')
-        ref.set(upload_data)
+        report_success(story_data, upload_data)
+        return True
         
-        print(f"✅ História {story_id} ('{story_data.get('pt-br', {}).get('title', 'Sem título')}') enviada com sucesso!")
-        print(f"   - Nível: {story_level}")
-        print(f"   - Imagem: {story_data['image']}")
-        print(f"   - Idiomas: {', '.join([k for k in story_data.keys() if k not in ['id', 'level', 'image']])}")
+    except Exception as e:
+        print_upload_error(story_data, e)
+        return False
+
+def chunk_stories(items, batch_size=DEFAULT_BATCH_SIZE, batch_bytes=DEFAULT_BATCH_BYTES, updates_fn=story_updates):
+    """Agrupa pares (história, dados de upload) em lotes limitados por quantidade e por bytes
+
+    O tamanho de cada história é o dos caminhos que ela realmente envia
+    (updates_fn: stories/{id} e os shards por idioma, por padrão).
+    """
+    chunk = []
+    chunk_bytes = 0
+    
+    for story_data, upload_data in items:
+        size = len(json.dumps(updates_fn(story_data, upload_data), ensure_ascii=False).encode('utf-8'))
         
-        return True
+        # Fecha o lote atual se a próxima história estourar algum limite
+        if chunk and (len(chunk) >= batch_size or chunk_bytes + size > batch_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
         
+        chunk.append((story_data, upload_data))
+        chunk_bytes += size
+    
+    if chunk:
+        yield chunk
+
+def write_batch(chunk):
+    """Grava um lote de histórias (e seus shards) com um único update multi-path"""
+    updates = {}
+    for story_data, upload_data in chunk:
+        updates.update(story_updates(story_data, upload_data))
+    with phase('write', size=payload_size(updates)):
+        get_backend().update('/', updates)
+
+def upload_batch(chunk):
+    """Envia um lote de histórias e mostra o resultado de cada uma"""
+    try:
+        write_batch(chunk)
+    except Exception as e:
+        for story_data, _ in chunk:
+            print_upload_error(story_data, e)
+        return 0
+    
+    for story_data, upload_data in chunk:
+        report_success(story_data, upload_data)
+    return len(chunk)
+
+def validated_stories(stories):
+    """Valida as histórias, reporta as inválidas e gera pares (história, dados de upload)"""
+    for story_data in stories:
+        try:
+            upload_data = prepare_story(story_data)
+        except Exception as e:
+            print_upload_error(story_data, e)
+            continue
+        yield story_data, upload_data
+
+def upload_stories_batched(stories, batch_size=DEFAULT_BATCH_SIZE, batch_bytes=DEFAULT_BATCH_BYTES):
+    """Valida as histórias e envia em lotes, retornando quantas foram enviadas"""
+    success_count = 0
+    for i, chunk in enumerate(chunk_stories(validated_stories(stories), batch_size, batch_bytes), 1):
+        print(f"\n📦 Enviando lote {i} ({len(chunk)} histórias)...")
+        success_count += upload_batch(chunk)
+    
+    return success_count
+
+def upload_stories_concurrent(stories, workers, batch_size=None, batch_bytes=DEFAULT_BATCH_BYTES,
+                              max_retries=DEFAULT_MAX_RETRIES, retry_budget=DEFAULT_RETRY_BUDGET):
+    """Envia as histórias com um pool de threads, retentativas e backoff
+    
+    Com batch_size definido, cada tarefa do pool é um lote multi-path.
+    Retorna quantas histórias foram enviadas.
+    """
+    if batch_size:
+        items = chunk_stories(validated_stories(stories), batch_size, batch_bytes)
+        write_fn = write_batch
+        on_success = lambda chunk, _: [report_success(*item) for item in chunk]
+        on_failure = lambda chunk, e: [print_upload_error(story_data, e) for story_data, _ in chunk]
+        item_size = len
+    else:
+        items = validated_stories(stories)
+        write_fn = write_story
+        on_success = lambda item, _: report_success(*item)
+        on_failure = lambda item, e: print_upload_error(item[0], e)
+        item_size = lambda item: 1
+    
+    print(f"⚙️  Enviando com {workers} workers (até {max_retries} retentativas por escrita, orçamento de {retry_budget})")
+    stats = run_concurrent(items, write_fn, workers,
+                           on_success=on_success, on_failure=on_failure,
+                           is_transient=is_transient_error, max_retries=max_retries,
+                           retry_budget=retry_budget, item_size=item_size)
+    stats.print_summary()
+    return stats.success
+
+def write_index():
+    """Grava as entradas do índice acumuladas na execução com um único update multi-path"""
+    if not index_dirty():
+        return False
+    
+    try:
+        # O meta cobre o índice inteiro: lê as chaves e os tamanhos já gravados
+        backend = get_backend()
+        updates, stats = take_index_updates(backend.get_shallow(INDEX_ROOT), backend.get(INDEX_SIZES_PATH))
+        with phase('index', size=payload_size(updates)):
+            backend.update('/', updates)
+    except Exception as e:
+        print(f"❌ Erro ao atualizar o índice do catálogo: {str(e)}")
+        return False
+    
+    print_index_stats(stats)
+    return True
+
+def write_pages(files, page_size=DEFAULT_PAGE_SIZE, order='id'):
+    """Gera as páginas do catálogo a partir dos arquivos e regrava só as que mudaram
+
+    `files` deve cobrir o catálogo completo (ver catalog_files): páginas que
+    ficam sobrando são removidas.
+    """
+    stories = catalog_stories(files, 'stories_pages/')
+    if stories is None:
+        return False
+    
+    pages = build_pages(stories.values(), page_size, order)
+    
+    try:
+        with phase('pages'):
+            remote_manifest = get_backend().get(PAGES_MANIFEST_PATH)
+            updates, changed, removed = pages_updates(pages, page_size, order, remote_manifest)
+            if updates:
+                get_backend().update('/', updates)
+    except Exception as e:
+        print(f"❌ Erro ao gravar as páginas do catálogo: {str(e)}")
+        return False
+    
+    print(f"📄 Páginas do catálogo: {len(pages)} páginas de até {page_size} histórias (ordem: {order}), "
+          f"{len(changed)} regravadas, {len(pages) - len(changed)} sem alteração, {removed} removidas")
+    return True
+
+def story_roots(args):
+    """Pastas percorridas recursivamente: --root, ou a pasta atual com --all
+
+    Sem nenhum dos dois retorna None: só a pasta atual é lida, sem recursão.
+    """
+    if args.roots:
+        return args.roots
+    return ['.'] if args.all else None
+
+def recorded_files(manifest_path=DEFAULT_MANIFEST_PATH, state_path=DEFAULT_STATE_PATH):
+    """Arquivos já enviados que ainda existem: origens do manifesto do --sync e do estado do --all"""
+    sources = set()
+    try:
+        sources.update(entry['source'] for entry in load_manifest(manifest_path)['stories'].values()
+                       if entry.get('source'))
+    except Exception as e:
+        print(f"⚠️  Não foi possível ler o manifesto {manifest_path}: {str(e)}")
+    try:
+        sources.update(load_state(state_path)['files'])
+    except Exception as e:
+        print(f"⚠️  Não foi possível ler o estado {state_path}: {str(e)}")
+    return [os.path.relpath(path) for path in sorted(sources) if os.path.isfile(path)]
+
+def catalog_files(args):
+    """Arquivos do catálogo completo, ou None se não houver como saber quais são
+
+    Com --root/--all são as pastas percorridas (com --include/--exclude); sem
+    eles, os arquivos já enviados registrados no manifesto e no estado da
+    ingestão. O arquivo da linha de comando entra por último. O índice de
+    busca e as páginas descrevem o catálogo inteiro: montados com um conjunto
+    menor, os ids que ficaram de fora seriam removidos.
+    """
+    roots = story_roots(args)
+    if roots:
+        include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+        exclude = args.exclude.split(',') if args.exclude else ()
+        files = discover_files(roots, include, exclude)
+    else:
+        files = recorded_files(args.manifest, args.ingest_state)
+        if not files:
+            print("❌ Catálogo completo desconhecido: nenhum arquivo registrado no manifesto ou no estado "
+                  "da ingestão; use --root ou --all para gerar as páginas e o índice de busca")
+            return None
+    if args.file:
+        # Por último, para a versão recém-enviada de cada id vencer
+        file_path = os.path.normpath(args.file)
+        files = [path for path in files if os.path.normpath(path) != file_path] + [file_path]
+    return files
+
+def catalog_stories(files, target):
+    """Histórias válidas do catálogo por id, ou None se algum arquivo não puder ser lido
+
+    Um arquivo ilegível é informado e nada é gravado: sem ele, suas histórias
+    sairiam das páginas e do índice de busca como se tivessem sido apagadas.
+    """
+    stories = {}
+    unreadable = 0
+    for file_path in files:
+        try:
+            file_stories = list(iter_stories(file_path))
+        except Exception as e:
+            print(f"❌ Erro ao ler {file_path}: {str(e)}")
+            unreadable += 1
+            continue
+        for story_data in file_stories:
+            if not validate_story(story_data):
+                stories[story_data['id']] = story_data
+    
+    if unreadable:
+        print(f"⚠️  Nada gravado em {target}: {unreadable} arquivos do catálogo não puderam ser lidos")
+        return None
+    return stories
+
+def write_search_index(files, languages=None, state_path=SEARCH_STATE_PATH):
+    """Atualiza o índice de busca só com os termos das histórias alteradas
+
+    `files` deve cobrir o catálogo completo (ver catalog_files): ids ausentes
+    têm seus termos removidos.
+    """
+    stories = catalog_stories(files, 'search_index/')
+    if stories is None:
+        return False
+    
+    try:
+        with phase('search_index'):
+            publish_index(list(stories.values()), languages or DEFAULT_SHARD_LANGUAGES, state_path)
     except Exception as e:
-        print(f"❌ Erro ao fazer upload da história {story_data.get('id', 'desconhecida')}: {str(e)}")
+        print(f"❌ Erro ao gravar o índice de busca: {str(e)}")
         return False
+    return True
+
+def load_stories(file_path):
+    """Carrega as histórias de um arquivo JSON (array, {"stories": [...]} ou história única)"""
+    stories = list(timed_iter('decode', iter_stories(file_path)))
+    add_bytes('decode', os.path.getsize(file_path))
+    return stories
+
+def deleted_languages(story_id, manifest_entry):
+    """Idiomas de uma história a apagar: do manifesto ou, em manifestos antigos, da história gravada"""
+    languages = (manifest_entry or {}).get('languages')
+    if languages is None:
+        try:
+            stored = get_backend().get(f'stories/{story_id}')
+        except Exception:
+            stored = None
+        languages = story_languages(stored) if isinstance(stored, dict) else []
+    return languages
+
+def sync_stories(stories, manifest_path=DEFAULT_MANIFEST_PATH, delete_missing=False, plan_only=False,
+                 batch_size=DEFAULT_BATCH_SIZE, batch_bytes=DEFAULT_BATCH_BYTES, sources=None, folders=()):
+    """Envia apenas as histórias novas ou alteradas desde o último upload
+    
+    Usa o manifesto local (id -> hash do conteúdo) para calcular a diferença.
+    Histórias alteradas mantêm o created_at original. Com delete_missing, ids
+    que sumiram dos arquivos locais são apagados do Firebase, só entre os que
+    vieram desses arquivos (ver compute_plan: sources e folders).
+    """
+    manifest = load_manifest(manifest_path)
+    plan = compute_plan((story for story, _ in validated_stories(stories)), manifest, delete_missing,
+                        sources, folders)
+    print_plan(plan)
+    
+    if plan_only:
+        return plan
+    
+    if not (plan['adds'] or plan['updates'] or plan['deletes']):
+        # Guarda a origem registrada para as histórias sem alteração
+        save_manifest(manifest, manifest_path)
+        print("\n✅ Nada para sincronizar")
+        return plan
+    
+    known = manifest['stories']
+    items = []
+    for entry in plan['adds'] + plan['updates']:
+        created_at = known.get(entry['id'], {}).get('created_at')
+        items.append((entry['story'], build_upload_data(entry['story'], created_at)))
+    entries = {entry['id']: entry for entry in plan['adds'] + plan['updates']}
+    
+    success_count = 0
+    try:
+        for i, chunk in enumerate(chunk_stories(items, batch_size, batch_bytes), 1):
+            print(f"\n📦 Enviando lote {i} ({len(chunk)} histórias)...")
+            if upload_batch(chunk):
+                success_count += len(chunk)
+                for story_data, upload_data in chunk:
+                    record_upload(manifest, entries[str(story_data['id'])], upload_data['created_at'])
+        
+        for start in range(0, len(plan['deletes']), batch_size):
+            ids = [entry['id'] for entry in plan['deletes'][start:start + batch_size]]
+            updates = {}
+            for story_id in ids:
+                updates[f'stories/{story_id}'] = None
+                updates.update(shard_deletes(story_id, deleted_languages(story_id, manifest['stories'].get(story_id))))
+                updates.update(index_deletes(story_id))
+            try:
+                get_backend().update('/', updates)
+            except Exception as e:
+                print(f"❌ Erro ao apagar histórias {', '.join(ids)}: {str(e)}")
+                continue
+            for story_id in ids:
+                record_delete(manifest, story_id)
+                print(f"🗑️  História {story_id} apagada")
+    finally:
+        save_manifest(manifest, manifest_path)
+        write_index()
+    
+    print(f"\n🎉 Sincronização concluída! {success_count}/{len(items)} histórias enviadas, "
+          f"{len(plan['deletes'])} remoções solicitadas")
+    return plan
 
-def upload_from_file(file_path):
-    """Faz upload de histórias a partir de um arquivo JSON"""
+def upload_from_file(file_path, batch_size=None, batch_bytes=DEFAULT_BATCH_BYTES, workers=None,
+                     max_retries=DEFAULT_MAX_RETRIES, retry_budget=DEFAULT_RETRY_BUDGET,
+                     resume=False, journal_dir=DEFAULT_JOURNAL_DIR):
+    """Faz upload de histórias a partir de um arquivo JSON
+    
+    Com batch_size definido, as histórias são enviadas em lotes multi-path.
+    Com workers definido, as escritas rodam em paralelo com retentativas.
+    Cada história confirmada é registrada no diário do arquivo; com resume,
+    as já confirmadas em uma execução anterior são puladas.
+    """
+    read_count = 0
+    skipped_count = 0
+    completed = False
+    journal = None
+    # Cópia das confirmadas da execução anterior: o diário cresce durante
+    # esta execução e ids repetidos no arquivo não podem ser pulados por isso
+    resumed_ids = set()
+    
+    def stories():
+        # Conta as histórias à medida que o arquivo é lido
+        nonlocal read_count, skipped_count
+        seen_ids = set()
+        for story in timed_iter('decode', iter_stories(file_path)):
+            read_count += 1
+            story_id = str(story.get('id')) if isinstance(story, dict) else None
+            if story_id in resumed_ids and story_id not in seen_ids:
+                # Já gravada na execução anterior: só volta para o índice,
+                # que é regravado no final
+                seen_ids.add(story_id)
+                skipped_count += 1
+                record_index_entry(build_upload_data(story))
+                continue
+            if story_id is not None:
+                seen_ids.add(story_id)
+            yield story
+        add_bytes('decode', os.path.getsize(file_path))
+    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        journal = open_journal(file_path, resume, journal_dir)
+        if resume:
+            resumed_ids = set(journal.acked)
+            print(f"⏯️  Retomando upload: {len(resumed_ids)} histórias já confirmadas serão puladas")
         
-        # Se é uma lista de histórias
-        if isinstance(data, list):
-            print(f"📚 Encontradas {len(data)} histórias no arquivo")
-            success_count = 0
-            
-            for i, story in enumerate(data, 1):
-                print(f"\n📖 Processando história {i}/{len(data)}...")
+        # As histórias são lidas uma a uma: validação e envio começam
+        # enquanto o arquivo ainda está sendo processado
+        print(f"📚 Lendo histórias de {file_path}")
+        success_count = 0
+        
+        if workers:
+            success_count = upload_stories_concurrent(stories(), workers, batch_size, batch_bytes,
+                                                      max_retries, retry_budget)
+        elif batch_size:
+            success_count = upload_stories_batched(stories(), batch_size, batch_bytes)
+        else:
+            for i, story in enumerate(stories(), 1):
+                print(f"\n📖 Processando história {i}...")
                 if upload_story(story):
                     success_count += 1
-            
-            print(f"\n🎉 Upload concluído! {success_count}/{len(data)} histórias enviadas com sucesso")
-            
-        # Se é uma única história
-        elif isinstance(data, dict):
-            print("📖 Processando história única...")
-            if upload_story(data):
-                print("\n🎉 História enviada com sucesso!")
-            else:
-                print("\n❌ Falha ao enviar história")
-        else:
-            raise ValueError("Formato de arquivo inválido. Deve ser um objeto ou array de histórias")
+        
+        print(f"\n🎉 Upload concluído! {success_count}/{read_count - skipped_count} histórias enviadas com sucesso")
+        if skipped_count:
+            print(f"   - {skipped_count} histórias puladas (já confirmadas)")
+        completed = success_count + skipped_count == read_count
             
     except FileNotFoundError:
         print(f"❌ Arquivo não encontrado: {file_path}")
@@ -145,20 +554,117 @@ def upload_from_file(file_path):
         print(f"❌ Erro ao decodificar JSON: {str(e)}")
     except Exception as e:
         print(f"❌ Erro inesperado: {str(e)}")
+    finally:
+        # Mesmo se o arquivo falhar no meio, indexa o que já foi enviado
+        write_index()
+        if journal is not None and not completed:
+            print(f"💾 {len(journal.acked)} histórias confirmadas no diário; "
+                  f"rode de novo com --resume para continuar de onde parou")
+        close_journal(completed)
 
-def upload_all_json_files():
-    """Faz upload de todos os arquivos JSON na pasta"""
-    json_files = [f for f in os.listdir('.') if f.endswith('.json') and f != 'firebase_config.json']
+def list_json_files():
+    """Lista os arquivos JSON de histórias na pasta atual"""
+    return [f for f in os.listdir('.')
+            if f.endswith('.json') and f != 'firebase_config.json' and not f.startswith('.')]
+
+def upload_all_json_files(roots=None, include=DEFAULT_INCLUDE, exclude=(), parse_workers=None,
+                          batch_size=None, batch_bytes=DEFAULT_BATCH_BYTES, workers=None,
+                          max_retries=DEFAULT_MAX_RETRIES, retry_budget=DEFAULT_RETRY_BUDGET,
+                          state_path=DEFAULT_STATE_PATH, force=False):
+    """Faz upload de todos os arquivos JSON encontrados sob as pastas
+    
+    Os arquivos são lidos e validados em paralelo por um pool de processos;
+    as escritas saem todas deste processo, pela mesma conexão. Ids repetidos
+    entre arquivos cancelam o envio antes de qualquer escrita. Arquivos com o
+    mesmo hash do último envio bem-sucedido são pulados (exceto com force).
+    Sem roots, só os arquivos JSON da pasta atual são lidos (sem recursão).
+    """
+    json_files = discover_files(roots, include, exclude) if roots else list_json_files()
     
     if not json_files:
-        print("❌ Nenhum arquivo JSON encontrado na pasta")
-        return
+        print("❌ Nenhum arquivo JSON encontrado")
+        return 0
     
     print(f"📚 Encontrados {len(json_files)} arquivos JSON")
     
-    for file_path in json_files:
-        print(f"\n📁 Processando arquivo: {file_path}")
-        upload_from_file(file_path)
+    state = load_state(state_path)
+    known = state['files']
+    tasks = []
+    unchanged = []
+    with phase('hash'):
+        for file_path in json_files:
+            digest = file_hash(file_path)
+            previous = known.get(state_key(file_path))
+            if not force and previous and previous['hash'] == digest:
+                unchanged.append(file_path)
+            else:
+                tasks.append((file_path, digest))
+    
+    if unchanged:
+        print(f"⏭️  {len(unchanged)} arquivos sem alteração desde o último envio serão pulados")
+    if not tasks:
+        print("\n✅ Nada para enviar")
+        return 0
+    
+    print(f"🔎 Lendo e validando {len(tasks)} arquivos em paralelo...")
+    with phase('parse'):
+        results = parse_files(tasks, parse_workers)
+    
+    ids_by_file = {file_path: known[state_key(file_path)]['ids'] for file_path in unchanged}
+    clean_files = set()
+    for result in results:
+        if 'error' in result:
+            print(f"❌ Erro ao ler {result['path']}: {result['error']}")
+            continue
+        add_bytes('decode', result['bytes'])
+        for item in result['errors']:
+            increment('stories_failed')
+            print(f"❌ {result['path']}: história {item['id'] if item['id'] is not None else 'desconhecida'} "
+                  f"(posição {item['index']}): {'; '.join(item['errors'])}")
+        if not result['errors']:
+            clean_files.add(result['path'])
+        ids_by_file[result['path']] = [story['id'] for story in result['stories']]
+    
+    duplicates = find_duplicate_ids(ids_by_file)
+    if duplicates:
+        print(f"\n❌ {len(duplicates)} ids repetidos entre os arquivos; nada foi enviado:")
+        for story_id, paths in sorted(duplicates.items(), key=lambda pair: (len(pair[0]), pair[0])):
+            print(f"   - id {story_id}: {', '.join(paths)}")
+        return 0
+    
+    items = []
+    file_of = {}
+    for result in results:
+        for story_data in result['stories']:
+            items.append((story_data, build_upload_data(story_data)))
+            file_of[str(story_data['id'])] = result['path']
+    
+    failed_files = set()
+    
+    def on_failure(chunk, error):
+        for story_data, _ in chunk:
+            failed_files.add(file_of[str(story_data['id'])])
+            print_upload_error(story_data, error)
+    
+    print(f"\n📦 Enviando {len(items)} histórias de {len(results)} arquivos por uma única conexão...")
+    try:
+        stats = run_concurrent(chunk_stories(items, batch_size or DEFAULT_BATCH_SIZE, batch_bytes),
+                               write_batch, workers or 1,
+                               on_success=lambda chunk, _: [report_success(*item) for item in chunk],
+                               on_failure=on_failure, is_transient=is_transient_error,
+                               max_retries=max_retries, retry_budget=retry_budget, item_size=len)
+        stats.print_summary()
+    finally:
+        # Só marca como enviado o arquivo sem histórias inválidas e sem falhas de escrita
+        for result in results:
+            path = result['path']
+            if path in clean_files and path not in failed_files:
+                known[state_key(path)] = {'hash': result['hash'], 'ids': ids_by_file[path]}
+        save_state(state, state_path)
+        write_index()
+    
+    print(f"\n🎉 Upload concluído! {stats.success}/{len(items)} histórias enviadas de {len(results)} arquivos")
+    return stats.success
 
 def create_example_story():
     """Cria um arquivo de exemplo com a estrutura correta"""
@@ -183,31 +689,131 @@ def create_example_story():
     
     print("📝 Arquivo de exemplo criado: exemplo_historia.json")
 
-def main():
-    parser = argparse.ArgumentParser(description='Upload de histórias para Firebase Realtime Database')
-    parser.add_argument('file', nargs='?', help='Arquivo JSON específico para upload (opcional)')
-    parser.add_argument('--all', action='store_true', help='Fazer upload de todos os arquivos JSON na pasta')
-    parser.add_argument('--example', action='store_true', help='Criar arquivo de exemplo')
-    
-    args = parser.parse_args()
-    
+def write_catalog(args, shard_langs):
+    """Gera as páginas e/ou o índice de busca a partir do catálogo completo"""
+    files = catalog_files(args)
+    if files is None:
+        return
+    if args.pages:
+        write_pages(files, args.page_size, args.page_order)
+    if args.search_index:
+        write_search_index(files, shard_langs, args.search_state)
+
+def run(args):
+    """Executa o upload escolhido na linha de comando"""
     print("🚀 Iniciando script de upload de histórias...")
     
     if args.example:
         create_example_story()
         return
     
-    # Inicializa Firebase
-    if not initialize_firebase():
+    shard_langs = [lang.strip() for lang in (args.shard_langs or '').split(',') if lang.strip() and lang.strip() != 'all']
+    configure_shards(enabled=not args.no_shards, languages=shard_langs,
+                     fallback=args.fallback_lang, all_languages=args.shard_langs == 'all')
+    configure_index(enabled=not args.no_index, by_level=args.index_by_level)
+    
+    if args.sync or args.plan:
+        files = [args.file] if args.file else list_json_files()
+        # Sem arquivo, a pasta atual é lida por inteiro: arquivos apagados dela entram no escopo
+        folders = () if args.file else {source_key('.')}
+        stories = []
+        sources = {}
+        for file_path in files:
+            try:
+                file_stories = load_stories(file_path)
+            except Exception as e:
+                print(f"❌ Erro ao ler {file_path}: {str(e)}")
+                return
+            stories.extend(file_stories)
+            sources.update((str(story['id']), source_key(file_path))
+                           for story in file_stories if isinstance(story, dict) and 'id' in story)
+        
+        if not args.plan and not backend_from_args(args, initialize_firebase):
+            return
+        sync_stories(stories, args.manifest, args.delete_missing, args.plan,
+                     args.batch_size, args.batch_bytes, sources, folders)
+        if (args.pages or args.search_index) and not args.plan:
+            write_catalog(args, shard_langs)
+        return
+    
+    # Inicializa Firebase (ou o backend local)
+    if not backend_from_args(args, initialize_firebase):
         return
     
-    if args.all:
-        upload_all_json_files()
-    elif args.file:
-        upload_from_file(args.file)
+    batch_size = args.batch_size if args.batch else None
+    upload_options = (batch_size, args.batch_bytes, args.workers, args.max_retries, args.retry_budget)
+    
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+    roots = story_roots(args)
+    
+    if args.file and not args.all:
+        upload_from_file(args.file, *upload_options, args.resume, args.journal_dir)
     else:
         # Se não especificou arquivo, tenta fazer upload de todos
-        upload_all_json_files()
+        upload_all_json_files(roots, include, exclude, args.parse_workers, *upload_options,
+                              args.ingest_state, args.force)
+    
+    if args.pages or args.search_index:
+        write_catalog(args, shard_langs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Upload de histórias para Firebase Realtime Database')
+    parser.add_argument('file', nargs='?', help='Arquivo JSON específico para upload (opcional)')
+    parser.add_argument('--all', action='store_true', help='Fazer upload de todos os arquivos JSON na pasta')
+    parser.add_argument('--example', action='store_true', help='Criar arquivo de exemplo')
+    parser.add_argument('--batch', action='store_true', help='Enviar as histórias em lotes com updates multi-path')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Máximo de histórias por lote (padrão: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--batch-bytes', type=int, default=DEFAULT_BATCH_BYTES, help=f'Máximo de bytes serializados por lote (padrão: {DEFAULT_BATCH_BYTES})')
+    parser.add_argument('--workers', type=int, help='Número de threads enviando histórias em paralelo')
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES, help=f'Retentativas por escrita em falhas transitórias (padrão: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--retry-budget', type=int, default=DEFAULT_RETRY_BUDGET, help=f'Total de retentativas permitido na execução (padrão: {DEFAULT_RETRY_BUDGET})')
+    parser.add_argument('--sync', action='store_true', help='Enviar apenas histórias novas ou alteradas desde o último upload')
+    parser.add_argument('--plan', action='store_true', help='Mostrar o plano de sincronização sem enviar nada')
+    parser.add_argument('--delete-missing', action='store_true', help='No modo --sync, apagar do Firebase histórias que sumiram dos arquivos')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH, help='Caminho do manifesto de sincronização')
+    parser.add_argument('--no-shards', action='store_true', help='Não gravar os shards por idioma em stories_by_lang/')
+    parser.add_argument('--shard-langs', help=f'Idiomas dos shards separados por vírgula, ou "all" para incluir todos os da história (padrão: {",".join(DEFAULT_SHARD_LANGUAGES)})')
+    parser.add_argument('--fallback-lang', default=DEFAULT_FALLBACK_LANGUAGE, help=f'Idioma usado no shard quando falta a tradução (padrão: {DEFAULT_FALLBACK_LANGUAGE})')
+    parser.add_argument('--no-index', action='store_true', help='Não atualizar o índice compacto stories_index/')
+    parser.add_argument('--index-by-level', action='store_true', help='Manter também o índice agrupado por nível em stories_index_by_level/')
+    parser.add_argument('--pages', action='store_true', help='Gerar as páginas do catálogo em stories_pages/ após o upload')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help=f'Histórias por página (padrão: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--page-order', choices=sorted(PAGE_ORDERS), default='id', help='Ordem das histórias nas páginas (padrão: id)')
+    parser.add_argument('--search-index', action='store_true', help='Atualizar o índice de busca em search_index/ após o upload (idiomas de --shard-langs)')
+    parser.add_argument('--search-state', default=SEARCH_STATE_PATH, help='Estado local do índice de busca')
+    parser.add_argument('--root', dest='roots', action='append', help='Pasta percorrida recursivamente (pode repetir; com --all o padrão é a pasta atual; sem --all e sem --root só a pasta atual é lida, sem recursão)')
+    parser.add_argument('--include', help='Padrões glob dos arquivos incluídos com --all, separados por vírgula (padrão: *.json)')
+    parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas excluídos com --all, separados por vírgula')
+    parser.add_argument('--parse-workers', type=int, help='Processos lendo e validando arquivos com --all (padrão: número de CPUs)')
+    parser.add_argument('--ingest-state', default=DEFAULT_STATE_PATH, help='Estado dos arquivos já enviados com --all')
+    parser.add_argument('--force', action='store_true', help='Com --all, enviar também os arquivos sem alteração')
+    parser.add_argument('--resume', action='store_true', help='Retomar um upload interrompido, pulando as histórias já confirmadas')
+    parser.add_argument('--journal-dir', default=DEFAULT_JOURNAL_DIR, help='Pasta dos diários de upload (padrão: .upload_journal)')
+    parser.add_argument('--metrics', help='Gravar tempo, contagem e bytes de cada fase e de cada história neste JSON')
+    parser.add_argument('--prometheus', help='Gravar as métricas no formato texto do Prometheus (textfile collector)')
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_PATH, help=f'Rodar sob o cProfile e gravar os pontos quentes (padrão: {DEFAULT_PROFILE_PATH})')
+    add_backend_arguments(parser)
+    
+    args = parser.parse_args(argv)
+    
+    if args.metrics or args.prometheus:
+        enable_metrics()
+    
+    try:
+        if args.profile:
+            run_profiled(lambda: run(args), args.profile)
+        else:
+            run(args)
+    finally:
+        if metrics_enabled():
+            print_metrics_summary()
+            if args.metrics:
+                write_metrics_json(args.metrics)
+                print(f"📈 Métricas salvas em {args.metrics}")
+            if args.prometheus:
+                write_prometheus(args.prometheus)
+                print(f"📈 Métricas do Prometheus salvas em {args.prometheus}")
 
 if __name__ == "__main__":
     main()
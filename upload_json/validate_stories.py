@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Valida arquivos e pastas de histórias em paralelo e gera um relatório JSON
+Uso: python validate_stories.py [caminhos...] [--workers N] [--output relatorio.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from story_schema import validate_story, validate_upload_data, rule_fields
+from story_stream import iter_stories
+
+IGNORED_FILES = {'firebase_config.json', 'firebase_config_example.json'}
+# Arquivos maiores que isso são validados em blocos de histórias, em paralelo
+LARGE_FILE_BYTES = 4 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def find_json_files(paths):
+    """Lista os arquivos JSON e NDJSON de histórias nos caminhos (pastas são percorridas recursivamente)"""
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(names):
+                if name.endswith(('.json', '.ndjson')) and not name.startswith('.') and name not in IGNORED_FILES:
+                    files.append(os.path.join(root, name))
+    return files
+
+
+def new_report(file_path):
+    return {'path': file_path, 'stories': 0, 'valid': 0, 'invalid': 0, 'errors': []}
+
+
+def validate_into(report, stories, start=0):
+    """Valida as histórias e soma o resultado no relatório (índices contados a partir de start)"""
+    for index, story in enumerate(stories, start):
+        report['stories'] += 1
+        errors = validate_story(story)
+        if not errors:
+            # Confere também as restrições das regras do banco
+            errors = validate_upload_data(dict(story, **rule_fields(story)))
+        if errors:
+            report['invalid'] += 1
+            story_id = story.get('id') if isinstance(story, dict) else None
+            report['errors'].append({'index': index, 'id': story_id, 'errors': errors})
+        else:
+            report['valid'] += 1
+
+
+def validate_file(file_path):
+    """Valida todas as histórias de um arquivo e retorna o relatório dele"""
+    report = new_report(file_path)
+    try:
+        validate_into(report, iter_stories(file_path))
+    except Exception as e:
+        report['error'] = str(e)
+    return report
+
+
+def validate_chunk(task):
+    """Valida um bloco de histórias de um arquivo grande (roda em um processo do pool)"""
+    file_path, start, stories = task
+    report = new_report(file_path)
+    validate_into(report, stories, start)
+    return report
+
+
+def validation_tasks(files, reports, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Gera (função, argumento) para o pool: um por arquivo pequeno, blocos de histórias nos grandes
+
+    Os arquivos grandes são lidos aqui, em sequência; um erro de leitura fica
+    no relatório do arquivo e os blocos já lidos continuam valendo.
+    """
+    for file_path in files:
+        if os.path.getsize(file_path) <= LARGE_FILE_BYTES:
+            yield validate_file, file_path
+            continue
+        start = 0
+        chunk = []
+        try:
+            for story in iter_stories(file_path):
+                chunk.append(story)
+                if len(chunk) == chunk_size:
+                    yield validate_chunk, (file_path, start, chunk)
+                    start += len(chunk)
+                    chunk = []
+        except Exception as e:
+            reports[file_path]['error'] = str(e)
+        if chunk:
+            yield validate_chunk, (file_path, start, chunk)
+
+
+def run_tasks(tasks, workers=None):
+    """Executa as tarefas em um pool de processos, com no máximo algumas por processo na fila"""
+    from concurrent.futures import ProcessPoolExecutor
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for function, argument in tasks:
+            pending.append(executor.submit(function, argument))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def validate_paths(paths, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Valida os arquivos encontrados nos caminhos usando um pool de processos
+
+    Arquivos grandes são divididos em blocos de chunk_size histórias, então
+    um arquivo único também usa todos os núcleos.
+    """
+    start = time.perf_counter()
+    files = find_json_files(paths)
+    reports = {file_path: new_report(file_path) for file_path in files}
+    tasks = validation_tasks(files, reports, chunk_size)
+
+    single_task = len(files) <= 1 and all(os.path.getsize(file_path) <= LARGE_FILE_BYTES for file_path in files)
+    if workers == 1 or single_task:
+        results = (function(argument) for function, argument in tasks)
+    else:
+        results = run_tasks(tasks, workers)
+    for result in results:
+        report = reports[result['path']]
+        for key in ('stories', 'valid', 'invalid'):
+            report[key] += result[key]
+        report['errors'].extend(result['errors'])
+        if 'error' in result:
+            report['error'] = result['error']
+    reports = list(reports.values())
+
+    totals = {
+        'files': len(reports),
+        'stories': sum(r['stories'] for r in reports),
+        'valid': sum(r['valid'] for r in reports),
+        'invalid': sum(r['invalid'] for r in reports),
+        'unreadable_files': sum(1 for r in reports if 'error' in r),
+    }
+    return {'totals': totals, 'elapsed_s': round(time.perf_counter() - start, 3), 'files': reports}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validação de histórias em paralelo')
+    parser.add_argument('paths', nargs='*', default=['.'], help='Arquivos ou pastas a validar (padrão: pasta atual)')
+    parser.add_argument('--workers', type=int, help='Número de processos (padrão: número de CPUs)')
+    parser.add_argument('--output', help='Grava o relatório JSON neste arquivo em vez da saída padrão')
+    args = parser.parse_args(argv)
+
+    report = validate_paths(args.paths, args.workers)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        totals = report['totals']
+        print(f"📋 {totals['stories']} histórias em {totals['files']} arquivos: "
+              f"{totals['valid']} válidas, {totals['invalid']} inválidas ({report['elapsed_s']}s)")
+        print(f"📝 Relatório salvo em {args.output}")
+    else:
+        print(output)
+
+    totals = report['totals']
+    return 1 if totals['invalid'] or totals['unreadable_files'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
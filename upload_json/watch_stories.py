@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Modo watch: acompanha as pastas de histórias e envia só o que mudou
+Uso: python watch_stories.py [pastas...] [--debounce 0.5] [--delete-missing] [--backend local]
+
+O processo fica residente com o Firebase já inicializado. Cada rajada de
+gravações é agrupada pela janela de debounce; só os arquivos alterados são
+relidos, as histórias são comparadas com o manifesto de sincronização
+(.sync_manifest.json, o mesmo do --sync) e as novas ou alteradas vão em uma
+única escrita multi-path.
+
+No Linux usa inotify (via ctypes); nos outros sistemas, ou com --polling,
+confere a data de modificação dos arquivos a cada --poll-interval segundos.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from catalog_shards import shard_deletes
+from catalog_index import index_deletes
+from ingest import discover_files, is_included, DEFAULT_INCLUDE
+from storage_backend import add_backend_arguments, backend_from_args, get_backend
+from story_stream import iter_stories
+from sync_manifest import (DEFAULT_MANIFEST_PATH, load_manifest, save_manifest, compute_plan,
+                           record_upload, record_delete, source_key)
+from upload_stories_v2 import (initialize_firebase, prepare_story, build_upload_data, story_updates,
+                               report_success, print_upload_error, write_index, deleted_languages)
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 1.0
+# Espera antes de tentar de novo os arquivos cuja escrita falhou
+RETRY_INTERVAL = 5.0
+
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Marcador de "reler tudo" (fila do inotify estourou)
+RESCAN = object()
+
+
+class InotifyWatcher:
+    """Observa as pastas (recursivamente) com inotify"""
+
+    name = 'inotify'
+
+    def __init__(self, roots):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 falhou')
+        self._dirs = {}
+        for root in roots:
+            for current, dirs, _ in os.walk(root):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                self._add(current)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch falhou em {path}')
+        self._dirs[wd] = path
+
+    def wait(self, timeout):
+        """Espera até `timeout` segundos; retorna os caminhos alterados (ou RESCAN)"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                return RESCAN
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # Pasta nova: passa a ser observada e seus arquivos entram na lista
+                if mask & (IN_CREATE | IN_MOVED_TO) and not os.path.basename(path).startswith('.'):
+                    self._add(path)
+                    changed.add(RESCAN)
+                continue
+            changed.add(path)
+        return RESCAN if RESCAN in changed else changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Observa os arquivos conferindo data de modificação e tamanho periodicamente"""
+
+    name = 'polling'
+
+    def __init__(self, roots, include, exclude, interval=DEFAULT_POLL_INTERVAL):
+        self.roots = roots
+        self.include = include
+        self.exclude = exclude
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in discover_files(self.roots, self.include, self.exclude):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {path for path in snapshot.keys() | self._snapshot.keys()
+                   if snapshot.get(path) != self._snapshot.get(path)}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots, include, exclude, polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """inotify quando disponível; caso contrário, polling"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify indisponível ({e}); usando polling")
+    return PollingWatcher(roots, include, exclude, poll_interval)
+
+
+class StoryWatch:
+    """Estado do modo watch: ids de cada arquivo e manifesto de sincronização"""
+
+    def __init__(self, roots, include=DEFAULT_INCLUDE, exclude=(), manifest_path=DEFAULT_MANIFEST_PATH,
+                 delete_missing=False):
+        self.roots = roots
+        self.include = include
+        self.exclude = exclude
+        self.manifest_path = manifest_path
+        self.manifest = load_manifest(manifest_path)
+        self.delete_missing = delete_missing
+        self.file_ids = {}
+        # Arquivos cuja escrita falhou: voltam no próximo process
+        self.failed = set()
+        self.retry_at = 0.0
+
+    def accepts(self, path):
+        """Indica se o caminho alterado é um arquivo de histórias observado"""
+        for root in self.roots:
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            if not relative.startswith('../') and is_included(relative, self.include, self.exclude):
+                return True
+        return False
+
+    def read_file(self, path):
+        """Relê um arquivo; retorna as histórias válidas ou None se não deu para ler"""
+        stories = []
+        try:
+            for story_data in iter_stories(path):
+                try:
+                    prepare_story(story_data)
+                except Exception as e:
+                    print_upload_error(story_data, e)
+                    continue
+                stories.append(story_data)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            # Arquivo gravado pela metade ou JSON inválido: espera a próxima gravação
+            print(f"⚠️  {path}: {str(e)}")
+            return None
+        return stories
+
+    def scan(self):
+        """Leitura inicial: registra os ids de cada arquivo, sem enviar nada"""
+        pending = 0
+        for path in discover_files(self.roots, self.include, self.exclude):
+            stories = self.read_file(path) or []
+            self.file_ids[path] = {str(story['id']) for story in stories}
+            plan = compute_plan(stories, self.manifest)
+            pending += len(plan['adds']) + len(plan['updates'])
+        return pending
+
+    def process(self, paths):
+        """Relê os arquivos alterados e envia as histórias novas/alteradas em uma escrita"""
+        paths = set(paths) | self.failed
+        changed_stories = []
+        sources = {}
+        removed = set()
+        # Os ids de cada arquivo só são trocados depois que a escrita der certo
+        file_ids = dict(self.file_ids)
+        for path in sorted(paths):
+            stories = self.read_file(path)
+            if stories is None:
+                continue
+            ids = {str(story['id']) for story in stories}
+            removed |= file_ids.get(path, set()) - ids
+            if ids:
+                file_ids[path] = ids
+            else:
+                file_ids.pop(path, None)
+            changed_stories.extend(stories)
+            sources.update((story_id, source_key(path)) for story_id in ids)
+
+        plan = compute_plan(changed_stories, self.manifest, sources=sources)
+        entries = plan['adds'] + plan['updates']
+
+        # Um id que sumiu de um arquivo pode ter ido para outro
+        still_present = set().union(*file_ids.values()) if file_ids else set()
+        deletes = sorted(story_id for story_id in removed - still_present if story_id in self.manifest['stories'])
+        if deletes and not self.delete_missing:
+            print(f"ℹ️  {len(deletes)} histórias saíram dos arquivos ({', '.join(deletes)}); "
+                  f"use --delete-missing para apagá-las")
+            deletes = []
+
+        if not entries and not deletes:
+            self.file_ids = file_ids
+            self.failed.clear()
+            print(f"✅ Nenhuma história alterada ({plan['unchanged']} sem alteração)")
+            return 0
+
+        known = self.manifest['stories']
+        items = [(entry, build_upload_data(entry['story'], known.get(entry['id'], {}).get('created_at')))
+                 for entry in entries]
+        updates = {}
+        for entry, upload_data in items:
+            updates.update(story_updates(entry['story'], upload_data))
+        for story_id in deletes:
+            updates[f'stories/{story_id}'] = None
+            updates.update(shard_deletes(story_id, deleted_languages(story_id, known.get(story_id))))
+            updates.update(index_deletes(story_id))
+
+        start = time.perf_counter()
+        try:
+            get_backend().update('/', updates)
+        except Exception as e:
+            for entry, _ in items:
+                print_upload_error(entry['story'], e)
+            self.failed = paths
+            self.retry_at = time.monotonic() + RETRY_INTERVAL
+            print(f"⚠️  Nada foi gravado; tentando de novo em {RETRY_INTERVAL:.0f}s ou na próxima alteração")
+            return 0
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.file_ids = file_ids
+        self.failed.clear()
+
+        for entry, upload_data in items:
+            record_upload(self.manifest, entry, upload_data['created_at'])
+            report_success(entry['story'], upload_data)
+        for story_id in deletes:
+            record_delete(self.manifest, story_id)
+            print(f"🗑️  História {story_id} apagada")
+        save_manifest(self.manifest, self.manifest_path)
+        write_index()
+
+        print(f"📤 {len(items)} histórias enviadas e {len(deletes)} apagadas em uma escrita ({elapsed_ms:.0f} ms)")
+        return len(items)
+
+
+def run_watch(story_watch, watcher, debounce=DEFAULT_DEBOUNCE, max_events=None):
+    """Laço principal: agrupa os eventos pela janela de debounce e processa os arquivos alterados"""
+    handled = 0
+    while max_events is None or handled < max_events:
+        # Com escritas falhas pendentes, acorda sozinho para tentar de novo
+        changed = watcher.wait(RETRY_INTERVAL if story_watch.failed else 3600)
+        if not changed:
+            if story_watch.failed and time.monotonic() >= story_watch.retry_at:
+                print(f"\n🔁 Tentando de novo {len(story_watch.failed)} arquivo(s)")
+                story_watch.process(set())
+                handled += 1
+            continue
+
+        # Junta a rajada de gravações até ficar `debounce` segundos sem eventos
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changed = RESCAN if RESCAN in (changed, more) else changed | more
+
+        if changed is RESCAN:
+            paths = set(discover_files(story_watch.roots, story_watch.include, story_watch.exclude))
+            paths |= set(story_watch.file_ids)
+        else:
+            paths = {path for path in changed if story_watch.accepts(path)}
+        if not paths:
+            continue
+
+        print(f"\n🔄 {len(paths)} arquivo(s) alterado(s): {', '.join(sorted(paths))}")
+        story_watch.process(paths)
+        handled += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Envia as histórias alteradas à medida que os arquivos mudam')
+    parser.add_argument('roots', nargs='*', default=['.'], help='Pastas observadas (padrão: pasta atual)')
+    parser.add_argument('--include', help='Padrões glob dos arquivos observados, separados por vírgula (padrão: *.json)')
+    parser.add_argument('--exclude', help='Padrões glob de arquivos e pastas ignorados, separados por vírgula')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, help=f'Janela para agrupar gravações, em segundos (padrão: {DEFAULT_DEBOUNCE})')
+    parser.add_argument('--polling', action='store_true', help='Usar polling em vez de inotify')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, help=f'Intervalo do polling, em segundos (padrão: {DEFAULT_POLL_INTERVAL})')
+    parser.add_argument('--delete-missing', action='store_true', help='Apagar do Firebase histórias removidas dos arquivos')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_PATH, help='Caminho do manifesto de sincronização')
+    parser.add_argument('--sync-on-start', action='store_true', help='Enviar ao iniciar as histórias que já diferem do manifesto')
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    include = args.include.split(',') if args.include else DEFAULT_INCLUDE
+    exclude = args.exclude.split(',') if args.exclude else ()
+    roots = [os.path.normpath(root) for root in args.roots]
+
+    # Inicializa uma vez; cada alteração custa só a escrita
+    if not backend_from_args(args, initialize_firebase):
+        return 1
+
+    story_watch = StoryWatch(roots, include, exclude, args.manifest, args.delete_missing)
+    pending = story_watch.scan()
+    print(f"📚 {sum(len(ids) for ids in story_watch.file_ids.values())} histórias em {len(story_watch.file_ids)} arquivos")
+    if pending and args.sync_on_start:
+        story_watch.process(set(story_watch.file_ids))
+    elif pending:
+        print(f"ℹ️  {pending} histórias já diferem do manifesto; use --sync-on-start ou --sync para enviá-las")
+
+    watcher = create_watcher(roots, include, exclude, args.polling, args.poll_interval)
+    print(f"👀 Observando {', '.join(roots)} ({watcher.name}, debounce de {args.debounce}s). Ctrl-C para sair.")
+    try:
+        run_watch(story_watch, watcher, args.debounce)
+    except KeyboardInterrupt:
+        print("\n👋 Modo watch encerrado")
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())